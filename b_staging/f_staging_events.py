@@ -1,9 +1,16 @@
 import pandas as pd
 import sqlite3
+import sys
 import os
 from datetime import datetime
 from typing import Optional
 
+# Add the parent directory to the path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, preview, traced
+
 
 class StagingEventsProcessor:
     """
@@ -30,6 +37,7 @@ class StagingEventsProcessor:
         self.conn = None
         self.output_dir = os.path.join(os.path.dirname(__file__), 'data_output')
         
+    @traced()
     def load_data(self) -> pd.DataFrame:
         """
         Load data from the CSV file.
@@ -38,9 +46,10 @@ class StagingEventsProcessor:
             pd.DataFrame: The loaded data
         """
         print(f"Loading data from: {self.input_csv_path}")
-        self.df = pd.read_csv(self.input_csv_path)
+        self.df = compression.read_csv(self.input_csv_path)
         return self.df
     
+    @traced(input_attr='df')
     def validate_and_cast_schema(self) -> None:
         """
         Validate and cast data types according to the expected schema.
@@ -63,6 +72,7 @@ class StagingEventsProcessor:
                 
         print(f"Schema validation completed. Shape: {self.df.shape}")
     
+    @traced(input_attr='df')
     def fill_missing_values(self) -> None:
         """
         Fill missing values with appropriate defaults.
@@ -90,6 +100,7 @@ class StagingEventsProcessor:
             
         print("Missing values filled successfully.")
     
+    @traced(input_attr='df')
     def create_staging_table(self) -> pd.DataFrame:
         """
         Create the staging table using SQL and return the DataFrame directly.
@@ -123,6 +134,9 @@ class StagingEventsProcessor:
             ) AS event_rank
         FROM raw_events
         WHERE event_date IS NOT NULL
+        
+        -- Events of a client are contiguous, so later layers can stream them in chunks
+        ORDER BY client_id, event_type, event_rank
         """
         
         # Execute the query and return DataFrame directly (no intermediate table creation)
@@ -130,6 +144,7 @@ class StagingEventsProcessor:
         print(f"Staging table created successfully. Shape: {staging_df.shape}")
         return staging_df
     
+    @traced()
     def export_to_csv(self, staging_df: pd.DataFrame) -> str:
         """
         Export the staging dataframe to CSV.
@@ -142,17 +157,17 @@ class StagingEventsProcessor:
         """
         print("Exporting staging events to CSV...")
         
-        print(f"\nStaging Events Table Preview:")
-        print(staging_df.head())
+        preview(staging_df, "Staging Events Table Preview")
         
         # Create output directory and write to CSV
         os.makedirs(self.output_dir, exist_ok=True)
         output_path = os.path.join(self.output_dir, 'f_staging_events.csv')
-        staging_df.to_csv(output_path, index=False)
+        output_path = compression.write_csv(staging_df, output_path)
         
         print(f"✅ Staging events table written to '{output_path}'")
         return output_path
     
+    @traced()
     def process_staging_events(self) -> str:
         """
         Execute the complete staging process.
@@ -184,6 +199,9 @@ class StagingEventsProcessor:
 # Execute the staging process
 # -------------------------------
 if __name__ == "__main__":
+    args = argument_parser('Build the staging events table.').parse_args()
+    configure(args)
+
     processor = StagingEventsProcessor()
     output_file = processor.process_staging_events()
 
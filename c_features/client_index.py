@@ -0,0 +1,299 @@
+import pandas as pd
+import json
+import sqlite3
+import threading
+import sys
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Add the parent directory to the path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, traced
+
+
+class ClientFeatureIndex:
+    """
+    A client-keyed index over the feature outputs for point lookups.
+
+    The funnel, churn and inconsistencies outputs are loaded once into an on-disk SQLite
+    database with an index on client_id, so one client's rows are found without reading
+    the CSV files. Recent lookups are kept in an in-process LRU cache.
+
+    The index records the size and modification time of every file it was built from,
+    and is rebuilt when a thread opens it and any of them differs.
+
+    Each thread queries the index on its own read-only connection; only the cache is
+    shared between threads.
+    """
+
+    # Client ids per query, below SQLite's limit on bound parameters
+    QUERY_BATCH_SIZE = 500
+
+    # Indexed table name -> feature output file
+    SOURCES = {
+        'funnel': 'f_funnel_data.csv',
+        'churn': 'f_churn_data.csv',
+        'inconsistencies': 'f_inconsistencies.csv'
+    }
+
+    # Inconsistency type dictionary; side tables are f_inconsistencies_<type>.csv
+    TYPES_FILE = 'f_inconsistency_types.csv'
+
+    def __init__(self, features_dir: Optional[str] = None, index_path: Optional[str] = None,
+                 cache_size: int = 1024):
+        """
+        Initialize the client feature index.
+
+        Args:
+            features_dir: Directory of the feature outputs. If None, uses c_features/data_output.
+            index_path: Path to the SQLite index file. If None, uses client_index.sqlite in features_dir.
+            cache_size: Maximum number of clients kept in the LRU cache
+        """
+        self.features_dir = features_dir or os.path.join(os.path.dirname(__file__), 'data_output')
+        self.index_path = index_path or os.path.join(self.features_dir, 'client_index.sqlite')
+        self.cache_size = cache_size
+
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+        # Per-thread connections; bumping the generation makes every thread reopen its connection
+        self._local = threading.local()
+        self._generation = 0
+
+    def _source_files(self) -> List[str]:
+        """Feature output files the index is built from, including the inconsistency side tables."""
+        file_names = list(self.SOURCES.values()) + [self.TYPES_FILE]
+        types_path = os.path.join(self.features_dir, self.TYPES_FILE)
+        if compression.output_exists(types_path):
+            types = compression.read_csv(types_path, usecols=['inconsistency_type'])
+            file_names += [f'f_inconsistencies_{inconsistency_type}.csv'
+                           for inconsistency_type in types['inconsistency_type']]
+        return file_names
+
+    def _fingerprints(self) -> List[tuple]:
+        """(file name, size, modification time in ns) of each source file, None for missing files."""
+        fingerprints = []
+        for file_name in self._source_files():
+            path = compression.resolve_path(os.path.join(self.features_dir, file_name))
+            if os.path.exists(path):
+                stat = os.stat(path)
+                fingerprints.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+            else:
+                fingerprints.append((file_name, None, None))
+        return fingerprints
+
+    def is_stale(self) -> bool:
+        """
+        Check whether the index is missing or was built from different feature outputs.
+
+        Returns:
+            bool: True if the index has to be rebuilt
+        """
+        if not os.path.exists(self.index_path):
+            return True
+        conn = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True)
+        try:
+            stored = conn.execute("SELECT file_name, size, mtime_ns FROM sources ORDER BY position").fetchall()
+        except sqlite3.DatabaseError:
+            # Indexes built before sources were recorded
+            return True
+        finally:
+            conn.close()
+        return stored != self._fingerprints()
+
+    def _inconsistency_details(self, inconsistencies: pd.DataFrame, types: pd.DataFrame) -> pd.Series:
+        """
+        Side table columns of each inconsistency as a JSON object, aligned with `inconsistencies`.
+
+        Args:
+            inconsistencies: Core inconsistency rows
+            types: Inconsistency type dictionary
+
+        Returns:
+            pd.Series: JSON text per row, '{}' for types without side table columns
+        """
+        details = []
+        for inconsistency_type in types['inconsistency_type']:
+            side_table_path = os.path.join(self.features_dir, f'f_inconsistencies_{inconsistency_type}.csv')
+            if not compression.output_exists(side_table_path):
+                continue
+            side_table = compression.read_csv(side_table_path)
+            columns = side_table.columns.drop(['row_id', 'client_id'], errors='ignore')
+            # to_json turns missing values into null and dates into plain values
+            records = json.loads(side_table[columns].to_json(orient='records'))
+            details.append(pd.Series([json.dumps(record) for record in records], index=side_table['row_id']))
+
+        if not details:
+            return pd.Series('{}', index=inconsistencies.index)
+        by_row_id = pd.concat(details)
+        return inconsistencies['row_id'].map(by_row_id).fillna('{}')
+
+    @traced()
+    def build(self) -> str:
+        """
+        Build the index from the feature output files.
+
+        Inconsistencies are stored with their type and severity names decoded from
+        the type dictionary, and the columns of their side table as a `details` object.
+        The fingerprints of the source files are stored in a `sources` table.
+
+        Returns:
+            str: Path to the SQLite index file
+        """
+        print(f"Building client feature index at: {self.index_path}")
+
+        # Taken before reading, so a file changed during the build triggers another one
+        fingerprints = self._fingerprints()
+
+        temp_path = f"{self.index_path}.tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+        conn = sqlite3.connect(temp_path)
+        try:
+            for table, file_name in self.SOURCES.items():
+                df = compression.read_csv(os.path.join(self.features_dir, file_name))
+                if table == 'inconsistencies':
+                    types = compression.read_csv(os.path.join(self.features_dir, self.TYPES_FILE))
+                    df = df.merge(types[['type_code', 'inconsistency_type', 'severity']], on='type_code', how='left')
+                    df['details'] = self._inconsistency_details(df, types)
+                df.to_sql(table, conn, index=False)
+                conn.execute(f"CREATE INDEX idx_{table}_client_id ON {table} (client_id)")
+                print(f"  {table}: {len(df)} rows indexed")
+            conn.execute("CREATE TABLE sources (position INTEGER, file_name TEXT, size INTEGER, mtime_ns INTEGER)")
+            conn.executemany("INSERT INTO sources VALUES (?, ?, ?, ?)",
+                             [(position, *fingerprint) for position, fingerprint in enumerate(fingerprints)])
+            conn.commit()
+        finally:
+            conn.close()
+
+        # Swap the new index in atomically, so readers never see a partial build
+        self.close()
+        os.replace(temp_path, self.index_path)
+
+        print("Client feature index built successfully!")
+        return self.index_path
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Open the index read-only for the calling thread, building it first if it is missing or stale.
+
+        Returns:
+            sqlite3.Connection: The calling thread's connection
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.generation == self._generation:
+            return conn
+        if conn is not None:
+            conn.close()
+
+        with self._build_lock:
+            if self.is_stale():
+                self.build()
+        conn = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        self._local.conn = conn
+        self._local.generation = self._generation
+        return conn
+
+    def close(self) -> None:
+        """
+        Close the calling thread's connection and clear the cache.
+
+        Other threads close their connection and reopen the index on their next lookup.
+        """
+        with self._cache_lock:
+            self._generation += 1
+            self._cache.clear()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _copy(rows: Dict[str, List[dict]]) -> Dict[str, List[dict]]:
+        """Copy of a lookup result with inconsistency details decoded, so callers cannot change the cached rows."""
+        copied = {table: [dict(row) for row in table_rows] for table, table_rows in rows.items()}
+        for row in copied['inconsistencies']:
+            row['details'] = json.loads(row['details'])
+        return copied
+
+    def _query(self, client_ids: List[int]) -> Dict[int, Dict[str, List[dict]]]:
+        """
+        Read the rows of several clients with one IN query per table and batch.
+
+        Args:
+            client_ids: Distinct clients to read
+
+        Returns:
+            dict: Rows of each indexed table, keyed by client_id
+        """
+        conn = self.connect()
+        result = {client_id: {table: [] for table in self.SOURCES} for client_id in client_ids}
+        for start in range(0, len(client_ids), self.QUERY_BATCH_SIZE):
+            batch = client_ids[start:start + self.QUERY_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            for table in self.SOURCES:
+                for row in conn.execute(f"SELECT * FROM {table} WHERE client_id IN ({placeholders})", batch):
+                    result[row['client_id']][table].append(dict(row))
+        return result
+
+    def lookup(self, client_id: int) -> Dict[str, List[dict]]:
+        """
+        Get all feature rows of one client.
+
+        Args:
+            client_id: The client to look up
+
+        Returns:
+            dict: Rows of each indexed table as dictionaries, keyed by table name
+        """
+        client_id = int(client_id)
+        return self.lookup_many([client_id])[client_id]
+
+    def lookup_many(self, client_ids: List[int]) -> Dict[int, Dict[str, List[dict]]]:
+        """
+        Get all feature rows of several clients.
+
+        Args:
+            client_ids: The clients to look up
+
+        Returns:
+            dict: The `lookup` result of each client, keyed by client_id
+        """
+        client_ids = [int(client_id) for client_id in client_ids]
+        found = {}
+        with self._cache_lock:
+            generation = self._generation
+            for client_id in client_ids:
+                if client_id in self._cache:
+                    self._cache.move_to_end(client_id)
+                    found[client_id] = self._cache[client_id]
+
+        missing = list(dict.fromkeys(client_id for client_id in client_ids if client_id not in found))
+        if missing:
+            queried = self._query(missing)
+            found.update(queried)
+            with self._cache_lock:
+                # Results read before a rebuild are not cached
+                if generation == self._generation:
+                    self._cache.update(queried)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        return {client_id: self._copy(found[client_id]) for client_id in client_ids}
+
+
+# -------------------------------
+# Build the client feature index
+# -------------------------------
+if __name__ == "__main__":
+    args = argument_parser('Build the client feature index.').parse_args()
+    configure(args)
+
+    index = ClientFeatureIndex()
+    index_file = index.build()
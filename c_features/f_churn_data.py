@@ -1,20 +1,41 @@
 import pandas as pd
+import numpy as np
 import sqlite3
+import sys
 import os
 from typing import Optional
 
+# Add the parent directory to the path to import sibling feature modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, preview, traced
+from c_features.feature_store import FeatureStore
+
 
 class ChurnDataProcessor:
     """
     A class to handle churn analysis from staging events data.
     """
     
-    def __init__(self, staging_csv_path: Optional[str] = None):
+    # Bump when the outputs change for the same inputs, to invalidate stored results
+    VERSION = '3'
+    
+    # Files written to output_dir, so stale siblings are detected by FeatureStore.outputs_fresh
+    OUTPUT_PATTERNS = ['f_churn_data.csv']
+    
+    def __init__(self, staging_csv_path: Optional[str] = None, medium_risk_days: int = 30,
+                 high_risk_days: int = 60, as_of: Optional[str] = None,
+                 feature_store: Optional[FeatureStore] = None):
         """
         Initialize the churn data processor.
         
         Args:
             staging_csv_path: Path to the staging events CSV file. If None, uses default path.
+            medium_risk_days: Days since last event above which an active client is Medium Risk
+            high_risk_days: Days since last event above which an active client is High Risk
+            as_of: Reference date for days since events. If None, uses today's date, so runs on the same day share a store key.
+            feature_store: Store to reuse results of identical runs from. If None, always recomputes.
         """
         if staging_csv_path is None:
             self.staging_csv_path = os.path.join(
@@ -26,10 +47,15 @@ class ChurnDataProcessor:
         else:
             self.staging_csv_path = staging_csv_path
             
+        self.medium_risk_days = medium_risk_days
+        self.high_risk_days = high_risk_days
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now().normalize()
+        self.feature_store = feature_store
         self.staging_df = None
         self.conn = None
         self.output_dir = os.path.join(os.path.dirname(__file__), 'data_output')
         
+    @traced()
     def load_staging_data(self) -> pd.DataFrame:
         """
         Load staging data from CSV file.
@@ -38,13 +64,14 @@ class ChurnDataProcessor:
             pd.DataFrame: The loaded staging data
         """
         print(f"Loading staging data from: {self.staging_csv_path}")
-        self.staging_df = pd.read_csv(self.staging_csv_path)
+        self.staging_df = compression.read_csv(self.staging_csv_path)
         
         # Convert event_date to datetime
         self.staging_df['event_date'] = pd.to_datetime(self.staging_df['event_date'])
         print(f"Staging data loaded. Shape: {self.staging_df.shape}")
         return self.staging_df
     
+    @traced(input_attr='staging_df')
     def prepare_database(self) -> None:
         """
         Create in-memory SQLite database and load staging data.
@@ -54,10 +81,15 @@ class ChurnDataProcessor:
         self.staging_df.to_sql('f_staging_events', self.conn, index=False, if_exists='replace')
         print("Database prepared successfully.")
     
+    @traced(input_attr='staging_df')
     def create_churn_analysis(self) -> pd.DataFrame:
         """
         Create churn analysis using SQL to calculate days since various events.
         
+        The last event type, plan and region come from each client's latest event; events
+        on the same date are ordered by event_rank and record_id, so every client gets
+        exactly one row.
+        
         Returns:
             pd.DataFrame: The churn analysis data
         """
@@ -74,6 +106,18 @@ class ChurnDataProcessor:
             FROM f_staging_events
             GROUP BY client_id
         ),
+        latest_events AS (
+            SELECT
+                client_id,
+                event_type,
+                plan,
+                region,
+                ROW_NUMBER() OVER (
+                    PARTITION BY client_id
+                    ORDER BY event_date DESC, event_rank DESC, record_id DESC
+                ) AS recency
+            FROM f_staging_events
+        ),
         last_event_details AS (
             SELECT 
                 le.client_id,
@@ -81,11 +125,12 @@ class ChurnDataProcessor:
                 le.applied_date,
                 le.signed_date,
                 le.churned_date,
-                se.event_type AS last_event_type
+                se.event_type AS last_event_type,
+                se.plan,
+                se.region
             FROM last_events le
-            LEFT JOIN f_staging_events se ON le.client_id = se.client_id 
-                AND le.last_event_date = se.event_date
-                AND se.event_rank = 1
+            JOIN latest_events se ON le.client_id = se.client_id 
+                AND se.recency = 1
         )
         SELECT
             client_id,
@@ -94,22 +139,60 @@ class ChurnDataProcessor:
             signed_date,
             churned_date,
             last_event_type,
+            plan,
+            region,
             CASE 
                 WHEN churned_date IS NOT NULL THEN 1
                 ELSE 0
             END AS is_churned,
-            julianday('now') - julianday(last_event_date) AS days_since_last_event,
+            CAST(julianday(:as_of) - julianday(last_event_date) AS INTEGER) AS days_since_last_event,
             CASE 
-                WHEN signed_date IS NOT NULL THEN julianday('now') - julianday(signed_date)
+                WHEN signed_date IS NOT NULL THEN CAST(julianday(:as_of) - julianday(signed_date) AS INTEGER)
                 ELSE NULL 
             END AS days_since_signed
         FROM last_event_details
         """
         
-        churn_df = pd.read_sql_query(churn_sql, self.conn)
+        churn_df = pd.read_sql_query(
+            churn_sql, self.conn, params={'as_of': self.as_of.strftime('%Y-%m-%d %H:%M:%S')}
+        )
+        # Whole days, missing for clients that never signed
+        churn_df['days_since_signed'] = churn_df['days_since_signed'].astype('Int64')
         print(f"Churn analysis created. Shape: {churn_df.shape}")
         return churn_df
     
+    @traced()
+    def add_risk_category(self, churn_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the churn risk category of each client.
+        
+        Churned clients are 'Already Churned'; active clients are Low, Medium or High Risk
+        by days since last event, or 'Unknown' without a last event.
+        
+        Args:
+            churn_df: The churn analysis dataframe
+            
+        Returns:
+            pd.DataFrame: The churn analysis data with a risk_category column
+        """
+        print("Adding risk categories...")
+        
+        days = churn_df['days_since_last_event']
+        churn_df['risk_category'] = np.select(
+            [
+                churn_df['is_churned'] == 1,
+                days.isna(),
+                days <= self.medium_risk_days,
+                days <= self.high_risk_days
+            ],
+            ['Already Churned', 'Unknown', 'Low Risk', 'Medium Risk'],
+            default='High Risk'
+        )
+        
+        print(f"Risk categories added: {churn_df['risk_category'].value_counts().to_dict()}")
+        return churn_df
+    
+    @traced()
     def export_to_csv(self, churn_df: pd.DataFrame) -> str:
         """
         Export churn analysis to CSV.
@@ -122,17 +205,17 @@ class ChurnDataProcessor:
         """
         print("Exporting churn data to CSV...")
         
-        print(f"\nChurn Analysis Table Preview:")
-        print(churn_df.head())
+        preview(churn_df, "Churn Analysis Table Preview")
         
         # Create output directory and write to CSV
         os.makedirs(self.output_dir, exist_ok=True)
         output_path = os.path.join(self.output_dir, 'f_churn_data.csv')
-        churn_df.to_csv(output_path, index=False)
+        output_path = compression.write_csv(churn_df, output_path)
         
         print(f"Churn data written to '{output_path}'")
         return output_path
     
+    @traced()
     def process_churn_analysis(self) -> str:
         """
         Execute the complete churn analysis process.
@@ -141,12 +224,25 @@ class ChurnDataProcessor:
             str: Path to the exported CSV file
         """
         try:
+            # Serve identical runs from the feature store
+            if self.feature_store is not None:
+                params = {'as_of': self.as_of, 'medium_risk_days': self.medium_risk_days,
+                          'high_risk_days': self.high_risk_days}
+                store_key = self.feature_store.make_key(self.staging_csv_path, type(self).__name__, self.VERSION, params)
+                restored = self.feature_store.restore(store_key, self.output_dir)
+                if restored is not None:
+                    return compression.resolve_path(os.path.join(self.output_dir, 'f_churn_data.csv'))
+            
             # Execute all steps in sequence
             self.load_staging_data()
             self.prepare_database()
             churn_df = self.create_churn_analysis()
+            churn_df = self.add_risk_category(churn_df)
             output_path = self.export_to_csv(churn_df)
             
+            if self.feature_store is not None:
+                self.feature_store.put(store_key, [output_path], type(self).__name__, self.VERSION, params)
+            
             print("\nChurn analysis completed successfully!")
             return output_path
             
@@ -176,6 +272,9 @@ class ChurnDataProcessor:
 # Execute the churn analysis
 # -------------------------------
 if __name__ == "__main__":
-    processor = ChurnDataProcessor()
+    args = argument_parser('Build the churn features.').parse_args()
+    configure(args)
+
+    processor = ChurnDataProcessor(feature_store=FeatureStore())
     output_file = processor.process_churn_analysis()
     
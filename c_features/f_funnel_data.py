@@ -1,20 +1,49 @@
 import pandas as pd
+import numpy as np
 import sqlite3
+import sys
 import os
+from itertools import combinations
 from typing import Optional
 
+# Add the parent directory to the path to import sibling feature modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, preview, traced
+from common.exporter import AsyncExporter, write_csv
+from c_features.feature_store import FeatureStore
+
 
 class FunnelDataProcessor:
     """
     A class to handle funnel analysis from staging events data.
     """
     
-    def __init__(self, staging_csv_path: Optional[str] = None):
+    # Stage transitions summarised for the dashboards: (label, from date column, to date column)
+    STAGE_TRANSITIONS = [
+        ('Applied → Docs', 'applied_date', 'docs_submitted_date'),
+        ('Applied → Rejected', 'applied_date', 'rejected_date'),
+        ('Applied → Signed', 'applied_date', 'signed_date'),
+        ('Signed → Churned', 'signed_date', 'churned_date'),
+    ]
+    
+    # Client attributes the funnel cube is broken down by
+    CUBE_DIMENSIONS = ['plan', 'region', 'marketing_channel', 'sales_rep_id']
+    
+    # Bump when the outputs change for the same inputs, to invalidate stored results
+    VERSION = '2'
+    
+    # Files written to output_dir, so stale siblings are detected by FeatureStore.outputs_fresh
+    OUTPUT_PATTERNS = ['f_funnel_*.csv']
+    
+    def __init__(self, staging_csv_path: Optional[str] = None, feature_store: Optional[FeatureStore] = None):
         """
         Initialize the funnel data processor.
         
         Args:
             staging_csv_path: Path to the staging events CSV file. If None, uses default path.
+            feature_store: Store to reuse results of identical runs from. If None, always recomputes.
         """
         if staging_csv_path is None:
             self.staging_csv_path = os.path.join(
@@ -26,10 +55,13 @@ class FunnelDataProcessor:
         else:
             self.staging_csv_path = staging_csv_path
             
+        self.feature_store = feature_store
+        self.exporter = None
         self.staging_df = None
         self.conn = None
         self.output_dir = os.path.join(os.path.dirname(__file__), 'data_output')
         
+    @traced()
     def load_staging_data(self) -> pd.DataFrame:
         """
         Load staging data from CSV file.
@@ -38,13 +70,14 @@ class FunnelDataProcessor:
             pd.DataFrame: The loaded staging data
         """
         print(f"Loading staging data from: {self.staging_csv_path}")
-        self.staging_df = pd.read_csv(self.staging_csv_path)
+        self.staging_df = compression.read_csv(self.staging_csv_path)
         
         # Convert event_date to datetime
         self.staging_df['event_date'] = pd.to_datetime(self.staging_df['event_date'])
         print(f"Staging data loaded. Shape: {self.staging_df.shape}")
         return self.staging_df
     
+    @traced(input_attr='staging_df')
     def prepare_database(self) -> None:
         """
         Create in-memory SQLite database and load staging data.
@@ -54,6 +87,7 @@ class FunnelDataProcessor:
         self.staging_df.to_sql('f_staging_events', self.conn, index=False, if_exists='replace')
         print("Database prepared successfully.")
     
+    @traced(input_attr='staging_df')
     def create_funnel_analysis(self) -> pd.DataFrame:
         """
         Create comprehensive funnel analysis including all event types.
@@ -80,10 +114,172 @@ class FunnelDataProcessor:
         print(f"Comprehensive funnel analysis created. Shape: {funnel_df.shape}")
         return funnel_df
     
+    @traced(input_attr='staging_df')
+    def create_client_dimensions(self) -> pd.DataFrame:
+        """
+        Get the cube dimensions of each client, taken from the client's earliest event.
+        
+        Returns:
+            pd.DataFrame: One row per client with the cube dimension columns
+        """
+        print("Creating client dimensions...")
+        
+        dimensions_sql = """
+        WITH ranked_events AS (
+            SELECT
+                client_id,
+                plan,
+                region,
+                marketing_channel,
+                sales_rep_id,
+                ROW_NUMBER() OVER (
+                    PARTITION BY client_id
+                    ORDER BY event_date, record_id
+                ) AS client_event_rank
+            FROM f_staging_events
+        )
+        SELECT
+            client_id,
+            plan,
+            region,
+            marketing_channel,
+            sales_rep_id
+        FROM ranked_events
+        WHERE client_event_rank = 1
+        """
+        
+        dimensions_df = pd.read_sql_query(dimensions_sql, self.conn)
+        print(f"Client dimensions created. Shape: {dimensions_df.shape}")
+        return dimensions_df
+    
+    @traced()
+    def create_funnel_cube(self, funnel_df: pd.DataFrame, dimensions_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Materialize funnel counts and rates for every grouping set of the cube dimensions.
+        
+        The client-level funnel is aggregated once to the finest grain (all dimensions);
+        every rollup is then derived by re-aggregating that grain, which is much smaller
+        than the client table. Rolled-up dimensions are labelled 'ALL' and flagged in
+        the `grouping_id` bitmask (bit i set when CUBE_DIMENSIONS[i] is rolled up).
+        
+        Args:
+            funnel_df: The funnel analysis dataframe
+            dimensions_df: The client dimensions dataframe
+            
+        Returns:
+            pd.DataFrame: The funnel cube with one row per dimension combination
+        """
+        print("Creating funnel cube...")
+        
+        dimensions = self.CUBE_DIMENSIONS
+        stage_columns = {
+            'applied_clients': 'applied_date',
+            'docs_submitted_clients': 'docs_submitted_date',
+            'rejected_clients': 'rejected_date',
+            'signed_clients': 'signed_date',
+            'churned_clients': 'churned_date'
+        }
+        count_columns = ['total_clients'] + list(stage_columns)
+        
+        # Dimensions are labels: cast to string first so each cube column has one dtype
+        dimensions_df = dimensions_df.copy()
+        dimensions_df[dimensions] = dimensions_df[dimensions].convert_dtypes().astype('string')
+        clients = funnel_df[['client_id']].merge(dimensions_df, on='client_id', how='left')
+        clients[dimensions] = clients[dimensions].fillna('unknown').astype(object)
+        clients['total_clients'] = 1
+        for count_col, date_col in stage_columns.items():
+            clients[count_col] = funnel_df[date_col].notna().to_numpy().astype(int)
+        
+        # Single pass over the client-level funnel: aggregate to the finest grain
+        finest = clients.groupby(dimensions, as_index=False)[count_columns].sum()
+        
+        # Derive every rollup from the finest grain
+        cube_frames = []
+        for size in range(len(dimensions), -1, -1):
+            for grouped in combinations(dimensions, size):
+                if size == len(dimensions):
+                    frame = finest.copy()
+                elif size > 0:
+                    frame = finest.groupby(list(grouped), as_index=False)[count_columns].sum()
+                else:
+                    frame = finest[count_columns].sum().to_frame().T
+                
+                rolled_up = [dim for dim in dimensions if dim not in grouped]
+                for dim in rolled_up:
+                    frame[dim] = 'ALL'
+                frame['grouping_id'] = sum(1 << i for i, dim in enumerate(dimensions) if dim in rolled_up)
+                cube_frames.append(frame[['grouping_id'] + dimensions + count_columns])
+        
+        cube_df = pd.concat(cube_frames, ignore_index=True)
+        
+        # Rates follow the same definitions as analyze_funnel_metrics
+        applied = cube_df['applied_clients']
+        signed = cube_df['signed_clients']
+        cube_df['docs_submission_rate'] = (cube_df['docs_submitted_clients'] / applied).where(applied > 0, 0)
+        cube_df['rejection_rate'] = (cube_df['rejected_clients'] / applied).where(applied > 0, 0)
+        cube_df['conversion_rate'] = (signed / applied).where(applied > 0, 0)
+        cube_df['churn_rate'] = (cube_df['churned_clients'] / signed).where(signed > 0, 0)
+        cube_df['active_clients'] = (signed - cube_df['churned_clients']).clip(lower=0)
+        
+        print(f"Funnel cube created. Shape: {cube_df.shape}")
+        return cube_df
+    
+    @traced()
+    def analyze_stage_transitions(self, funnel_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Summarise the days spent between funnel stages for each stage transition.
+        
+        The durations are computed column-wise over the whole client-level funnel, so
+        the output size depends only on the number of transitions. The quartiles and
+        extremes are the box statistics of the funnel dashboard.
+        
+        Args:
+            funnel_df: The funnel analysis dataframe
+            
+        Returns:
+            pd.DataFrame: Summary statistics per transition
+        """
+        print("Calculating stage transition distributions...")
+        
+        summary_rows = []
+        
+        for stage, from_col, to_col in self.STAGE_TRANSITIONS:
+            days = (
+                pd.to_datetime(funnel_df[to_col]) - pd.to_datetime(funnel_df[from_col])
+            ).dt.days.dropna().to_numpy()
+            
+            if len(days) == 0:
+                continue
+            
+            p25, p50, p75, p90, p99 = np.percentile(days, [25, 50, 75, 90, 99])
+            summary_rows.append({
+                'stage': stage,
+                'client_count': len(days),
+                'mean_days': days.mean(),
+                'min_days': days.min(),
+                'p25_days': p25,
+                'p50_days': p50,
+                'p75_days': p75,
+                'p90_days': p90,
+                'p99_days': p99,
+                'max_days': days.max()
+            })
+        
+        summary_columns = ['stage', 'client_count', 'mean_days', 'min_days', 'p25_days', 'p50_days',
+                           'p75_days', 'p90_days', 'p99_days', 'max_days']
+        summary_df = pd.DataFrame(summary_rows, columns=summary_columns)
+        
+        print(f"Stage transition distributions calculated for {len(summary_df)} transitions")
+        return summary_df
+    
+    @traced()
     def export_to_csv(self, funnel_df: pd.DataFrame, metrics: dict = None) -> str:
         """
         Export funnel analysis data and metrics to CSV.
         
+        With an exporter set, the files are queued on its writer pool and written while
+        the remaining analyses run.
+        
         Args:
             funnel_df: The funnel analysis dataframe to export
             metrics: Dictionary containing funnel metrics (optional)
@@ -93,26 +289,22 @@ class FunnelDataProcessor:
         """
         print("Exporting funnel data to CSV...")
         
-        print(f"\nFunnel Analysis Table Preview:")
-        print(funnel_df.head())
+        preview(funnel_df, "Funnel Analysis Table Preview")
         
-        # Create output directory
+        # Create output directory and write to CSV
         os.makedirs(self.output_dir, exist_ok=True)
-        
-        # Export main funnel data
         output_path = os.path.join(self.output_dir, 'f_funnel_data.csv')
-        funnel_df.to_csv(output_path, index=False)
-        print(f"Funnel data written to '{output_path}'")
+        write_csv(funnel_df, output_path, self.exporter)
         
         # Export metrics if provided
         if metrics:
             metrics_path = os.path.join(self.output_dir, 'f_funnel_metrics.csv')
-            metrics_df = pd.DataFrame([metrics])
-            metrics_df.to_csv(metrics_path, index=False)
-            print(f"Funnel metrics written to '{metrics_path}'")
+            write_csv(pd.DataFrame([metrics]), metrics_path, self.exporter)
         
+        print(f"Funnel data exported to '{output_path}'")
         return output_path
     
+    @traced()
     def analyze_funnel_metrics(self, funnel_df: pd.DataFrame) -> dict:
         """
         Calculate comprehensive funnel metrics including all event types.
@@ -150,6 +342,7 @@ class FunnelDataProcessor:
         print(f"Comprehensive funnel metrics calculated: {metrics}")
         return metrics
     
+    @traced()
     def process_funnel_analysis(self) -> tuple[str, dict]:
         """
         Execute the complete funnel analysis process.
@@ -158,6 +351,19 @@ class FunnelDataProcessor:
             tuple: (Path to exported CSV file, Funnel metrics dictionary)
         """
         try:
+            output_path = os.path.join(self.output_dir, 'f_funnel_data.csv')
+            metrics_path = os.path.join(self.output_dir, 'f_funnel_metrics.csv')
+            
+            # Serve identical runs from the feature store
+            if self.feature_store is not None:
+                store_key = self.feature_store.make_key(self.staging_csv_path, type(self).__name__, self.VERSION)
+                restored = self.feature_store.restore(store_key, self.output_dir)
+                if restored is not None:
+                    return output_path, compression.read_csv(metrics_path).iloc[0].to_dict()
+            
+            # Outputs are written on a writer pool as soon as each is computed
+            self.exporter = AsyncExporter()
+            
             # Execute all steps in sequence
             self.load_staging_data()
             self.prepare_database()
@@ -165,6 +371,19 @@ class FunnelDataProcessor:
             metrics = self.analyze_funnel_metrics(funnel_df)
             output_path = self.export_to_csv(funnel_df, metrics)
             
+            transitions_path = os.path.join(self.output_dir, 'f_funnel_transitions.csv')
+            write_csv(self.analyze_stage_transitions(funnel_df), transitions_path, self.exporter)
+            
+            cube_path = os.path.join(self.output_dir, 'f_funnel_cube.csv')
+            write_csv(self.create_funnel_cube(funnel_df, self.create_client_dimensions()), cube_path, self.exporter)
+            
+            # All outputs must be on disk before they are stored
+            self.exporter.wait()
+            
+            if self.feature_store is not None:
+                output_files = [output_path, metrics_path, transitions_path, cube_path]
+                self.feature_store.put(store_key, output_files, type(self).__name__, self.VERSION)
+            
             print("\nFunnel analysis completed successfully!")
             return output_path, metrics
             
@@ -174,6 +393,8 @@ class FunnelDataProcessor:
         finally:
             if self.conn:
                 self.conn.close()
+            if self.exporter:
+                self.exporter.shutdown()
     
     @staticmethod
     def get_business_questions() -> list:
@@ -194,7 +415,10 @@ class FunnelDataProcessor:
 # Execute the funnel analysis
 # -------------------------------
 if __name__ == "__main__":
-    processor = FunnelDataProcessor()
+    args = argument_parser('Build the funnel features.').parse_args()
+    configure(args)
+
+    processor = FunnelDataProcessor(feature_store=FeatureStore())
     output_file, funnel_metrics = processor.process_funnel_analysis()
     
     # Print funnel metrics
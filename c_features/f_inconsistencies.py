@@ -1,20 +1,65 @@
 import pandas as pd
+import numpy as np
 import sqlite3
+import sys
 import os
 from typing import Optional, Dict, List
 
+# Add the parent directory to the path to import sibling feature modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, traced
+from common.exporter import AsyncExporter, write_csv
+from c_features.f_sketch_stats import SketchStatsProcessor
+from c_features.feature_store import FeatureStore
+from c_features.inconsistency_rules import RULES, STAGE_PRECEDENCE, build_client_aggregate, evaluate_rules, precedence_rules
+
 
 class InconsistenciesProcessor:
     """
     A class to analyze data inconsistencies and business rule violations.
     """
     
-    def __init__(self, staging_csv_path: Optional[str] = None):
+    # Event ordering checks, registered as precedence rules of the rule engine
+    STAGE_PRECEDENCE = STAGE_PRECEDENCE
+    
+    # Compact layout codes: inconsistency type -> (type code, severity, column used as relevant date, description)
+    INCONSISTENCY_TYPES = {
+        'Q3_churned_without_signed': (1, 'High', 'relevant_date', 'Client churned without ever signing'),
+        'Q6_long_inactive_unsigned': (2, 'Low', 'relevant_date',
+                                      'Unsigned client with long inactivity (>60 days) - potential at-risk'),
+        'Q2_signed_without_applied': (3, 'High', 'relevant_date', 'Client signed without applying first'),
+        'Q1_multiple_applications': (4, 'Medium', 'relevant_date', 'Client has multiple application events'),
+        'unknown_values': (5, 'Medium', 'event_date', 'Record has unknown or missing field values'),
+        'sequence_violation': (6, 'High', 'first_applied_date', 'Client events are in the wrong chronological order'),
+        'docs_submitted_analysis': (7, 'Low', 'first_applied', 'Docs submission pattern of an applied client'),
+        'plan_inconsistency': (8, 'Low', 'first_event', 'Client has multiple different plans across events'),
+    }
+    SEVERITY_CODES = {'Low': 1, 'Medium': 2, 'High': 3}
+    
+    # Plan tiers from lowest to highest, used to label plan transitions as upgrades or downgrades
+    PLAN_TIERS = ['Basic', 'Pro', 'Premium']
+    
+    # Bump when the outputs change for the same inputs, to invalidate stored results
+    VERSION = '4'
+    
+    # Files written to output_dir, so stale siblings are detected by FeatureStore.outputs_fresh
+    OUTPUT_PATTERNS = ['f_inconsistencies*.csv', 'f_inconsistency_*.csv', 'f_event_distribution_analysis.csv',
+                       'f_plan_transition*.csv']
+    
+    def __init__(self, staging_csv_path: Optional[str] = None, approximate: bool = False,
+                 relative_error: float = 0.01, stage_precedence: Optional[List[tuple]] = None,
+                 feature_store: Optional[FeatureStore] = None):
         """
         Initialize the inconsistencies processor.
         
         Args:
             staging_csv_path: Path to the staging events CSV file. If None, uses default path.
+            approximate: If True, distinct client counts use HyperLogLog sketches instead of COUNT(DISTINCT)
+            relative_error: Target relative standard error of approximate distinct counts
+            stage_precedence: Event ordering checks in the STAGE_PRECEDENCE format. If None, uses STAGE_PRECEDENCE.
+            feature_store: Store to reuse results of identical runs from. If None, always recomputes.
         """
         if staging_csv_path is None:
             self.staging_csv_path = os.path.join(
@@ -26,10 +71,26 @@ class InconsistenciesProcessor:
         else:
             self.staging_csv_path = staging_csv_path
             
+        self.approximate = approximate
+        self.relative_error = relative_error
+        self.stage_precedence = stage_precedence if stage_precedence is not None else self.STAGE_PRECEDENCE
+        
+        # Registered rules, with the default precedence rules replaced by those of stage_precedence
+        default_precedence_codes = {code for _, _, code, _ in STAGE_PRECEDENCE}
+        self.rules = ([rule for rule in RULES.values() if rule.code not in default_precedence_codes]
+                      + precedence_rules(self.stage_precedence))
+        
+        # Inactivity rules count whole days up to the run date
+        self.as_of = pd.Timestamp.now().normalize()
+        self.client_aggregate = None
+        self.rule_violations = None
+        self.feature_store = feature_store
+        self.exporter = None
         self.staging_df = None
         self.conn = None
         self.output_dir = os.path.join(os.path.dirname(__file__), 'data_output')
         
+    @traced()
     def load_staging_data(self) -> pd.DataFrame:
         """
         Load staging data from CSV file.
@@ -38,13 +99,14 @@ class InconsistenciesProcessor:
             pd.DataFrame: The loaded staging data
         """
         print(f"Loading staging data from: {self.staging_csv_path}")
-        self.staging_df = pd.read_csv(self.staging_csv_path)
+        self.staging_df = compression.read_csv(self.staging_csv_path)
         
         # Convert event_date to datetime
         self.staging_df['event_date'] = pd.to_datetime(self.staging_df['event_date'])
         print(f"Staging data loaded. Shape: {self.staging_df.shape}")
         return self.staging_df
     
+    @traced(input_attr='staging_df')
     def prepare_database(self) -> None:
         """
         Create in-memory SQLite database and load staging data.
@@ -54,6 +116,50 @@ class InconsistenciesProcessor:
         self.staging_df.to_sql('f_staging_events', self.conn, index=False, if_exists='replace')
         print("Database prepared successfully.")
     
+    @traced(input_attr='staging_df')
+    def analyze_rule_violations(self) -> pd.DataFrame:
+        """
+        Evaluate all inconsistency rules in a single vectorized pass.
+        
+        Rules live in `c_features/inconsistency_rules.py`, with the precedence rules built
+        from `stage_precedence`. The rule-based analyses (Q1, Q2, Q3, Q6, unknown values,
+        sequence violations and plan inconsistencies) select their rows from these
+        violations, so the rules are evaluated once per run and a new rule adds no scan
+        of the staging data.
+        
+        Returns:
+            pd.DataFrame: One row per rule violation in a uniform long format
+        """
+        if self.rule_violations is None:
+            print("Evaluating inconsistency rules...")
+            self.client_aggregate = build_client_aggregate(self.staging_df, self.as_of)
+            
+            # Precedence checks may name event types that do not occur in this data
+            for earlier, later, _, _ in self.stage_precedence:
+                for event_type in (earlier, later):
+                    if f'first_{event_type}_date' not in self.client_aggregate.columns:
+                        self.client_aggregate[f'first_{event_type}_date'] = pd.NaT
+            
+            self.rule_violations = evaluate_rules(self.staging_df, self.rules, clients=self.client_aggregate)
+            print(f"Found {len(self.rule_violations)} rule violations across "
+                  f"{self.rule_violations['client_id'].nunique()} clients")
+        return self.rule_violations
+    
+    def _client_violations(self, inconsistency_type: str) -> pd.DataFrame:
+        """
+        Get the rule violations of one inconsistency type with the client aggregate columns.
+        
+        Args:
+            inconsistency_type: Inconsistency type the rules report into
+            
+        Returns:
+            pd.DataFrame: One row per violation, in client and rule order
+        """
+        violations = self.analyze_rule_violations()
+        violations = violations[violations['inconsistency_type'] == inconsistency_type]
+        return violations.join(self.client_aggregate, on='client_id').reset_index(drop=True)
+    
+    @traced(input_attr='staging_df')
     def analyze_churned_without_signed(self) -> pd.DataFrame:
         """
         Q3: Find clients who churned but never signed.
@@ -63,31 +169,13 @@ class InconsistenciesProcessor:
         """
         print("Analyzing Q3: Churned clients who never signed...")
         
-        query = """
-        WITH client_events AS (
-            SELECT 
-                client_id,
-                COUNT(CASE WHEN event_type = 'signed' THEN 1 END) as signed_count,
-                COUNT(CASE WHEN event_type = 'churned' THEN 1 END) as churned_count,
-                MIN(CASE WHEN event_type = 'churned' THEN event_date END) as first_churn_date
-            FROM f_staging_events
-            GROUP BY client_id
-        )
-        SELECT 
-            client_id,
-            'Q3_churned_without_signed' as inconsistency_type,
-            'Client churned without ever signing' as description,
-            first_churn_date as relevant_date,
-            signed_count,
-            churned_count
-        FROM client_events
-        WHERE churned_count > 0 AND signed_count = 0
-        """
-        
-        result_df = pd.read_sql_query(query, self.conn)
+        violations = self._client_violations('Q3_churned_without_signed')
+        result_df = violations[['client_id', 'inconsistency_type', 'description', 'relevant_date',
+                                'signed_count', 'churned_count']]
         print(f"Found {len(result_df)} clients who churned without signing")
         return result_df
     
+    @traced(input_attr='staging_df')
     def analyze_long_inactive_unsigned(self) -> pd.DataFrame:
         """
         Q6: Find unsigned clients with long inactivity (potential at-risk).
@@ -97,31 +185,14 @@ class InconsistenciesProcessor:
         """
         print("Analyzing Q6: Long inactive unsigned clients...")
         
-        query = """
-        WITH client_activity AS (
-            SELECT 
-                client_id,
-                MAX(event_date) as last_event_date,
-                COUNT(CASE WHEN event_type = 'signed' THEN 1 END) as signed_count,
-                julianday('now') - julianday(MAX(event_date)) as days_since_last_event
-            FROM f_staging_events
-            GROUP BY client_id
-        )
-        SELECT 
-            client_id,
-            'Q6_long_inactive_unsigned' as inconsistency_type,
-            'Unsigned client with long inactivity (>60 days) - potential at-risk' as description,
-            last_event_date as relevant_date,
-            CAST(days_since_last_event AS INTEGER) as days_inactive,
-            signed_count
-        FROM client_activity
-        WHERE signed_count = 0 AND days_since_last_event > 60
-        """
-        
-        result_df = pd.read_sql_query(query, self.conn)
+        violations = self._client_violations('Q6_long_inactive_unsigned')
+        result_df = violations.rename(columns={'days_since_last_event': 'days_inactive'})[
+            ['client_id', 'inconsistency_type', 'description', 'relevant_date', 'days_inactive', 'signed_count']
+        ]
         print(f"Found {len(result_df)} unsigned clients with long inactivity")
         return result_df
     
+    @traced(input_attr='staging_df')
     def analyze_signed_without_applied(self) -> pd.DataFrame:
         """
         Q2: Find clients who signed without applying first.
@@ -131,146 +202,96 @@ class InconsistenciesProcessor:
         """
         print("Analyzing Q2: Clients who signed without applying...")
         
-        query = """
-        WITH client_events AS (
-            SELECT 
-                client_id,
-                COUNT(CASE WHEN event_type = 'applied' THEN 1 END) as applied_count,
-                COUNT(CASE WHEN event_type = 'signed' THEN 1 END) as signed_count,
-                MIN(CASE WHEN event_type = 'signed' THEN event_date END) as first_signed_date
-            FROM f_staging_events
-            GROUP BY client_id
-        )
-        SELECT 
-            client_id,
-            'Q2_signed_without_applied' as inconsistency_type,
-            'Client signed without applying first' as description,
-            first_signed_date as relevant_date,
-            applied_count,
-            signed_count
-        FROM client_events
-        WHERE signed_count > 0 AND applied_count = 0
-        """
-        
-        result_df = pd.read_sql_query(query, self.conn)
+        violations = self._client_violations('Q2_signed_without_applied')
+        result_df = violations[['client_id', 'inconsistency_type', 'description', 'relevant_date',
+                                'applied_count', 'signed_count']]
         print(f"Found {len(result_df)} clients who signed without applying")
         return result_df
     
+    @traced(input_attr='staging_df')
     def analyze_unknown_values(self) -> pd.DataFrame:
         """
         Analyze fields with unknown/missing values.
         
+        An event breaking several of the unknown value rules is reported once, with the
+        description of the first of them in rule order.
+        
         Returns:
             pd.DataFrame: Records with unknown or problematic values
         """
         print("Analyzing unknown/missing values across fields...")
         
-        query = """
-        SELECT 
-            client_id,
-            record_id,
-            event_type,
-            event_date,
-            'unknown_values' as inconsistency_type,
-            CASE 
-                WHEN plan = 'Unknown' THEN 'Plan field has Unknown value'
-                WHEN sales_rep_id = -1 THEN 'Sales rep ID is -1 (missing/unknown)'
-                WHEN region IS NULL OR region = '' THEN 'Region field is missing'
-                WHEN marketing_channel IS NULL OR marketing_channel = '' THEN 'Marketing channel is missing'
-                WHEN source_system IS NULL OR source_system = '' THEN 'Source system is missing'
-                ELSE 'Other unknown value detected'
-            END as description,
-            plan,
-            sales_rep_id,
-            region,
-            marketing_channel,
-            source_system
-        FROM f_staging_events
-        WHERE plan = 'Unknown' 
-           OR sales_rep_id = -1 
-           OR region IS NULL OR region = ''
-           OR marketing_channel IS NULL OR marketing_channel = ''
-           OR source_system IS NULL OR source_system = ''
-        ORDER BY client_id, event_date
-        """
-        
-        result_df = pd.read_sql_query(query, self.conn)
+        violations = self.analyze_rule_violations()
+        violations = violations[violations['inconsistency_type'] == 'unknown_values']
+        first_violations = violations.drop_duplicates('record_id')[['record_id', 'inconsistency_type', 'description']]
+        
+        events = self.staging_df[['client_id', 'record_id', 'event_type', 'event_date', 'plan', 'sales_rep_id',
+                                  'region', 'marketing_channel', 'source_system']]
+        result_df = events.merge(first_violations.astype({'record_id': events['record_id'].dtype}), on='record_id')
+        result_df = result_df.sort_values(['client_id', 'event_date'], kind='stable', ignore_index=True)[
+            ['client_id', 'record_id', 'event_type', 'event_date', 'inconsistency_type', 'description',
+             'plan', 'sales_rep_id', 'region', 'marketing_channel', 'source_system']
+        ]
         print(f"Found {len(result_df)} records with unknown/missing values")
         return result_df
     
+    @traced(input_attr='staging_df')
     def analyze_event_sequence_violations(self) -> pd.DataFrame:
         """
         Analyze logical sequence violations (e.g., signed before applied, churned before signed).
         
+        Every check in `stage_precedence` is a precedence rule of the rule engine. A client
+        breaking several checks is reported once per check, with the client's total in
+        `violation_count` and the first date of every checked event type.
+        
         Returns:
-            pd.DataFrame: Events that violate logical sequence
+            pd.DataFrame: Sequence violations, one row per client and violated check
         """
         print("Analyzing event sequence violations...")
         
-        query = """
-        WITH client_event_dates AS (
-            SELECT 
-                client_id,
-                MIN(CASE WHEN event_type = 'applied' THEN event_date END) as first_applied_date,
-                MIN(CASE WHEN event_type = 'signed' THEN event_date END) as first_signed_date,
-                MIN(CASE WHEN event_type = 'docs_submitted' THEN event_date END) as first_docs_date,
-                MIN(CASE WHEN event_type = 'rejected' THEN event_date END) as first_rejected_date,
-                MIN(CASE WHEN event_type = 'churned' THEN event_date END) as first_churned_date
-            FROM f_staging_events
-            GROUP BY client_id
-        ),
-        violations AS (
-            SELECT 
-                client_id,
-                CASE 
-                    WHEN first_signed_date < first_applied_date THEN 'signed_before_applied'
-                    WHEN first_docs_date < first_applied_date THEN 'docs_submitted_before_applied'
-                    WHEN first_rejected_date < first_applied_date THEN 'rejected_before_applied'
-                    WHEN first_churned_date IS NOT NULL AND first_signed_date IS NOT NULL 
-                         AND first_churned_date < first_signed_date THEN 'churned_before_signed'
-                    ELSE NULL
-                END as violation_type,
-                first_applied_date,
-                first_signed_date,
-                first_docs_date,
-                first_rejected_date,
-                first_churned_date
-            FROM client_event_dates
-        )
-        SELECT 
-            client_id,
-            'sequence_violation' as inconsistency_type,
-            CASE violation_type
-                WHEN 'signed_before_applied' THEN 'Client signed before applying'
-                WHEN 'docs_submitted_before_applied' THEN 'Client submitted docs before applying'
-                WHEN 'rejected_before_applied' THEN 'Client was rejected before applying'
-                WHEN 'churned_before_signed' THEN 'Client churned before signing'
-                ELSE 'Unknown sequence violation'
-            END as description,
-            violation_type,
-            first_applied_date,
-            first_signed_date,
-            first_docs_date,
-            first_rejected_date,
-            first_churned_date
-        FROM violations
-        WHERE violation_type IS NOT NULL
-        ORDER BY client_id
-        """
-        
-        result_df = pd.read_sql_query(query, self.conn)
-        print(f"Found {len(result_df)} sequence violations")
+        # Legacy output names of the first-date columns
+        date_column_names = {'docs_submitted': 'first_docs_date'}
+        
+        event_types = ['applied', 'signed', 'docs_submitted', 'rejected', 'churned']
+        for earlier, later, _, _ in self.stage_precedence:
+            event_types += [event for event in (earlier, later) if event not in event_types]
+        
+        violations = self._client_violations('sequence_violation')
+        result_df = pd.DataFrame({
+            'client_id': violations['client_id'],
+            'inconsistency_type': violations['inconsistency_type'],
+            'description': violations['description'],
+            'violation_type': violations['rule_code'],
+            'violation_count': violations.groupby('client_id')['client_id'].transform('size')
+        })
+        for event_type in event_types:
+            column = date_column_names.get(event_type, f'first_{event_type}_date')
+            result_df[column] = violations[f'first_{event_type}_date']
+        
+        print(f"Found {len(result_df)} sequence violations across {result_df['client_id'].nunique()} clients")
         return result_df
     
+    @traced(input_attr='staging_df')
     def analyze_event_type_distribution(self) -> pd.DataFrame:
         """
         Analyze the distribution of event types to understand data patterns.
         
+        In approximate mode, unique client counts come from mergeable sketches, updated
+        while the staging file is streamed in chunks, and the output is flagged with
+        `is_approximate` and the relative error of the counts.
+        
         Returns:
             pd.DataFrame: Event type counts and patterns
         """
         print("Analyzing event type distribution...")
         
+        if self.approximate:
+            sketch_processor = SketchStatsProcessor(self.staging_csv_path, relative_error=self.relative_error)
+            sketch_processor.load_staging_chunks(durations=False)
+            result_df = sketch_processor.create_event_type_distribution()
+            print(f"Event type analysis completed. Found {len(result_df)} event types")
+            return result_df
+        
         query = """
         SELECT 
             event_type,
@@ -290,6 +311,7 @@ class InconsistenciesProcessor:
         print(f"Event type analysis completed. Found {len(result_df)} event types")
         return result_df
     
+    @traced(input_attr='staging_df')
     def analyze_docs_submitted_pattern(self) -> pd.DataFrame:
         """
         Specifically analyze why docs_submitted events are rare.
@@ -361,6 +383,7 @@ class InconsistenciesProcessor:
         
         return analysis_df
     
+    @traced(input_attr='staging_df')
     def analyze_plan_inconsistencies(self) -> pd.DataFrame:
         """
         Analyze plan changes and inconsistencies within the same client.
@@ -370,34 +393,65 @@ class InconsistenciesProcessor:
         """
         print("Analyzing plan inconsistencies...")
         
-        query = """
-        WITH client_plans AS (
-            SELECT 
-                client_id,
-                COUNT(DISTINCT plan) as unique_plans,
-                GROUP_CONCAT(DISTINCT plan) as all_plans,
-                MIN(event_date) as first_event,
-                MAX(event_date) as last_event
-            FROM f_staging_events
-            GROUP BY client_id
-        )
-        SELECT 
-            client_id,
-            'plan_inconsistency' as inconsistency_type,
-            'Client has multiple different plans across events' as description,
-            unique_plans,
-            all_plans,
-            first_event,
-            last_event
-        FROM client_plans
-        WHERE unique_plans > 1
-        ORDER BY unique_plans DESC, client_id
-        """
-        
-        result_df = pd.read_sql_query(query, self.conn)
+        violations = self._client_violations('plan_inconsistency')
+        result_df = violations.rename(columns={'first_event_date': 'first_event', 'last_event_date': 'last_event'})[
+            ['client_id', 'inconsistency_type', 'description', 'unique_plans', 'all_plans', 'first_event', 'last_event']
+        ].sort_values(['unique_plans', 'client_id'], ascending=[False, True], ignore_index=True)
         print(f"Found {len(result_df)} clients with plan inconsistencies")
         return result_df
 
+    @traced(input_attr='staging_df')
+    def analyze_plan_transitions(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Detect ordered plan changes within each client's event history.
+        
+        Events are sorted once by client and date, and each event's plan is compared with
+        the previous event's plan through a shifted column. Transitions between ranked
+        tiers are labelled upgrade/downgrade; any transition involving an unranked plan
+        (e.g. Unknown) is labelled unranked.
+        
+        Returns:
+            tuple: (One row per plan transition, Transition counts per from/to plan pair)
+        """
+        print("Analyzing plan transitions...")
+        
+        events = self.staging_df.sort_values(['client_id', 'event_date', 'record_id'], kind='mergesort')
+        client_ids = events['client_id'].to_numpy()
+        plans = events['plan'].to_numpy()
+        
+        previous_client_ids = np.roll(client_ids, 1)
+        previous_plans = np.roll(plans, 1)
+        is_transition = (client_ids == previous_client_ids) & (plans != previous_plans)
+        is_transition[:1] = False
+        
+        transitions_df = pd.DataFrame({
+            'client_id': client_ids[is_transition],
+            'record_id': events['record_id'].to_numpy()[is_transition],
+            'from_plan': previous_plans[is_transition],
+            'to_plan': plans[is_transition],
+            'transition_date': events['event_date'].to_numpy()[is_transition]
+        })
+        
+        tier_rank = {plan: rank for rank, plan in enumerate(self.PLAN_TIERS)}
+        from_rank = transitions_df['from_plan'].map(tier_rank)
+        to_rank = transitions_df['to_plan'].map(tier_rank)
+        transitions_df['direction'] = np.select(
+            [from_rank.isna() | to_rank.isna(), to_rank > from_rank],
+            ['unranked', 'upgrade'],
+            default='downgrade'
+        )
+        
+        counts_df = (
+            transitions_df.groupby(['from_plan', 'to_plan', 'direction'])
+            .agg(transition_count=('client_id', 'size'), client_count=('client_id', 'nunique'))
+            .reset_index()
+            .sort_values('transition_count', ascending=False, ignore_index=True)
+        )
+        
+        print(f"Found {len(transitions_df)} plan transitions across {transitions_df['client_id'].nunique()} clients")
+        return transitions_df, counts_df
+    
+    @traced(input_attr='staging_df')
     def analyze_multiple_applications(self) -> pd.DataFrame:
         """
         Q1: Find clients with multiple application events.
@@ -407,54 +461,15 @@ class InconsistenciesProcessor:
         """
         print("Analyzing Q1: Clients with multiple applications...")
         
-        # First get clients with multiple applications
-        multiple_apps_query = """
-        SELECT 
-            client_id,
-            COUNT(*) as application_count
-        FROM f_staging_events
-        WHERE event_type = 'applied'
-        GROUP BY client_id
-        HAVING COUNT(*) > 1
-        """
-        
-        multiple_apps_df = pd.read_sql_query(multiple_apps_query, self.conn)
-        
-        if len(multiple_apps_df) == 0:
-            print("No clients with multiple applications found")
-            return pd.DataFrame(columns=['client_id', 'inconsistency_type', 'description', 
-                                       'relevant_date', 'application_count', 'date_range_days'])
-        
-        # Get detailed information for these clients
-        client_ids = multiple_apps_df['client_id'].tolist()
-        client_ids_str = ','.join(map(str, client_ids))
-        
-        detail_query = f"""
-        WITH app_details AS (
-            SELECT 
-                client_id,
-                COUNT(*) as application_count,
-                MIN(event_date) as first_application,
-                MAX(event_date) as last_application,
-                julianday(MAX(event_date)) - julianday(MIN(event_date)) as date_range_days
-            FROM f_staging_events
-            WHERE event_type = 'applied' AND client_id IN ({client_ids_str})
-            GROUP BY client_id
-        )
-        SELECT 
-            client_id,
-            'Q1_multiple_applications' as inconsistency_type,
-            'Client has multiple application events' as description,
-            first_application as relevant_date,
-            application_count,
-            CAST(date_range_days AS INTEGER) as date_range_days
-        FROM app_details
-        """
-        
-        result_df = pd.read_sql_query(detail_query, self.conn)
+        violations = self._client_violations('Q1_multiple_applications')
+        result_df = violations.rename(columns={'applied_count': 'application_count'})[
+            ['client_id', 'inconsistency_type', 'description', 'relevant_date', 'application_count']
+        ]
+        result_df['date_range_days'] = (violations['last_applied_date'] - violations['first_applied_date']).dt.days
         print(f"Found {len(result_df)} clients with multiple applications")
         return result_df
     
+    @traced(input_attr='staging_df')
     def get_client_event_details(self, client_ids: List[int]) -> pd.DataFrame:
         """
         Get detailed event information for specific clients.
@@ -465,9 +480,6 @@ class InconsistenciesProcessor:
         Returns:
             pd.DataFrame: Detailed events for the specified clients
         """
-        if not client_ids:
-            return pd.DataFrame()
-            
         client_ids_str = ','.join(map(str, client_ids))
         
         query = f"""
@@ -489,87 +501,140 @@ class InconsistenciesProcessor:
         
         return pd.read_sql_query(query, self.conn)
     
-    def create_inconsistencies_summary(self) -> pd.DataFrame:
+    @traced(input_attr='staging_df')
+    def create_inconsistencies_summary(self) -> tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
         """
-        Create a comprehensive inconsistencies summary table.
+        Create the compact inconsistencies summary.
+        
+        Every inconsistency becomes one row of a narrow core table (row_id, client_id,
+        type_code, severity_code, relevant_date). The type-specific columns of each
+        analysis are kept in a separate side table per inconsistency type, joined to
+        the core table on row_id, instead of one wide, mostly empty table.
         
         Returns:
-            pd.DataFrame: Combined inconsistencies analysis
+            tuple: (Core inconsistencies table, Side tables of every inconsistency type, empty if it has no rows)
         """
         print("Creating comprehensive inconsistencies summary...")
         
         # Analyze all inconsistency types
-        q3_results = self.analyze_churned_without_signed()
-        q6_results = self.analyze_long_inactive_unsigned()
-        q2_results = self.analyze_signed_without_applied()
-        q1_results = self.analyze_multiple_applications()
-        
-        # New enhanced analyses
-        unknown_values_results = self.analyze_unknown_values()
-        sequence_violations_results = self.analyze_event_sequence_violations()
-        event_distribution_results = self.analyze_event_type_distribution()
-        docs_pattern_results = self.analyze_docs_submitted_pattern()
-        plan_inconsistencies_results = self.analyze_plan_inconsistencies()
-        
-        # Combine all results
-        all_inconsistencies = []
-        
-        for df in [q3_results, q6_results, q2_results, q1_results, 
-                  unknown_values_results, sequence_violations_results, 
-                  docs_pattern_results, plan_inconsistencies_results]:
-            if not df.empty:
-                all_inconsistencies.append(df)
-        
-        if all_inconsistencies:
-            combined_df = pd.concat(all_inconsistencies, ignore_index=True, sort=False)
+        results = {
+            'Q3_churned_without_signed': self.analyze_churned_without_signed(),
+            'Q6_long_inactive_unsigned': self.analyze_long_inactive_unsigned(),
+            'Q2_signed_without_applied': self.analyze_signed_without_applied(),
+            'Q1_multiple_applications': self.analyze_multiple_applications(),
+            'unknown_values': self.analyze_unknown_values(),
+            'sequence_violation': self.analyze_event_sequence_violations(),
+            'docs_submitted_analysis': self.analyze_docs_submitted_pattern(),
+            'plan_inconsistency': self.analyze_plan_inconsistencies()
+        }
+        
+        core_frames = []
+        details = {}
+        next_row_id = 0
+        for inconsistency_type, df in results.items():
+            if df.empty:
+                # Empty side tables are still written, replacing the rows of a previous run
+                details[inconsistency_type] = pd.DataFrame(columns=['row_id', 'client_id'])
+                continue
+            
+            type_code, severity, date_column, description = self.INCONSISTENCY_TYPES[inconsistency_type]
+            row_ids = np.arange(next_row_id, next_row_id + len(df))
+            next_row_id += len(df)
+            core_frames.append(pd.DataFrame({
+                'row_id': row_ids,
+                'client_id': df['client_id'].to_numpy(),
+                'type_code': type_code,
+                'severity_code': self.SEVERITY_CODES[severity],
+                'relevant_date': pd.to_datetime(df[date_column]).to_numpy()
+            }))
             
-            # Add summary statistics
-            summary_stats = combined_df['inconsistency_type'].value_counts().reset_index()
-            summary_stats.columns = ['inconsistency_type', 'count']
+            # Descriptions equal to the type description are stored once in the type dictionary
+            side_table = df.drop(columns=['inconsistency_type']).reset_index(drop=True)
+            if (side_table['description'] == description).all():
+                side_table = side_table.drop(columns=['description'])
+            side_table.insert(0, 'row_id', row_ids)
+            details[inconsistency_type] = side_table
+        
+        if core_frames:
+            core_df = pd.concat(core_frames, ignore_index=True)
             
             print(f"\nInconsistencies Summary:")
-            for _, row in summary_stats.iterrows():
-                print(f"  {row['inconsistency_type']}: {row['count']} cases")
+            type_names = {code: name for name, (code, _, _, _) in self.INCONSISTENCY_TYPES.items()}
+            for type_code, count in core_df['type_code'].value_counts().items():
+                print(f"  {type_names[type_code]}: {count} cases")
             
-            return combined_df
+            return core_df, details
         else:
             print("No inconsistencies found")
-            return pd.DataFrame()
+            return pd.DataFrame(columns=['row_id', 'client_id', 'type_code', 'severity_code', 'relevant_date']), details
+    
+    @traced()
+    def create_inconsistency_types(self) -> pd.DataFrame:
+        """
+        Create the dictionary of inconsistency type and severity codes.
+        
+        Returns:
+            pd.DataFrame: One row per inconsistency type
+        """
+        return pd.DataFrame([
+            {
+                'type_code': type_code,
+                'inconsistency_type': inconsistency_type,
+                'severity_code': self.SEVERITY_CODES[severity],
+                'severity': severity,
+                'description': description,
+                'relevant_date_column': date_column
+            }
+            for inconsistency_type, (type_code, severity, date_column, description) in self.INCONSISTENCY_TYPES.items()
+        ])
     
-    def export_to_csv(self, inconsistencies_df: pd.DataFrame) -> str:
+    @traced()
+    def export_to_csv(self, inconsistencies_df: pd.DataFrame, details: Dict[str, pd.DataFrame]) -> str:
         """
-        Export inconsistencies analysis to CSV.
+        Export the compact inconsistencies layout to CSV.
+        
+        Writes the core table to `f_inconsistencies.csv`, the type dictionary to
+        `f_inconsistency_types.csv` and one `f_inconsistencies_<type>.csv` side table per
+        inconsistency type, including empty ones, so no side table of a previous run is left
+        behind. With an exporter set, the files are queued on its writer pool.
         
         Args:
-            inconsistencies_df: The inconsistencies dataframe to export
+            inconsistencies_df: The core inconsistencies dataframe to export
+            details: Side tables keyed by inconsistency type
             
         Returns:
-            str: Path to the exported CSV file
+            str: Path to the exported core CSV file
         """
         print("Exporting inconsistencies data to CSV...")
         
         # Create output directory and write to CSV
         os.makedirs(self.output_dir, exist_ok=True)
         output_path = os.path.join(self.output_dir, 'f_inconsistencies.csv')
-        inconsistencies_df.to_csv(output_path, index=False)
+        write_csv(inconsistencies_df, output_path, self.exporter)
+        
+        types_path = os.path.join(self.output_dir, 'f_inconsistency_types.csv')
+        write_csv(self.create_inconsistency_types(), types_path, self.exporter)
+        
+        for inconsistency_type, side_table in details.items():
+            side_table_path = os.path.join(self.output_dir, f'f_inconsistencies_{inconsistency_type}.csv')
+            write_csv(side_table, side_table_path, self.exporter)
         
-        print(f"Inconsistencies data written to '{output_path}'")
+        print(f"Inconsistencies data exported to '{output_path}' ({len(details)} side tables)")
         return output_path
     
+    @traced()
     def export_client_details(self, inconsistencies_df: pd.DataFrame) -> str:
         """
         Export detailed client events for inconsistent clients.
         
+        The file is written even without inconsistencies, replacing the rows of a previous run.
+        
         Args:
-            inconsistencies_df: The inconsistencies dataframe
+            inconsistencies_df: The core inconsistencies dataframe
             
         Returns:
             str: Path to the exported detailed CSV file
         """
-        if inconsistencies_df.empty:
-            print("No inconsistencies to export details for")
-            return ""
-            
         print("Exporting detailed client events for inconsistent clients...")
         
         # Get unique client IDs from inconsistencies
@@ -581,11 +646,12 @@ class InconsistenciesProcessor:
         # Create output path
         os.makedirs(self.output_dir, exist_ok=True)
         details_output_path = os.path.join(self.output_dir, 'f_inconsistencies_client_details.csv')
-        details_df.to_csv(details_output_path, index=False)
+        write_csv(details_df, details_output_path, self.exporter)
         
-        print(f"Client details written to '{details_output_path}'")
+        print(f"Client details exported to '{details_output_path}'")
         return details_output_path
     
+    @traced()
     def process_inconsistencies_analysis(self) -> tuple[str, str]:
         """
         Execute the complete inconsistencies analysis process.
@@ -594,21 +660,57 @@ class InconsistenciesProcessor:
             tuple: (Path to inconsistencies CSV, Path to client details CSV)
         """
         try:
+            # Serve identical runs from the feature store; inactivity rules depend on the run date
+            if self.feature_store is not None:
+                params = {'approximate': self.approximate, 'relative_error': self.relative_error,
+                          'stage_precedence': self.stage_precedence, 'run_date': self.as_of.date()}
+                store_key = self.feature_store.make_key(self.staging_csv_path, type(self).__name__, self.VERSION, params)
+                restored = self.feature_store.restore(store_key, self.output_dir)
+                if restored is not None:
+                    return (os.path.join(self.output_dir, 'f_inconsistencies.csv'),
+                            os.path.join(self.output_dir, 'f_inconsistencies_client_details.csv'))
+            
+            # Outputs are written on a writer pool while the remaining analyses run
+            self.exporter = AsyncExporter()
+            
             # Execute all steps in sequence
             self.load_staging_data()
             self.prepare_database()
-            inconsistencies_df = self.create_inconsistencies_summary()
+            inconsistencies_df, details = self.create_inconsistencies_summary()
             
-            summary_path = self.export_to_csv(inconsistencies_df)
+            summary_path = self.export_to_csv(inconsistencies_df, details)
             details_path = self.export_client_details(inconsistencies_df)
             
             # Export event distribution analysis separately (different structure)
             event_distribution_results = self.analyze_event_type_distribution()
-            event_dist_path = ""
-            if not event_distribution_results.empty:
-                event_dist_path = os.path.join(self.output_dir, 'f_event_distribution_analysis.csv')
-                event_distribution_results.to_csv(event_dist_path, index=False)
-                print(f"Event distribution analysis saved to: {event_dist_path}")
+            event_dist_path = os.path.join(self.output_dir, 'f_event_distribution_analysis.csv')
+            write_csv(event_distribution_results, event_dist_path, self.exporter)
+            print(f"Event distribution analysis exported to: {event_dist_path}")
+            
+            # Export ordered plan transitions and their counts
+            plan_transitions, plan_transition_counts = self.analyze_plan_transitions()
+            plan_transitions_path = os.path.join(self.output_dir, 'f_plan_transitions.csv')
+            write_csv(plan_transitions, plan_transitions_path, self.exporter)
+            plan_transition_counts_path = os.path.join(self.output_dir, 'f_plan_transition_counts.csv')
+            write_csv(plan_transition_counts, plan_transition_counts_path, self.exporter)
+            print(f"Plan transitions exported to: {plan_transitions_path} and {plan_transition_counts_path}")
+            
+            # Export rule engine violations (uniform long format)
+            rule_violations = self.analyze_rule_violations()
+            rule_violations_path = os.path.join(self.output_dir, 'f_inconsistency_rules.csv')
+            write_csv(rule_violations, rule_violations_path, self.exporter)
+            print(f"Rule violations exported to: {rule_violations_path}")
+            
+            # All outputs must be on disk before they are stored
+            self.exporter.wait()
+            
+            if self.feature_store is not None:
+                output_files = [
+                    summary_path, details_path, event_dist_path, plan_transitions_path,
+                    plan_transition_counts_path, rule_violations_path,
+                    os.path.join(self.output_dir, 'f_inconsistency_types.csv')
+                ] + [os.path.join(self.output_dir, f'f_inconsistencies_{name}.csv') for name in details]
+                self.feature_store.put(store_key, output_files, type(self).__name__, self.VERSION, params)
             
             print("\nInconsistencies analysis completed successfully!")
             return summary_path, details_path
@@ -619,6 +721,8 @@ class InconsistenciesProcessor:
         finally:
             if self.conn:
                 self.conn.close()
+            if self.exporter:
+                self.exporter.shutdown()
     
     @staticmethod
     def get_business_questions() -> Dict[str, str]:
@@ -643,7 +747,10 @@ class InconsistenciesProcessor:
 
 # Main execution
 if __name__ == "__main__":
-    processor = InconsistenciesProcessor()
+    args = argument_parser('Build the inconsistencies features.').parse_args()
+    configure(args)
+
+    processor = InconsistenciesProcessor(feature_store=FeatureStore())
     summary_file, details_file = processor.process_inconsistencies_analysis()
     
     # Print business questions for reference
@@ -0,0 +1,319 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+from typing import Optional
+
+# Add the parent directory to the path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, preview, traced
+
+
+class JourneyPathsProcessor:
+    """
+    A class to mine client journey paths from staging events data.
+
+    Each client's events are ordered by date into one event type sequence
+    (e.g. applied>applied>signed>churned). Distinct paths are counted,
+    consecutive steps are counted as edges for a Sankey diagram, and
+    event-to-next-event pairs give a Markov transition matrix.
+    """
+
+    # Separator between event types in a journey path
+    PATH_SEPARATOR = '>'
+
+    # Markov state following the last event of a client
+    END_STATE = 'end'
+
+    # Dwell time quantiles reported for each state
+    DWELL_QUANTILES = {'median_dwell_days': 0.5, 'p90_dwell_days': 0.9}
+
+    def __init__(self, staging_csv_path: Optional[str] = None, collapse_repeats: bool = False,
+                 segment_column: Optional[str] = None):
+        """
+        Initialize the journey paths processor.
+
+        Args:
+            staging_csv_path: Path to the staging events CSV file. If None, uses default path.
+            collapse_repeats: If True, consecutive events of the same type count as one step
+            segment_column: Staging column to split the transition matrix by (e.g. plan). If None, no split.
+        """
+        if staging_csv_path is None:
+            self.staging_csv_path = os.path.join(
+                os.path.dirname(os.path.dirname(__file__)),
+                'b_staging',
+                'data_output',
+                'f_staging_events.csv'
+            )
+        else:
+            self.staging_csv_path = staging_csv_path
+
+        self.collapse_repeats = collapse_repeats
+        self.segment_column = segment_column
+        self.staging_df = None
+        self.output_dir = os.path.join(os.path.dirname(__file__), 'data_output')
+
+    @traced()
+    def load_staging_data(self) -> pd.DataFrame:
+        """
+        Load the staging columns needed for journey paths from CSV file.
+
+        Returns:
+            pd.DataFrame: The loaded staging data
+        """
+        print(f"Loading staging data from: {self.staging_csv_path}")
+        columns = ['record_id', 'client_id', 'event_type', 'event_date']
+        if self.segment_column is not None:
+            columns.append(self.segment_column)
+        self.staging_df = compression.read_csv(self.staging_csv_path, usecols=columns, dtype={'event_type': 'category'})
+
+        # Convert event_date to datetime
+        self.staging_df['event_date'] = pd.to_datetime(self.staging_df['event_date'])
+        print(f"Staging data loaded. Shape: {self.staging_df.shape}")
+        return self.staging_df
+
+    @traced(input_attr='staging_df')
+    def create_journey_steps(self) -> pd.DataFrame:
+        """
+        Order every client's events into numbered journey steps.
+
+        Events are sorted once by client, date and record id; with `collapse_repeats`,
+        an event of the same type as the client's previous event is dropped.
+
+        Returns:
+            pd.DataFrame: One row per step with client_id, step (from 1) and event_type
+        """
+        print("Creating journey steps...")
+
+        steps = self.staging_df.sort_values(['client_id', 'event_date', 'record_id'], kind='stable')
+        client_ids = steps['client_id'].to_numpy()
+        event_types = steps['event_type'].to_numpy()
+        # Sliced to the row count, so an empty staging frame gives an empty mask
+        new_client = np.r_[True, client_ids[1:] != client_ids[:-1]][:len(client_ids)]
+
+        if self.collapse_repeats:
+            repeated = ~new_client & np.r_[False, event_types[1:] == event_types[:-1]]
+            steps = steps[~repeated]
+            new_client = new_client[~repeated]
+
+        steps = steps[['client_id', 'event_type']].reset_index(drop=True)
+        # Step number = position since the client's first row
+        positions = np.arange(len(steps))
+        steps['step'] = positions - np.maximum.accumulate(np.where(new_client, positions, 0)) + 1
+
+        print(f"Journey steps created. {len(steps)} steps for {steps['client_id'].nunique()} clients")
+        return steps[['client_id', 'step', 'event_type']]
+
+    @traced()
+    def create_client_paths(self, steps: pd.DataFrame) -> pd.DataFrame:
+        """
+        Join every client's steps into one journey path.
+
+        Args:
+            steps: The journey steps dataframe from `create_journey_steps`
+
+        Returns:
+            pd.DataFrame: One row per client with path and path_length
+        """
+        print("Creating client journey paths...")
+
+        # Steps are already in order, so each group joins its event types as they come
+        grouped = steps['event_type'].astype(str).groupby(steps['client_id'], sort=False)
+        client_paths = grouped.agg(self.PATH_SEPARATOR.join).rename('path')
+        client_paths = pd.concat([client_paths, grouped.size().rename('path_length')], axis=1).reset_index()
+
+        print(f"Client journey paths created for {len(client_paths)} clients")
+        return client_paths
+
+    @traced()
+    def create_path_counts(self, client_paths: pd.DataFrame) -> pd.DataFrame:
+        """
+        Count clients per distinct journey path.
+
+        Args:
+            client_paths: The client paths dataframe from `create_client_paths`
+
+        Returns:
+            pd.DataFrame: One row per distinct path with path_length, client_count and client_share
+        """
+        print("Counting distinct journey paths...")
+
+        path_counts = (
+            client_paths.groupby(['path', 'path_length'])
+            .size()
+            .reset_index(name='client_count')
+            .sort_values(['client_count', 'path'], ascending=[False, True], ignore_index=True)
+        )
+        path_counts['client_share'] = path_counts['client_count'] / path_counts['client_count'].sum()
+
+        print(f"Found {len(path_counts)} distinct journey paths")
+        return path_counts
+
+    @traced()
+    def create_sankey_edges(self, steps: pd.DataFrame) -> pd.DataFrame:
+        """
+        Count transitions between consecutive journey steps for a Sankey diagram.
+
+        Nodes are numbered by step (e.g. '1:applied' -> '2:signed') so that repeated
+        event types do not create cycles.
+
+        Args:
+            steps: The journey steps dataframe from `create_journey_steps`
+
+        Returns:
+            pd.DataFrame: One row per edge with step, source, target, from/to event type and client_count
+        """
+        print("Creating Sankey edges...")
+
+        same_client = steps['client_id'].to_numpy()[1:] == steps['client_id'].to_numpy()[:-1]
+        edges = pd.DataFrame({
+            'step': steps['step'].to_numpy()[:-1][same_client],
+            'from_event_type': steps['event_type'].astype(str).to_numpy()[:-1][same_client],
+            'to_event_type': steps['event_type'].astype(str).to_numpy()[1:][same_client]
+        })
+
+        edge_counts = (
+            edges.groupby(['step', 'from_event_type', 'to_event_type'])
+            .size()
+            .reset_index(name='client_count')
+        )
+        edge_counts.insert(1, 'source', edge_counts['step'].astype(str) + ':' + edge_counts['from_event_type'])
+        edge_counts.insert(2, 'target', (edge_counts['step'] + 1).astype(str) + ':' + edge_counts['to_event_type'])
+
+        print(f"Sankey edges created. {len(edge_counts)} edges")
+        return edge_counts
+
+    @traced(input_attr='staging_df')
+    def create_transition_matrix(self) -> pd.DataFrame:
+        """
+        Create the event type Markov transition matrix with dwell times.
+
+        Events are sorted once and paired with the client's next event by a shift;
+        a client's last event transitions to the end state. Transitions are split by
+        the segment of the source event when `segment_column` is set.
+
+        Dwell time is the time spent in a state before the next event, so its quantiles
+        are taken over all transitions out of the from state (transitions to the end state have none)
+        and repeated on each of that state's rows.
+
+        Returns:
+            pd.DataFrame: One row per segment and (from, to) state pair of the full N x N
+                matrix with transition_count, probability and the from state's dwell time quantiles in days
+        """
+        print("Creating event type transition matrix...")
+
+        events = self.staging_df.sort_values(['client_id', 'event_date', 'record_id'], kind='stable')
+        client_ids = events['client_id'].to_numpy()
+        # Sliced to the row count, so an empty staging frame gives an empty matrix
+        is_last = np.r_[client_ids[1:] != client_ids[:-1], True][:len(client_ids)]
+
+        from_states = events['event_type'].astype(str).to_numpy()
+        to_states = np.where(is_last, self.END_STATE, np.append(from_states[1:], self.END_STATE))
+        event_dates = events['event_date'].to_numpy()
+        next_dates = np.append(event_dates[1:], np.datetime64('NaT'))
+        dwell_days = np.where(is_last, np.nan, (next_dates - event_dates) / np.timedelta64(1, 'D'))
+
+        segments = (events[self.segment_column].fillna('Unknown').astype(str).to_numpy()
+                    if self.segment_column is not None else np.full(len(events), 'All'))
+        pairs = pd.DataFrame({
+            'segment': segments,
+            'from_event_type': from_states,
+            'to_event_type': to_states,
+            'dwell_days': dwell_days
+        })
+
+        cells = pairs.groupby(['segment', 'from_event_type', 'to_event_type']).size().rename('transition_count')
+        dwell = pairs.groupby(['segment', 'from_event_type'])['dwell_days']
+        state_dwell = pd.concat(
+            [dwell.quantile(q).rename(name) for name, q in self.DWELL_QUANTILES.items()], axis=1
+        )
+
+        # Fill every cell of the N x N matrix, including transitions never observed
+        states = sorted(set(from_states))
+        full_index = pd.MultiIndex.from_product(
+            [sorted(set(segments)), states, states + [self.END_STATE]],
+            names=['segment', 'from_event_type', 'to_event_type']
+        )
+        matrix = cells.reindex(full_index, fill_value=0).to_frame()
+
+        from_totals = matrix.groupby(level=['segment', 'from_event_type'])['transition_count'].transform('sum')
+        matrix['probability'] = (matrix['transition_count'] / from_totals).where(from_totals > 0, 0.0)
+
+        matrix_df = matrix.reset_index().merge(
+            state_dwell.reset_index(), on=['segment', 'from_event_type'], how='left'
+        )
+        if self.segment_column is not None:
+            matrix_df.insert(0, 'segment_column', self.segment_column)
+
+        print(f"Transition matrix created: {len(states)} states, {int(matrix_df['transition_count'].sum())} transitions")
+        return matrix_df
+
+    @traced()
+    def export_to_csv(self, path_counts: pd.DataFrame, edge_counts: pd.DataFrame,
+                      matrix_df: Optional[pd.DataFrame] = None) -> tuple[str, str]:
+        """
+        Export the journey path counts, Sankey edges and transition matrix to CSV.
+
+        Args:
+            path_counts: The distinct path counts
+            edge_counts: The Sankey edge counts
+            matrix_df: The transition matrix. If None, it is not exported.
+
+        Returns:
+            tuple: (Path to path counts CSV, Path to Sankey edges CSV)
+        """
+        print("Exporting journey paths to CSV...")
+
+        preview(path_counts, "Top Journey Paths")
+
+        # Create output directory and write to CSV
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths_path = os.path.join(self.output_dir, 'f_journey_paths.csv')
+        paths_path = compression.write_csv(path_counts, paths_path)
+        edges_path = os.path.join(self.output_dir, 'f_journey_sankey_edges.csv')
+        edges_path = compression.write_csv(edge_counts, edges_path)
+        if matrix_df is not None:
+            matrix_path = os.path.join(self.output_dir, 'f_event_transition_matrix.csv')
+            matrix_path = compression.write_csv(matrix_df, matrix_path)
+            print(f"Transition matrix written to '{matrix_path}'")
+
+        print(f"Journey paths written to '{paths_path}' and '{edges_path}'")
+        return paths_path, edges_path
+
+    @traced()
+    def process_journey_paths(self) -> tuple[str, str]:
+        """
+        Execute the complete journey paths process.
+
+        Returns:
+            tuple: (Path to path counts CSV, Path to Sankey edges CSV)
+        """
+        try:
+            # Execute all steps in sequence
+            self.load_staging_data()
+            steps = self.create_journey_steps()
+            client_paths = self.create_client_paths(steps)
+            path_counts = self.create_path_counts(client_paths)
+            edge_counts = self.create_sankey_edges(steps)
+            matrix_df = self.create_transition_matrix()
+            output_paths = self.export_to_csv(path_counts, edge_counts, matrix_df)
+
+            print("\nJourney paths completed successfully!")
+            return output_paths
+
+        except Exception as e:
+            print(f"Error during journey paths: {str(e)}")
+            raise
+
+
+# -------------------------------
+# Execute the journey paths
+# -------------------------------
+if __name__ == "__main__":
+    args = argument_parser('Build the journey paths, Sankey edges and transition matrix.').parse_args()
+    configure(args)
+
+    processor = JourneyPathsProcessor()
+    paths_file, edges_file = processor.process_journey_paths()
@@ -0,0 +1,185 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+from typing import Optional, Sequence
+
+# Add the parent directory to the path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, traced
+
+
+class RollingMetricsProcessor:
+    """
+    A class to compute rolling-window conversion and churn metrics from staging events data.
+    """
+
+    # Event types counted per day
+    EVENT_TYPES = ['applied', 'docs_submitted', 'rejected', 'signed', 'churned']
+
+    def __init__(self, staging_csv_path: Optional[str] = None, windows: Sequence[int] = (7, 30, 90)):
+        """
+        Initialize the rolling metrics processor.
+
+        Args:
+            staging_csv_path: Path to the staging events CSV file. If None, uses default path.
+            windows: Rolling window lengths in days
+        """
+        if staging_csv_path is None:
+            self.staging_csv_path = os.path.join(
+                os.path.dirname(os.path.dirname(__file__)),
+                'b_staging',
+                'data_output',
+                'f_staging_events.csv'
+            )
+        else:
+            self.staging_csv_path = staging_csv_path
+
+        self.windows = list(windows)
+        self.staging_df = None
+        self.output_dir = os.path.join(os.path.dirname(__file__), 'data_output')
+
+    @traced()
+    def load_staging_data(self) -> pd.DataFrame:
+        """
+        Load staging data from CSV file.
+
+        Returns:
+            pd.DataFrame: The loaded staging data
+        """
+        print(f"Loading staging data from: {self.staging_csv_path}")
+        self.staging_df = compression.read_csv(self.staging_csv_path)
+
+        # Convert event_date to datetime
+        self.staging_df['event_date'] = pd.to_datetime(self.staging_df['event_date'])
+        print(f"Staging data loaded. Shape: {self.staging_df.shape}")
+        return self.staging_df
+
+    @traced(input_attr='staging_df')
+    def create_daily_event_counts(self) -> pd.DataFrame:
+        """
+        Count events per day and event type over the full date range of the staging data.
+
+        Only the first event of each type per client (event_rank = 1) is counted, matching
+        the client-level funnel definitions.
+
+        Returns:
+            pd.DataFrame: One row per calendar day with one count column per event type
+        """
+        print("Creating daily event counts...")
+
+        events = self.staging_df[self.staging_df['event_rank'] == 1]
+        daily_counts = (
+            events.groupby([events['event_date'].dt.normalize(), 'event_type'])
+            .size()
+            .unstack(fill_value=0)
+            .reindex(columns=self.EVENT_TYPES, fill_value=0)
+        )
+
+        # Include days without events so that windows are measured in calendar days
+        if not daily_counts.empty:
+            all_days = pd.date_range(daily_counts.index.min(), daily_counts.index.max(), freq='D')
+            daily_counts = daily_counts.reindex(all_days, fill_value=0)
+        daily_counts.index.name = 'date'
+
+        print(f"Daily event counts created. Shape: {daily_counts.shape}")
+        return daily_counts
+
+    @traced()
+    def create_rolling_metrics(self, daily_counts: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate rolling event counts, conversion rate and churn rate for every window length.
+
+        Window totals are differences of one cumulative sum, so each window length costs a
+        single pass over the days regardless of its size.
+
+        Args:
+            daily_counts: The daily event counts dataframe
+
+        Returns:
+            pd.DataFrame: Rolling metrics in long format (one row per day and window length)
+        """
+        print(f"Calculating rolling metrics for windows {self.windows}...")
+
+        counts = daily_counts.to_numpy()
+        cumulative = np.vstack([np.zeros((1, counts.shape[1]), dtype=counts.dtype), counts.cumsum(axis=0)])
+        day_positions = np.arange(1, len(counts) + 1)
+
+        window_frames = []
+        for window in self.windows:
+            # Sum over the trailing `window` days = cumsum[t] - cumsum[t - window]
+            window_totals = cumulative[day_positions] - cumulative[np.maximum(day_positions - window, 0)]
+            frame = pd.DataFrame(window_totals, columns=daily_counts.columns)
+            frame.insert(0, 'window_days', window)
+            frame.insert(0, 'date', daily_counts.index)
+            window_frames.append(frame)
+
+        if not window_frames:
+            return pd.DataFrame(columns=['date', 'window_days'] + self.EVENT_TYPES + ['conversion_rate', 'churn_rate'])
+
+        rolling_df = pd.concat(window_frames, ignore_index=True)
+
+        # Rates follow the funnel definitions: signed / applied and churned / signed
+        applied = rolling_df['applied']
+        signed = rolling_df['signed']
+        rolling_df['conversion_rate'] = (signed / applied).where(applied > 0)
+        rolling_df['churn_rate'] = (rolling_df['churned'] / signed).where(signed > 0)
+
+        print(f"Rolling metrics calculated. Shape: {rolling_df.shape}")
+        return rolling_df
+
+    @traced()
+    def export_to_csv(self, rolling_df: pd.DataFrame) -> str:
+        """
+        Export rolling metrics to CSV.
+
+        Args:
+            rolling_df: The rolling metrics dataframe to export
+
+        Returns:
+            str: Path to the exported CSV file
+        """
+        print("Exporting rolling metrics to CSV...")
+
+        # Create output directory and write to CSV
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_path = os.path.join(self.output_dir, 'f_rolling_metrics.csv')
+        output_path = compression.write_csv(rolling_df, output_path)
+
+        print(f"Rolling metrics written to '{output_path}'")
+        return output_path
+
+    @traced()
+    def process_rolling_metrics(self) -> str:
+        """
+        Execute the complete rolling metrics process.
+
+        Returns:
+            str: Path to the exported CSV file
+        """
+        try:
+            # Execute all steps in sequence
+            self.load_staging_data()
+            daily_counts = self.create_daily_event_counts()
+            rolling_df = self.create_rolling_metrics(daily_counts)
+            output_path = self.export_to_csv(rolling_df)
+
+            print("\nRolling metrics completed successfully!")
+            return output_path
+
+        except Exception as e:
+            print(f"Error during rolling metrics: {str(e)}")
+            raise
+
+
+# -------------------------------
+# Execute the rolling metrics
+# -------------------------------
+if __name__ == "__main__":
+    args = argument_parser('Build the rolling conversion and churn metrics.').parse_args()
+    configure(args)
+
+    processor = RollingMetricsProcessor()
+    output_file = processor.process_rolling_metrics()
@@ -0,0 +1,303 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+from typing import Optional, Dict
+
+# Add the parent directory to the path to import sibling feature modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, traced
+from c_features.sketches import HyperLogLog, KLLSketch
+
+
+class SketchStatsProcessor:
+    """
+    A class to compute approximate event distribution and duration quantiles with mergeable sketches.
+
+    Staging events are read in chunks; every chunk updates HyperLogLog sketches of distinct
+    clients per event type and KLL sketches of per-client durations. Staging events are
+    ordered by client_id, so a chunk is reduced to one row per client and every client
+    but the last is complete: its durations go straight into the sketches, and only the
+    last client is carried to the next chunk. Memory depends on the chunk size, not on
+    the number of events or clients. All outputs are flagged as approximate.
+    """
+
+    # Quantile probabilities reported for each duration metric
+    QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+    # Per-client duration metrics, in whole days as in the exact churn and inconsistencies outputs
+    DURATION_METRICS = ['days_to_sign', 'days_since_last_event', 'days_since_signed', 'days_since_last_event_active']
+
+    # Per-client dates and flags reduced from each chunk, with the function combining two partial values
+    CLIENT_COLUMNS = {'first_applied_date': 'min', 'first_signed_date': 'min', 'last_signed_date': 'max',
+                      'last_event_date': 'max', 'is_churned': 'max'}
+
+    def __init__(self, staging_csv_path: Optional[str] = None, chunksize: int = 1_000_000,
+                 relative_error: float = 0.01, rank_error: float = 0.01, as_of: Optional[str] = None):
+        """
+        Initialize the sketch stats processor.
+
+        Args:
+            staging_csv_path: Path to the staging events CSV file. If None, uses default path.
+            chunksize: Number of staging rows read per chunk
+            relative_error: Target relative standard error of the distinct client counts
+            rank_error: Target normalized rank error of the duration quantiles
+            as_of: Reference date for days since last event. If None, uses today's date.
+        """
+        if staging_csv_path is None:
+            self.staging_csv_path = os.path.join(
+                os.path.dirname(os.path.dirname(__file__)),
+                'b_staging',
+                'data_output',
+                'f_staging_events.csv'
+            )
+        else:
+            self.staging_csv_path = staging_csv_path
+
+        self.chunksize = chunksize
+        self.relative_error = relative_error
+        self.rank_error = rank_error
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now().normalize()
+
+        self.event_type_stats: Dict[str, dict] = {}
+        self.duration_sketches = {metric: KLLSketch(rank_error) for metric in self.DURATION_METRICS}
+        self.pending_client = None
+        self.output_dir = os.path.join(os.path.dirname(__file__), 'data_output')
+
+    @traced()
+    def load_staging_chunks(self, durations: bool = True) -> None:
+        """
+        Stream the staging data from CSV in chunks and update the sketches.
+
+        Args:
+            durations: If False, only the event type sketches are updated
+        """
+        print(f"Streaming staging data from: {self.staging_csv_path} (chunksize={self.chunksize})")
+
+        chunk_count = 0
+        row_count = 0
+        for chunk in compression.read_csv(self.staging_csv_path, chunksize=self.chunksize):
+            chunk['event_date'] = pd.to_datetime(chunk['event_date'])
+            self.update(chunk, durations)
+            chunk_count += 1
+            row_count += len(chunk)
+        if durations:
+            self.flush()
+
+        print(f"Staging data streamed. {row_count} rows in {chunk_count} chunks")
+
+    def update(self, events: pd.DataFrame, durations: bool = True) -> None:
+        """
+        Update the sketches with a batch of staging events.
+
+        Batches must follow each other in client_id order; call `flush` after the last one.
+
+        Args:
+            events: Staging events ordered by client_id, with event_date already parsed
+            durations: If False, only the event type sketches are updated
+        """
+        for event_type, group in events.groupby('event_type'):
+            stats = self.event_type_stats.get(event_type)
+            if stats is None:
+                stats = {
+                    'event_count': 0,
+                    'clients': HyperLogLog(self.relative_error),
+                    'earliest_date': pd.NaT,
+                    'latest_date': pd.NaT,
+                    'sales_rep_id_sum': 0.0,
+                    'sales_rep_id_count': 0,
+                    'plans': set(),
+                    'regions': set()
+                }
+                self.event_type_stats[event_type] = stats
+
+            stats['event_count'] += len(group)
+            stats['clients'].update(group['client_id'].to_numpy())
+            earliest_date, latest_date = group['event_date'].min(), group['event_date'].max()
+            if pd.isna(stats['earliest_date']) or earliest_date < stats['earliest_date']:
+                stats['earliest_date'] = earliest_date
+            if pd.isna(stats['latest_date']) or latest_date > stats['latest_date']:
+                stats['latest_date'] = latest_date
+            stats['sales_rep_id_sum'] += group['sales_rep_id'].sum()
+            stats['sales_rep_id_count'] += group['sales_rep_id'].count()
+            stats['plans'].update(group['plan'].dropna().unique())
+            stats['regions'].update(group['region'].dropna().unique())
+
+        if durations and len(events) > 0:
+            self._update_durations(events)
+
+    def _update_durations(self, events: pd.DataFrame) -> None:
+        """
+        Reduce a batch to one row per client and add the durations of its complete clients.
+
+        Args:
+            events: Staging events ordered by client_id, with event_date already parsed
+        """
+        client_ids = events['client_id'].to_numpy()
+        if (np.diff(client_ids) < 0).any() or (
+                self.pending_client is not None and client_ids[0] < self.pending_client.index[0]):
+            raise ValueError("Duration sketches need staging events ordered by client_id; "
+                             "re-run b_staging/f_staging_events.py")
+
+        is_signed = events['event_type'] == 'signed'
+        clients = pd.DataFrame({
+            'client_id': client_ids,
+            'first_applied_date': events['event_date'].where(events['event_type'] == 'applied'),
+            'first_signed_date': events['event_date'].where(is_signed),
+            'last_signed_date': events['event_date'].where(is_signed),
+            'last_event_date': events['event_date'],
+            'is_churned': events['event_type'] == 'churned'
+        })
+        # The client carried from the previous batch is reduced with its remaining events
+        if self.pending_client is not None:
+            clients = pd.concat([self.pending_client.reset_index(), clients], ignore_index=True)
+        clients = clients.groupby('client_id', sort=False).agg(self.CLIENT_COLUMNS)
+
+        # The last client may continue in the next batch
+        self.pending_client = clients.iloc[-1:]
+        self._add_durations(clients.iloc[:-1])
+
+    def flush(self) -> None:
+        """Add the durations of the client carried from the last batch."""
+        if self.pending_client is not None:
+            self._add_durations(self.pending_client)
+            self.pending_client = None
+
+    def _add_durations(self, clients: pd.DataFrame) -> None:
+        """
+        Add the durations of complete clients to the duration sketches.
+
+        Args:
+            clients: One reduced row per client, as built by `_update_durations`
+        """
+        days_since_last_event = (self.as_of - clients['last_event_date']).dt.days
+        durations = {
+            'days_to_sign': (clients['first_signed_date'] - clients['first_applied_date']).dt.days,
+            'days_since_last_event': days_since_last_event,
+            # The churn table's days_since_signed counts from the latest signature
+            'days_since_signed': (self.as_of - clients['last_signed_date']).dt.days,
+            'days_since_last_event_active': days_since_last_event.where(~clients['is_churned'].astype(bool))
+        }
+        for metric, values in durations.items():
+            self.duration_sketches[metric].update(values.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    @traced()
+    def create_event_type_distribution(self) -> pd.DataFrame:
+        """
+        Create the approximate event type distribution.
+
+        Returns:
+            pd.DataFrame: Event type counts with approximate unique client counts
+        """
+        print("Creating approximate event type distribution...")
+
+        rows = []
+        for event_type, stats in self.event_type_stats.items():
+            sales_rep_count = stats['sales_rep_id_count']
+            rows.append({
+                'event_type': event_type,
+                'event_count': stats['event_count'],
+                'unique_clients': int(round(stats['clients'].estimate())),
+                'earliest_date': stats['earliest_date'],
+                'latest_date': stats['latest_date'],
+                'avg_sales_rep_id': round(stats['sales_rep_id_sum'] / sales_rep_count, 2) if sales_rep_count > 0 else np.nan,
+                'plans_involved': ','.join(sorted(stats['plans'])),
+                'regions_involved': ','.join(sorted(stats['regions'])),
+                'unique_clients_relative_error': stats['clients'].relative_error,
+                'is_approximate': True
+            })
+
+        distribution_df = pd.DataFrame(rows)
+        if not distribution_df.empty:
+            distribution_df = distribution_df.sort_values('event_count', ascending=False, ignore_index=True)
+
+        print(f"Approximate event type distribution created. Found {len(distribution_df)} event types")
+        return distribution_df
+
+    @traced()
+    def create_duration_quantiles(self) -> pd.DataFrame:
+        """
+        Create approximate quantiles of the per-client durations.
+
+        Metrics: days to sign, days since last event (all and non-churned clients) and
+        days since signed. Count, mean, min and max are exact.
+
+        Returns:
+            pd.DataFrame: One row per duration metric with count, mean and quantile estimates
+        """
+        print("Creating approximate duration quantiles...")
+
+        rows = []
+        for metric, sketch in self.duration_sketches.items():
+            row = {'metric': metric, 'count': sketch.count, 'mean': sketch.mean(),
+                   'min': sketch.min if sketch.count > 0 else np.nan}
+            row.update(zip(self.QUANTILES, sketch.quantiles(list(self.QUANTILES.values()))))
+            row.update({
+                'max': sketch.max if sketch.count > 0 else np.nan,
+                'rank_error': sketch.rank_error,
+                'is_approximate': True
+            })
+            rows.append(row)
+
+        quantiles_df = pd.DataFrame(rows)
+        print(f"Approximate duration quantiles created for {len(quantiles_df)} metrics")
+        return quantiles_df
+
+    @traced()
+    def export_to_csv(self, distribution_df: pd.DataFrame, quantiles_df: pd.DataFrame) -> tuple[str, str]:
+        """
+        Export the approximate outputs to CSV.
+
+        Args:
+            distribution_df: The approximate event type distribution
+            quantiles_df: The approximate duration quantiles
+
+        Returns:
+            tuple: (Path to distribution CSV, Path to quantiles CSV)
+        """
+        print("Exporting approximate statistics to CSV...")
+
+        # Create output directory and write to CSV
+        os.makedirs(self.output_dir, exist_ok=True)
+        distribution_path = os.path.join(self.output_dir, 'f_event_distribution_approx.csv')
+        distribution_path = compression.write_csv(distribution_df, distribution_path)
+        quantiles_path = os.path.join(self.output_dir, 'f_duration_quantiles_approx.csv')
+        quantiles_path = compression.write_csv(quantiles_df, quantiles_path)
+
+        print(f"Approximate statistics written to '{distribution_path}' and '{quantiles_path}'")
+        return distribution_path, quantiles_path
+
+    @traced()
+    def process_sketch_stats(self) -> tuple[str, str]:
+        """
+        Execute the complete approximate statistics process.
+
+        Returns:
+            tuple: (Path to distribution CSV, Path to quantiles CSV)
+        """
+        try:
+            # Execute all steps in sequence
+            self.load_staging_chunks()
+            distribution_df = self.create_event_type_distribution()
+            quantiles_df = self.create_duration_quantiles()
+            output_paths = self.export_to_csv(distribution_df, quantiles_df)
+
+            print("\nApproximate statistics completed successfully!")
+            return output_paths
+
+        except Exception as e:
+            print(f"Error during approximate statistics: {str(e)}")
+            raise
+
+
+# -------------------------------
+# Execute the approximate statistics
+# -------------------------------
+if __name__ == "__main__":
+    args = argument_parser('Build the approximate event statistics.').parse_args()
+    configure(args)
+
+    processor = SketchStatsProcessor()
+    distribution_file, quantiles_file = processor.process_sketch_stats()
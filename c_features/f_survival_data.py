@@ -0,0 +1,197 @@
+import pandas as pd
+import sys
+import os
+from typing import Optional, Sequence
+
+# Add the parent directory to the path to import sibling feature modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure, traced
+from c_features.f_churn_data import ChurnDataProcessor
+
+
+class SurvivalDataProcessor:
+    """
+    A class to compute Kaplan-Meier survival curves of post-signature churn.
+
+    Duration runs from signed_date to churned_date for churned clients and is censored
+    at the as-of date for active clients. Curves are computed for all clients and for
+    every value of each segment column.
+    """
+
+    # Client attributes the survival curves are split by
+    SEGMENT_COLUMNS = ['plan', 'region']
+
+    def __init__(self, staging_csv_path: Optional[str] = None, as_of: Optional[str] = None,
+                 segment_columns: Optional[Sequence[str]] = None):
+        """
+        Initialize the survival data processor.
+
+        Args:
+            staging_csv_path: Path to the staging events CSV file. If None, uses default path.
+            as_of: Censoring date for clients that have not churned. If None, uses today's date.
+            segment_columns: Churn table columns to split the curves by. If None, uses plan and region.
+        """
+        self.churn_processor = ChurnDataProcessor(staging_csv_path, as_of=as_of)
+        self.as_of = self.churn_processor.as_of
+        self.segment_columns = list(segment_columns) if segment_columns is not None else self.SEGMENT_COLUMNS
+
+        self.churn_df = None
+        self.output_dir = os.path.join(os.path.dirname(__file__), 'data_output')
+
+    @traced()
+    def load_churn_data(self) -> pd.DataFrame:
+        """
+        Build the churn table from staging data.
+
+        Returns:
+            pd.DataFrame: The churn analysis data, one row per client
+        """
+        try:
+            self.churn_processor.load_staging_data()
+            self.churn_processor.prepare_database()
+            self.churn_df = self.churn_processor.create_churn_analysis()
+        finally:
+            if self.churn_processor.conn:
+                self.churn_processor.conn.close()
+
+        for col in ['signed_date', 'churned_date']:
+            self.churn_df[col] = pd.to_datetime(self.churn_df[col])
+        return self.churn_df
+
+    @traced(input_attr='churn_df')
+    def create_durations(self) -> pd.DataFrame:
+        """
+        Create the time-to-churn duration of every signed client.
+
+        Clients with a churn date before their signature have no valid duration and
+        are excluded.
+
+        Returns:
+            pd.DataFrame: Signed clients with days, is_event and the segment columns
+
+        Raises:
+            ValueError: If the churn table has more than one row for a client
+        """
+        print("Creating time-to-churn durations...")
+
+        # Every client must be counted once at risk
+        if self.churn_df['client_id'].duplicated().any():
+            duplicated = self.churn_df.loc[self.churn_df['client_id'].duplicated(), 'client_id'].unique().tolist()
+            raise ValueError(f"Churn table has several rows for clients {duplicated[:10]}")
+
+        signed = self.churn_df[self.churn_df['signed_date'].notna()]
+        is_event = signed['churned_date'].notna().to_numpy()
+        end_date = signed['churned_date'].where(is_event, self.as_of)
+
+        durations = signed[['client_id'] + self.segment_columns].copy()
+        durations['days'] = ((end_date - signed['signed_date']) / pd.Timedelta(days=1)).to_numpy()
+        durations['is_event'] = is_event.astype(int)
+
+        negative = durations['days'] < 0
+        if negative.any():
+            print(f"Excluding {int(negative.sum())} clients with churn before signature")
+        durations = durations[~negative].reset_index(drop=True)
+
+        print(f"Durations created for {len(durations)} signed clients ({int(durations['is_event'].sum())} churned)")
+        return durations
+
+    @traced()
+    def create_survival_curves(self, durations: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate Kaplan-Meier survival curves for all clients and every segment.
+
+        All segments are stacked and sorted once; the number at risk is a reverse
+        cumulative sum of clients per distinct duration, and survival is the cumulative
+        product of (1 - events / at risk) within each segment.
+
+        Args:
+            durations: The durations dataframe from `create_durations`
+
+        Returns:
+            pd.DataFrame: One row per segment and distinct duration with at_risk, events,
+                censored and survival
+        """
+        print(f"Calculating survival curves by {['all'] + self.segment_columns}...")
+
+        stacked = pd.concat(
+            [pd.DataFrame({'segment_type': 'all', 'segment_value': 'All',
+                           'days': durations['days'], 'is_event': durations['is_event']})] +
+            [pd.DataFrame({'segment_type': col, 'segment_value': durations[col].fillna('Unknown').astype(str),
+                           'days': durations['days'], 'is_event': durations['is_event']})
+             for col in self.segment_columns],
+            ignore_index=True
+        )
+
+        # Clients and churn events per distinct duration, in duration order within each segment
+        curves = (
+            stacked.groupby(['segment_type', 'segment_value', 'days'], sort=True)['is_event']
+            .agg(clients='size', events='sum')
+            .reset_index()
+        )
+        curves['censored'] = curves['clients'] - curves['events']
+
+        # Clients at risk at a duration = segment clients minus those with shorter durations
+        segments = curves.groupby(['segment_type', 'segment_value'], sort=False)
+        curves['at_risk'] = segments['clients'].transform('sum') - segments['clients'].cumsum() + curves['clients']
+        curves['survival'] = 1 - curves['events'] / curves['at_risk']
+        curves['survival'] = curves.groupby(['segment_type', 'segment_value'], sort=False)['survival'].cumprod()
+
+        survival_df = curves[['segment_type', 'segment_value', 'days', 'at_risk', 'events', 'censored', 'survival']]
+        print(f"Survival curves calculated. Shape: {survival_df.shape}")
+        return survival_df
+
+    @traced()
+    def export_to_csv(self, survival_df: pd.DataFrame) -> str:
+        """
+        Export the survival curves to CSV.
+
+        Args:
+            survival_df: The survival curves dataframe to export
+
+        Returns:
+            str: Path to the exported CSV file
+        """
+        print("Exporting survival curves to CSV...")
+
+        # Create output directory and write to CSV
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_path = os.path.join(self.output_dir, 'f_survival_data.csv')
+        output_path = compression.write_csv(survival_df, output_path)
+
+        print(f"Survival curves written to '{output_path}'")
+        return output_path
+
+    @traced()
+    def process_survival_analysis(self) -> str:
+        """
+        Execute the complete survival analysis process.
+
+        Returns:
+            str: Path to the exported CSV file
+        """
+        try:
+            # Execute all steps in sequence
+            self.load_churn_data()
+            durations = self.create_durations()
+            survival_df = self.create_survival_curves(durations)
+            output_path = self.export_to_csv(survival_df)
+
+            print("\nSurvival analysis completed successfully!")
+            return output_path
+
+        except Exception as e:
+            print(f"Error during survival analysis: {str(e)}")
+            raise
+
+
+# -------------------------------
+# Execute the survival analysis
+# -------------------------------
+if __name__ == "__main__":
+    args = argument_parser('Build the post-signature survival curves.').parse_args()
+    configure(args)
+
+    processor = SurvivalDataProcessor()
+    output_file = processor.process_survival_analysis()
@@ -0,0 +1,319 @@
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Add the parent directory to the path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+
+
+class FeatureStore:
+    """
+    A versioned store of feature outputs keyed by input fingerprint, code version and parameters.
+
+    Every processor run is stored under a key derived from the sha256 fingerprint of the
+    staging file, the processor name, its VERSION and its parameters. A run with the same
+    key is served from the store instead of being recomputed. `manifest.json` records every
+    entry; least recently used entries are evicted beyond `max_entries` or `max_bytes`.
+
+    Entries also record the full set of files a run produced and their fingerprints, so
+    consumers such as the dashboards can check whether the outputs on disk are current
+    without recomputing.
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, store_dir: Optional[str] = None, max_entries: int = 50,
+                 max_bytes: int = 500 * 1024 * 1024):
+        """
+        Initialize the feature store.
+
+        Args:
+            store_dir: Directory of the store. If None, uses c_features/feature_store.
+            max_entries: Maximum number of stored entries
+            max_bytes: Maximum total size of the stored files in bytes
+        """
+        if store_dir is None:
+            self.store_dir = os.path.join(os.path.dirname(__file__), 'feature_store')
+        else:
+            self.store_dir = store_dir
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(self.store_dir, self.MANIFEST_NAME)
+        self._fingerprints: Dict[tuple, str] = {}
+        self._key_inputs: Dict[str, dict] = {}
+
+    def fingerprint(self, path: str) -> str:
+        """
+        Compute the sha256 fingerprint of a file's content.
+
+        Fingerprints are memoized by path, size and modification time.
+
+        Args:
+            path: Path to the file
+
+        Returns:
+            str: Hex digest of the file content
+        """
+        stat = os.stat(path)
+        cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if cache_key not in self._fingerprints:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            self._fingerprints[cache_key] = digest.hexdigest()
+        return self._fingerprints[cache_key]
+
+    def make_key(self, staging_csv_path: str, processor: str, version: str, params: Optional[dict] = None) -> str:
+        """
+        Derive the store key of a processor run.
+
+        The output codec is part of the key, since it changes the stored files.
+
+        Args:
+            staging_csv_path: Path to the staging events CSV file the run reads
+            processor: Processor name
+            version: Processor code version
+            params: Parameters that change the outputs (e.g. as_of)
+
+        Returns:
+            str: Hex digest identifying the run
+        """
+        key_data = {
+            'staging_fingerprint': self.fingerprint(compression.resolve_path(staging_csv_path)),
+            'processor': processor,
+            'version': version,
+            'params': params or {},
+            'codec': compression.resolve_codec()
+        }
+        key = hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        # Recorded with the entry by `put`, for freshness checks
+        self._key_inputs[key] = {'staging_fingerprint': key_data['staging_fingerprint'], 'codec': key_data['codec']}
+        return key
+
+    def load_manifest(self) -> dict:
+        """
+        Load the manifest of stored entries.
+
+        Returns:
+            dict: The manifest, with stored entries under 'entries'
+        """
+        if not os.path.exists(self.manifest_path):
+            return {'entries': {}}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: dict) -> None:
+        """
+        Write the manifest atomically.
+
+        Args:
+            manifest: The manifest to write
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Look up a stored entry and mark it as recently used.
+
+        Args:
+            key: The store key
+
+        Returns:
+            dict: Stored file paths keyed by file name, or None on a cache miss
+        """
+        manifest = self.load_manifest()
+        entry = manifest['entries'].get(key)
+        if entry is None:
+            return None
+
+        entry_dir = os.path.join(self.store_dir, key)
+        stored_paths = {name: os.path.join(entry_dir, name) for name in entry['files']}
+        if not all(os.path.exists(path) for path in stored_paths.values()):
+            # Files removed outside the store: treat as a miss and drop the entry
+            del manifest['entries'][key]
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            self.save_manifest(manifest)
+            return None
+
+        # Only rewrite the manifest when the hit changes the LRU order
+        if entry['last_accessed'] != max(other['last_accessed'] for other in manifest['entries'].values()):
+            entry['last_accessed'] = datetime.now().isoformat()
+            self.save_manifest(manifest)
+        return stored_paths
+
+    def restore(self, key: str, output_dir: str) -> Optional[List[str]]:
+        """
+        Copy a stored entry's files into an output directory.
+
+        Restored files get a new modification time, so they shadow variants of the same
+        output written with another codec without deleting them.
+
+        Args:
+            key: The store key
+            output_dir: Directory to copy the files into
+
+        Returns:
+            list: Paths of the restored files, or None on a cache miss
+        """
+        stored_paths = self.get(key)
+        if stored_paths is None:
+            return None
+
+        os.makedirs(output_dir, exist_ok=True)
+        restored = []
+        for name, stored_path in stored_paths.items():
+            output_path = os.path.join(output_dir, name)
+            shutil.copyfile(stored_path, output_path)
+            restored.append(output_path)
+
+        print(f"Feature store hit {key[:12]}: restored {len(restored)} files to '{output_dir}'")
+        return restored
+
+    def put(self, key: str, paths: List[str], processor: str, version: str, params: Optional[dict] = None) -> None:
+        """
+        Store the output files of a processor run and evict old entries.
+
+        Args:
+            key: The store key from `make_key`
+            paths: Every output file the run produces; empty paths are ignored
+            processor: Processor name
+            version: Processor code version
+            params: Parameters of the run
+        """
+        entry_dir = os.path.join(self.store_dir, key)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        files = {}
+        fingerprints = {}
+        outputs = []
+        for path in paths:
+            if not path:
+                continue
+            outputs.append(compression.strip_codec_extension(os.path.basename(path)))
+            # Outputs may have been written with a codec extension
+            path = compression.resolve_path(path)
+            if not os.path.exists(path):
+                continue
+            name = os.path.basename(path)
+            shutil.copy2(path, os.path.join(entry_dir, name))
+            files[name] = os.path.getsize(path)
+            fingerprints[name] = self.fingerprint(path)
+
+        now = datetime.now().isoformat()
+        manifest = self.load_manifest()
+        manifest['entries'][key] = {
+            'processor': processor,
+            'version': version,
+            'params': {name: str(value) for name, value in (params or {}).items()},
+            'inputs': self._key_inputs.get(key, {}),
+            'outputs': sorted(outputs),
+            'files': files,
+            'fingerprints': fingerprints,
+            'size_bytes': sum(files.values()),
+            'created_at': now,
+            'last_accessed': now
+        }
+        self.evict(manifest)
+        self.save_manifest(manifest)
+        print(f"Feature store saved {key[:12]}: {len(files)} files for {processor} v{version}")
+
+    def outputs_fresh(self, processor) -> bool:
+        """
+        Check whether a processor's outputs on disk are up to date.
+
+        Outputs are fresh when a stored run of the processor's current VERSION read
+        the current staging file, every output of that run was stored and is the file
+        readers resolve in the processor's output directory, unchanged, and no other
+        file matching the processor's OUTPUT_PATTERNS is there (e.g. a side table a
+        later version no longer writes). Run parameters (e.g. as_of) are not compared.
+
+        Args:
+            processor: A feature processor with staging_csv_path, output_dir, VERSION and OUTPUT_PATTERNS
+
+        Returns:
+            bool: True if the outputs can be read without recomputing them
+        """
+        staging_path = compression.resolve_path(processor.staging_csv_path)
+        if not os.path.exists(staging_path):
+            return False
+        staging_fingerprint = self.fingerprint(staging_path)
+
+        # Outputs of the processor on disk, by name without codec extension
+        on_disk = set()
+        if os.path.isdir(processor.output_dir):
+            for name in os.listdir(processor.output_dir):
+                output_name = compression.strip_codec_extension(name)
+                if any(fnmatch.fnmatch(output_name, pattern) for pattern in getattr(processor, 'OUTPUT_PATTERNS', ())):
+                    on_disk.add(output_name)
+
+        for entry in self.load_manifest()['entries'].values():
+            if (entry['processor'] != type(processor).__name__ or entry['version'] != processor.VERSION
+                    or entry.get('inputs', {}).get('staging_fingerprint') != staging_fingerprint
+                    or not entry.get('fingerprints') or 'outputs' not in entry):
+                continue
+            recorded = {compression.strip_codec_extension(name): name for name in entry['fingerprints']}
+            # Outputs missing from the entry, or unexpected siblings on disk, make the run stale
+            if set(recorded) != set(entry['outputs']) or not on_disk <= set(entry['outputs']):
+                continue
+            if all(self._output_current(processor.output_dir, output_name, name, entry['fingerprints'][name])
+                   for output_name, name in recorded.items()):
+                return True
+        return False
+
+    def _output_current(self, output_dir: str, output_name: str, name: str, fingerprint: str) -> bool:
+        """
+        Check that readers resolve an output to the recorded file, with the recorded content.
+
+        Args:
+            output_dir: Output directory of the processor
+            output_name: Output name without codec extension
+            name: Recorded file name
+            fingerprint: Recorded fingerprint of the file
+
+        Returns:
+            bool: True if the file is current
+        """
+        path = os.path.join(output_dir, name)
+        return (os.path.exists(path) and compression.resolve_path(os.path.join(output_dir, output_name)) == path
+                and self.fingerprint(path) == fingerprint)
+
+    def evict(self, manifest: dict) -> List[str]:
+        """
+        Evict least recently used entries beyond the entry count and size limits.
+
+        Args:
+            manifest: The manifest to update in place
+
+        Returns:
+            list: Keys of the evicted entries
+        """
+        entries = manifest['entries']
+        by_last_access = sorted(entries, key=lambda key: entries[key]['last_accessed'])
+        total_bytes = sum(entry['size_bytes'] for entry in entries.values())
+
+        evicted = []
+        # Always keep the most recently used entry
+        for key in by_last_access[:-1]:
+            if len(entries) <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            total_bytes -= entries[key]['size_bytes']
+            del entries[key]
+            shutil.rmtree(os.path.join(self.store_dir, key), ignore_errors=True)
+            evicted.append(key)
+
+        if evicted:
+            print(f"Feature store evicted {len(evicted)} entries")
+        return evicted
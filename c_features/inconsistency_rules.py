@@ -0,0 +1,308 @@
+import pandas as pd
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+
+class InconsistencyRule:
+    """
+    A named data quality rule: a vectorized predicate with a severity and a description.
+
+    Client rules receive the per-client aggregate built by `build_client_aggregate`;
+    event rules receive the staging events. Either way the predicate returns a boolean
+    Series aligned with its input, flagging the rows that violate the rule.
+
+    Several rules can report into one inconsistency type of the processor output
+    (e.g. every precedence rule is a 'sequence_violation').
+    """
+
+    LEVELS = ('client', 'event')
+
+    def __init__(self, code: str, level: str, predicate: Callable[[pd.DataFrame], pd.Series],
+                 severity: str, description: str, date_column: str, inconsistency_type: Optional[str] = None):
+        """
+        Initialize the rule.
+
+        Args:
+            code: Unique rule code
+            level: 'client' for per-client aggregate rules, 'event' for per-event rules
+            predicate: Function returning a boolean Series of violating rows
+            severity: Severity label (High, Medium or Low)
+            description: Human-readable description of the violation
+            date_column: Column of the evaluated frame reported as relevant date
+            inconsistency_type: Processor output type the rule reports into. If None, uses the code.
+        """
+        if level not in self.LEVELS:
+            raise ValueError(f"Unknown rule level '{level}', expected one of {self.LEVELS}")
+
+        self.code = code
+        self.level = level
+        self.predicate = predicate
+        self.severity = severity
+        self.description = description
+        self.date_column = date_column
+        self.inconsistency_type = inconsistency_type or code
+
+
+# Registry of all rules evaluated by `evaluate_rules`, keyed by rule code
+RULES: Dict[str, InconsistencyRule] = {}
+
+# Event ordering checks: (event that must come first, event that must come later, violation type, description)
+STAGE_PRECEDENCE = [
+    ('applied', 'signed', 'signed_before_applied', 'Client signed before applying'),
+    ('applied', 'docs_submitted', 'docs_submitted_before_applied', 'Client submitted docs before applying'),
+    ('applied', 'rejected', 'rejected_before_applied', 'Client was rejected before applying'),
+    ('signed', 'churned', 'churned_before_signed', 'Client churned before signing'),
+]
+
+
+def add_rule(rule: InconsistencyRule) -> InconsistencyRule:
+    """
+    Add a rule to the registry.
+
+    Args:
+        rule: The rule to register
+
+    Returns:
+        InconsistencyRule: The registered rule
+    """
+    if rule.code in RULES:
+        raise ValueError(f"Inconsistency rule '{rule.code}' is already registered")
+    RULES[rule.code] = rule
+    return rule
+
+
+def register_rule(code: str, level: str, severity: str, description: str, date_column: str,
+                  inconsistency_type: Optional[str] = None):
+    """
+    Decorator registering a predicate function as an inconsistency rule.
+
+    Args:
+        code: Unique rule code
+        level: 'client' or 'event'
+        severity: Severity label (High, Medium or Low)
+        description: Human-readable description of the violation
+        date_column: Column of the evaluated frame reported as relevant date
+        inconsistency_type: Processor output type the rule reports into. If None, uses the code.
+
+    Returns:
+        Callable: The decorator
+    """
+    def decorator(predicate: Callable[[pd.DataFrame], pd.Series]) -> Callable[[pd.DataFrame], pd.Series]:
+        add_rule(InconsistencyRule(code, level, predicate, severity, description, date_column, inconsistency_type))
+        return predicate
+    return decorator
+
+
+def precedence_rules(stage_precedence: List[tuple]) -> List[InconsistencyRule]:
+    """
+    Build client rules for event ordering checks.
+
+    A client violates a check when the first event of the later type comes before
+    the first event of the earlier type. All checks report as 'sequence_violation'.
+
+    Args:
+        stage_precedence: Checks in the STAGE_PRECEDENCE format
+
+    Returns:
+        list: One rule per check, in the given order
+    """
+    def violates(earlier: str, later: str) -> Callable[[pd.DataFrame], pd.Series]:
+        return lambda clients: clients[f'first_{later}_date'] < clients[f'first_{earlier}_date']
+
+    return [
+        InconsistencyRule(code, 'client', violates(earlier, later), 'High', description,
+                          f'first_{later}_date', 'sequence_violation')
+        for earlier, later, code, description in stage_precedence
+    ]
+
+
+def build_client_aggregate(staging_df: pd.DataFrame, as_of: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Aggregate staging events to one row per client for the client-level rules.
+
+    Columns: `<event_type>_count`, `first_<event_type>_date` and `last_<event_type>_date`
+    per event type, `first_event_date`, `last_event_date`, `unique_plans`, `all_plans` and
+    `days_since_last_event` (whole days).
+
+    Args:
+        staging_df: Staging events with event_date parsed
+        as_of: Reference date for days since last event. If None, uses today's date.
+
+    Returns:
+        pd.DataFrame: The per-client aggregate indexed by client_id
+    """
+    as_of = pd.Timestamp.now().normalize() if as_of is None else pd.Timestamp(as_of)
+
+    by_type = staging_df.groupby(['client_id', 'event_type'])['event_date'].agg(['size', 'min', 'max']).unstack()
+    counts = by_type['size'].fillna(0).astype(int).add_suffix('_count')
+    first_dates = by_type['min'].add_prefix('first_').add_suffix('_date')
+    last_dates = by_type['max'].add_prefix('last_').add_suffix('_date')
+
+    by_client = staging_df.groupby('client_id').agg(
+        first_event_date=('event_date', 'min'),
+        last_event_date=('event_date', 'max'),
+        unique_plans=('plan', 'nunique')
+    )
+    # Distinct plans in order of first appearance
+    plans = staging_df[['client_id', 'plan']].dropna().drop_duplicates()
+    all_plans = plans['plan'].astype(str).groupby(plans['client_id']).agg(','.join).rename('all_plans')
+
+    clients = pd.concat([counts, first_dates, last_dates, by_client, all_plans], axis=1)
+    clients.columns.name = None
+
+    # Rules may reference any funnel event type, even if absent from this data
+    for event_type in ['applied', 'docs_submitted', 'rejected', 'signed', 'churned']:
+        if f'{event_type}_count' not in clients.columns:
+            clients[f'{event_type}_count'] = 0
+            clients[f'first_{event_type}_date'] = pd.NaT
+            clients[f'last_{event_type}_date'] = pd.NaT
+
+    clients['days_since_last_event'] = (as_of - clients['last_event_date']).dt.days
+    return clients
+
+
+def evaluate_rules(staging_df: pd.DataFrame, rules: Optional[List[InconsistencyRule]] = None,
+                   as_of: Optional[pd.Timestamp] = None, clients: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Evaluate all rules together and return their violations in a uniform long format.
+
+    The client aggregate is built once; every rule is a column of one boolean matrix per
+    level, and violations are expanded from its nonzero cells, so adding a rule adds no
+    scan of the events.
+
+    Args:
+        staging_df: Staging events with event_date parsed
+        rules: Rules to evaluate. If None, uses all registered rules.
+        as_of: Reference date for days since last event. If None, uses today's date.
+        clients: Client aggregate from `build_client_aggregate`. If None, it is built from staging_df.
+
+    Returns:
+        pd.DataFrame: One row per violation with client_id, record_id (event rules only),
+            rule_code, inconsistency_type, severity, description, level and relevant_date,
+            in client and rule order
+    """
+    rules = list(RULES.values()) if rules is None else rules
+    columns = ['client_id', 'record_id', 'rule_code', 'inconsistency_type', 'severity', 'description', 'level',
+               'relevant_date']
+
+    frames = {}
+    if any(rule.level == 'client' for rule in rules):
+        if clients is None:
+            clients = build_client_aggregate(staging_df, as_of)
+        frames['client'] = clients.reset_index()
+    if any(rule.level == 'event' for rule in rules):
+        frames['event'] = staging_df.reset_index(drop=True)
+
+    violations = []
+    for level, frame in frames.items():
+        level_rules = [rule for rule in rules if rule.level == level]
+        matrix = np.column_stack([
+            rule.predicate(frame).fillna(False).to_numpy(dtype=bool) for rule in level_rules
+        ])
+        row_positions, rule_positions = np.nonzero(matrix)
+
+        dates = np.column_stack([
+            pd.to_datetime(frame[rule.date_column]).to_numpy() for rule in level_rules
+        ])
+        result = pd.DataFrame({
+            'client_id': frame['client_id'].to_numpy()[row_positions],
+            'record_id': (frame['record_id'].to_numpy()[row_positions] if level == 'event'
+                          else np.full(len(row_positions), np.nan)),
+            'rule_code': np.array([rule.code for rule in level_rules])[rule_positions],
+            'inconsistency_type': np.array([rule.inconsistency_type for rule in level_rules])[rule_positions],
+            'severity': np.array([rule.severity for rule in level_rules])[rule_positions],
+            'description': np.array([rule.description for rule in level_rules])[rule_positions],
+            'level': level,
+            'relevant_date': dates[row_positions, rule_positions],
+            'rule_order': np.array([rules.index(rule) for rule in level_rules])[rule_positions]
+        })
+        violations.append(result)
+
+    if not violations:
+        return pd.DataFrame(columns=columns)
+
+    result_df = pd.concat(violations, ignore_index=True)
+    result_df = result_df.sort_values(['client_id', 'rule_order'], kind='stable', ignore_index=True)[columns]
+    result_df['record_id'] = result_df['record_id'].astype('Int64')
+    return result_df
+
+
+# -------------------------------
+# Client-level rules
+# -------------------------------
+@register_rule('Q1_multiple_applications', 'client', 'Medium',
+               'Client has multiple application events', 'first_applied_date')
+def _multiple_applications(clients: pd.DataFrame) -> pd.Series:
+    return clients['applied_count'] > 1
+
+
+@register_rule('Q2_signed_without_applied', 'client', 'High',
+               'Client signed without applying first', 'first_signed_date')
+def _signed_without_applied(clients: pd.DataFrame) -> pd.Series:
+    return (clients['signed_count'] > 0) & (clients['applied_count'] == 0)
+
+
+@register_rule('Q3_churned_without_signed', 'client', 'High',
+               'Client churned without ever signing', 'first_churned_date')
+def _churned_without_signed(clients: pd.DataFrame) -> pd.Series:
+    return (clients['churned_count'] > 0) & (clients['signed_count'] == 0)
+
+
+@register_rule('Q6_long_inactive_unsigned', 'client', 'Low',
+               'Unsigned client with long inactivity (>60 days) - potential at-risk', 'last_event_date')
+def _long_inactive_unsigned(clients: pd.DataFrame) -> pd.Series:
+    return (clients['signed_count'] == 0) & (clients['days_since_last_event'] > 60)
+
+
+for _rule in precedence_rules(STAGE_PRECEDENCE):
+    add_rule(_rule)
+
+
+@register_rule('signed_without_docs', 'client', 'Low',
+               'Applied and signed without docs submission', 'first_signed_date')
+def _signed_without_docs(clients: pd.DataFrame) -> pd.Series:
+    return (clients['applied_count'] > 0) & (clients['docs_submitted_count'] == 0) & (clients['signed_count'] > 0)
+
+
+@register_rule('plan_inconsistency', 'client', 'Low',
+               'Client has multiple different plans across events', 'first_event_date')
+def _plan_inconsistency(clients: pd.DataFrame) -> pd.Series:
+    return clients['unique_plans'] > 1
+
+
+# -------------------------------
+# Event-level rules
+# -------------------------------
+def _is_blank(values: pd.Series) -> pd.Series:
+    return values.isna() | (values.astype(str).str.strip() == '')
+
+
+# Event rules in priority order: an event is reported once under 'unknown_values', with its first violation
+@register_rule('unknown_plan', 'event', 'Medium',
+               'Plan field has Unknown value', 'event_date', 'unknown_values')
+def _unknown_plan(events: pd.DataFrame) -> pd.Series:
+    return events['plan'] == 'Unknown'
+
+
+@register_rule('unknown_sales_rep', 'event', 'Medium',
+               'Sales rep ID is -1 (missing/unknown)', 'event_date', 'unknown_values')
+def _unknown_sales_rep(events: pd.DataFrame) -> pd.Series:
+    return events['sales_rep_id'] == -1
+
+
+@register_rule('missing_region', 'event', 'Medium',
+               'Region field is missing', 'event_date', 'unknown_values')
+def _missing_region(events: pd.DataFrame) -> pd.Series:
+    return _is_blank(events['region'])
+
+
+@register_rule('missing_marketing_channel', 'event', 'Low',
+               'Marketing channel is missing', 'event_date', 'unknown_values')
+def _missing_marketing_channel(events: pd.DataFrame) -> pd.Series:
+    return _is_blank(events['marketing_channel'])
+
+
+@register_rule('missing_source_system', 'event', 'Low',
+               'Source system is missing', 'event_date', 'unknown_values')
+def _missing_source_system(events: pd.DataFrame) -> pd.Series:
+    return _is_blank(events['source_system'])
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence
+
+
+class HyperLogLog:
+    """
+    A mergeable HyperLogLog sketch for approximate distinct counts.
+
+    Values are hashed with pandas' stable 64-bit hash; the first `precision` bits pick a
+    register and the position of the leftmost 1-bit in the remaining bits is the rank
+    kept in that register.
+    """
+
+    def __init__(self, relative_error: float = 0.01):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_error: Target relative standard error of the distinct count estimate
+        """
+        # Standard error of HLL is 1.04 / sqrt(m) for m registers
+        self.precision = int(np.clip(np.ceil(np.log2((1.04 / relative_error) ** 2)), 4, 18))
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of the estimate for this precision."""
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update(self, values) -> None:
+        """
+        Add values to the sketch.
+
+        Args:
+            values: Array-like of values to count
+        """
+        values = np.asarray(values)
+        if len(values) == 0:
+            return
+
+        hashes = pd.util.hash_array(values)
+        suffix_bits = 64 - self.precision
+        indexes = (hashes >> np.uint64(suffix_bits)).astype(np.int64)
+        suffixes = hashes & np.uint64((1 << suffix_bits) - 1)
+        ranks = suffix_bits - self._bit_length(suffixes) + 1
+        np.maximum.at(self.registers, indexes, ranks.astype(np.uint8))
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """
+        Merge another sketch with the same precision into this one.
+
+        Args:
+            other: The sketch to merge
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        """
+        Estimate the number of distinct values added so far.
+
+        Returns:
+            float: The distinct count estimate
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw_estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+
+        # Linear counting is more accurate for small cardinalities
+        empty_registers = np.count_nonzero(self.registers == 0)
+        if raw_estimate <= 2.5 * m and empty_registers > 0:
+            return m * np.log(m / empty_registers)
+        return raw_estimate
+
+    @staticmethod
+    def _bit_length(values: np.ndarray) -> np.ndarray:
+        """Exact bit length of uint64 values, computed on 32-bit halves."""
+        high = (values >> np.uint64(32)).astype(np.float64)
+        low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        high_length = np.frexp(high)[1]
+        low_length = np.frexp(low)[1]
+        return np.where(high_length > 0, 32 + high_length, low_length)
+
+
+class KLLSketch:
+    """
+    A mergeable KLL sketch for approximate quantiles of numeric values.
+
+    Items live in a stack of compactors; level h holds items with weight 2**h. When a
+    level exceeds its capacity it is sorted and every other item (random offset) is
+    promoted to the next level. Count, sum, min and max are tracked exactly.
+    """
+
+    def __init__(self, rank_error: float = 0.01, seed: Optional[int] = None):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            rank_error: Target normalized rank error of quantile estimates
+            seed: Seed for the compaction offsets (for reproducible results)
+        """
+        # Empirical KLL error model (Apache DataSketches): eps ~= 2.296 / k ** 0.9723
+        self.k = max(8, int(np.ceil((2.296 / rank_error) ** (1 / 0.9723))))
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self) -> float:
+        """Normalized rank error of quantile estimates for this k."""
+        return 2.296 / self.k ** 0.9723
+
+    def update(self, values) -> None:
+        """
+        Add values to the sketch; missing values are ignored.
+
+        Args:
+            values: Array-like of numeric values
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: 'KLLSketch') -> None:
+        """
+        Merge another sketch into this one.
+
+        Args:
+            other: The sketch to merge
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def mean(self) -> float:
+        """Exact mean of the values added so far."""
+        return self.total / self.count if self.count > 0 else np.nan
+
+    def quantiles(self, probabilities: Sequence[float]) -> np.ndarray:
+        """
+        Estimate quantiles of the values added so far.
+
+        Args:
+            probabilities: Quantile probabilities between 0 and 1
+
+        Returns:
+            np.ndarray: The quantile estimates, in the order of `probabilities`
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if self.count == 0:
+            return np.full(len(probabilities), np.nan)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative_weights = np.cumsum(weights[order])
+
+        positions = np.searchsorted(cumulative_weights, probabilities * cumulative_weights[-1], side='left')
+        estimates = items[np.minimum(positions, len(items) - 1)]
+
+        # The extremes are tracked exactly
+        estimates = np.where(probabilities <= 0, self.min, estimates)
+        return np.where(probabilities >= 1, self.max, estimates)
+
+    def _capacity(self, level: int) -> int:
+        """Capacity of a level; lower levels shrink geometrically by 2/3."""
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        """Compact every level that is over capacity, from the bottom up."""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+
+                items = np.sort(items)
+                # An odd item out stays at this level
+                leftover = items[-1:] if len(items) % 2 else items[:0]
+                even_items = items[:len(items) - len(leftover)]
+                promoted = even_items[self._rng.integers(0, 2)::2]
+
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
@@ -0,0 +1,165 @@
+import gzip
+import io
+import os
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Environment variable selecting the output codec of every layer
+CODEC_ENV_VAR = 'PIPELINE_OUTPUT_CODEC'
+
+# Codec name -> file extension appended to output paths
+CODEC_EXTENSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+# Leading bytes identifying compressed files
+MAGIC_BYTES = {'gzip': b'\x1f\x8b', 'zstd': b'\x28\xb5\x2f\xfd'}
+
+
+def resolve_codec(codec: Optional[str] = None) -> str:
+    """
+    Resolve the output codec to use.
+
+    Args:
+        codec: 'none', 'gzip' or 'zstd'. If None, uses the PIPELINE_OUTPUT_CODEC environment
+            variable, defaulting to 'none'.
+
+    Returns:
+        str: The codec name; zstd falls back to gzip when zstandard is not installed
+    """
+    codec = (codec or os.environ.get(CODEC_ENV_VAR) or 'none').lower()
+    if codec not in CODEC_EXTENSIONS:
+        raise ValueError(f"Unknown output codec '{codec}', expected one of {list(CODEC_EXTENSIONS)}")
+    if codec == 'zstd' and zstandard is None:
+        print("zstandard is not installed, falling back to gzip output")
+        codec = 'gzip'
+    return codec
+
+
+def strip_codec_extension(path: str) -> str:
+    """Path without a codec extension."""
+    for extension in CODEC_EXTENSIONS.values():
+        if extension and path.endswith(extension):
+            return path[:-len(extension)]
+    return path
+
+
+def resolve_path(path: str) -> str:
+    """
+    Find the file written for a logical output path, whatever its codec.
+
+    Args:
+        path: Output path without codec extension (e.g. f_churn_data.csv)
+
+    Returns:
+        str: The most recently written existing variant, or `path` if none exists
+    """
+    base_path = strip_codec_extension(path)
+    candidates = [base_path + extension for extension in CODEC_EXTENSIONS.values()]
+    existing = [candidate for candidate in candidates if os.path.exists(candidate)]
+    if not existing:
+        return path
+    return max(existing, key=lambda candidate: os.stat(candidate).st_mtime_ns)
+
+
+def output_exists(path: str) -> bool:
+    """True if the logical output path was written with any codec."""
+    return os.path.exists(resolve_path(path))
+
+
+def detect_codec(path: str) -> str:
+    """
+    Detect the codec of a file from its leading bytes.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        str: 'gzip', 'zstd' or 'none'
+    """
+    with open(path, 'rb') as f:
+        header = f.read(4)
+    for codec, magic in MAGIC_BYTES.items():
+        if header.startswith(magic):
+            return codec
+    return 'none'
+
+
+def open_output(path: str, codec: str) -> io.TextIOBase:
+    """
+    Open a text stream that compresses with the given codec while writing.
+
+    Args:
+        path: Output file path, including the codec extension
+        codec: 'none', 'gzip' or 'zstd'
+
+    Returns:
+        io.TextIOBase: Writable text stream
+    """
+    if codec == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+    if codec == 'zstd':
+        raw = open(path, 'wb')
+        stream = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def write_csv(df: pd.DataFrame, path: str, codec: Optional[str] = None, chunksize: int = 100_000,
+              **to_csv_kwargs) -> str:
+    """
+    Write a dataframe to CSV with the output codec, streaming it in row chunks.
+
+    Each chunk is serialized and compressed straight into the file, so the whole CSV
+    never exists as one in-memory string. Variants of the same output written with
+    another codec are left in place (they may be tracked files); readers go through
+    `resolve_path`, which picks the variant written last.
+
+    Args:
+        df: The dataframe to write
+        path: Logical output path without codec extension (e.g. f_churn_data.csv)
+        codec: 'none', 'gzip' or 'zstd'. If None, uses the PIPELINE_OUTPUT_CODEC environment variable.
+        chunksize: Rows serialized per chunk
+        **to_csv_kwargs: Extra arguments for `DataFrame.to_csv` (index defaults to False)
+
+    Returns:
+        str: Path of the written file, including the codec extension
+    """
+    codec = resolve_codec(codec)
+    base_path = strip_codec_extension(path)
+    output_path = base_path + CODEC_EXTENSIONS[codec]
+    to_csv_kwargs.setdefault('index', False)
+
+    with open_output(output_path, codec) as f:
+        if df.empty:
+            df.to_csv(f, **to_csv_kwargs)
+        for start in range(0, len(df), chunksize):
+            df.iloc[start:start + chunksize].to_csv(f, header=(start == 0), **to_csv_kwargs)
+    return output_path
+
+
+def read_csv(path: str, **read_csv_kwargs):
+    """
+    Read a CSV written with any codec.
+
+    The file is found with `resolve_path` and its codec is detected from its leading
+    bytes, so readers do not need to know how the previous layer was configured.
+
+    Args:
+        path: Logical path of the CSV file (with or without codec extension)
+        **read_csv_kwargs: Extra arguments for `pd.read_csv` (e.g. usecols, chunksize)
+
+    Returns:
+        pd.DataFrame: The loaded data, or a chunk iterator when chunksize is given
+    """
+    resolved_path = resolve_path(path)
+    codec = detect_codec(resolved_path)
+    if codec == 'zstd' and zstandard is None:
+        raise ImportError(f"'{resolved_path}' is zstd-compressed but zstandard is not installed")
+    compression = {'none': None, 'gzip': 'gzip', 'zstd': 'zstd'}[codec]
+    return pd.read_csv(resolved_path, compression=compression, **read_csv_kwargs)
@@ -0,0 +1,128 @@
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from common import compression
+
+
+class AsyncExporter:
+    """
+    A writer pool that serializes and writes dataframes to CSV concurrently.
+
+    Files are written with the output codec of `common.compression`.
+
+    `submit` returns immediately, so the caller keeps computing while earlier outputs
+    are written. `wait` blocks until all writes are done, re-raises the first write
+    error and reports the write throughput of every file.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        """
+        Initialize the exporter.
+
+        Args:
+            max_workers: Number of files written at the same time
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='exporter')
+        self._futures: List[Future] = []
+
+    def submit(self, df: pd.DataFrame, path: str, **to_csv_kwargs) -> Future:
+        """
+        Queue a dataframe to be written to CSV.
+
+        The dataframe must not be modified until `wait` returns.
+
+        Args:
+            df: The dataframe to write
+            path: Output CSV path
+            **to_csv_kwargs: Extra arguments for `compression.write_csv`
+
+        Returns:
+            Future: Resolves to the write statistics of the file
+        """
+        future = self._executor.submit(self._write, df, path, to_csv_kwargs)
+        self._futures.append(future)
+        return future
+
+    @staticmethod
+    def _write(df: pd.DataFrame, path: str, to_csv_kwargs: dict) -> Dict[str, object]:
+        """Write one file and measure its throughput."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        start = time.perf_counter()
+        path = compression.write_csv(df, path, **to_csv_kwargs)
+        seconds = time.perf_counter() - start
+        size_bytes = os.path.getsize(path)
+        return {
+            'path': path,
+            'rows': len(df),
+            'bytes': size_bytes,
+            'seconds': seconds,
+            'mb_per_second': size_bytes / (1024 * 1024) / seconds if seconds > 0 else float('inf')
+        }
+
+    def wait(self) -> List[Dict[str, object]]:
+        """
+        Wait for all queued writes and report their throughput.
+
+        Returns:
+            list: Write statistics (path, rows, bytes, seconds, mb_per_second) of each file
+        """
+        futures, self._futures = self._futures, []
+        stats = [future.result() for future in futures]
+
+        if stats:
+            print(f"\nExported {len(stats)} files ({self.max_workers} writers):")
+            for file_stats in stats:
+                print(f"  {os.path.basename(file_stats['path'])}: {file_stats['rows']} rows, "
+                      f"{file_stats['bytes'] / 1024:.1f} KB in {file_stats['seconds'] * 1000:.1f} ms "
+                      f"({file_stats['mb_per_second']:.1f} MB/s)")
+        return stats
+
+    def shutdown(self) -> None:
+        """
+        Stop the writer pool once pending writes finish, without reporting them.
+        """
+        self._executor.shutdown(wait=True)
+
+    def close(self) -> None:
+        """
+        Wait for pending writes, report them and stop the writer pool.
+        """
+        try:
+            self.wait()
+        finally:
+            self.shutdown()
+
+    def __enter__(self) -> 'AsyncExporter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Do not mask the original error with a write error
+            self.shutdown()
+
+
+def write_csv(df: pd.DataFrame, path: str, exporter: Optional[AsyncExporter] = None, **to_csv_kwargs) -> str:
+    """
+    Write a dataframe to CSV, on the exporter's writer pool when one is given.
+
+    Args:
+        df: The dataframe to write
+        path: Output CSV path
+        exporter: Writer pool to queue the write on. If None, writes synchronously.
+        **to_csv_kwargs: Extra arguments for `compression.write_csv`
+
+    Returns:
+        str: The logical output path (readers resolve the codec extension)
+    """
+    if exporter is not None:
+        exporter.submit(df, path, **to_csv_kwargs)
+    else:
+        compression.write_csv(df, path, **to_csv_kwargs)
+    return path
@@ -0,0 +1,549 @@
+import argparse
+import atexit
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Environment variable with the directory of the span files (default: runs/ in the repo root)
+TRACE_DIR_ENV_VAR = 'PIPELINE_TRACE_DIR'
+
+# Environment variable with the verbosity: 0 = quiet, 1 = run summary (default), 2 = table previews
+VERBOSITY_ENV_VAR = 'PIPELINE_VERBOSITY'
+
+# Environment variable enabling per-span memory tracking (1 = on)
+MEMORY_ENV_VAR = 'PIPELINE_TRACE_MEMORY'
+
+# Allocations of the import machinery and of tracemalloc itself are left out of the top sites
+MEMORY_FILTERS = [
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+]
+
+
+def verbosity() -> int:
+    """Verbosity level from the PIPELINE_VERBOSITY environment variable."""
+    try:
+        return int(os.environ.get(VERBOSITY_ENV_VAR, 1))
+    except ValueError:
+        return 1
+
+
+def preview(df: pd.DataFrame, title: str, rows: int = 5) -> None:
+    """
+    Print the first rows of a dataframe when verbosity is 2 or higher.
+
+    Args:
+        df: The dataframe to preview
+        title: Heading printed above the preview
+        rows: Number of rows to print
+    """
+    if verbosity() >= 2:
+        print(f"\n{title}:")
+        print(df.head(rows))
+
+
+def measure(value) -> tuple:
+    """
+    Row count and size in bytes of a step input or output.
+
+    Dataframes count their rows and in-memory size (without following object
+    references), containers add up their items and paths to written files count
+    the file size.
+
+    Args:
+        value: A dataframe, series, tuple, list, dict or output path
+
+    Returns:
+        tuple: (rows, bytes); each is None when it does not apply
+    """
+    if isinstance(value, pd.DataFrame):
+        return len(value), int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return len(value), int(value.memory_usage(index=True))
+    if isinstance(value, (tuple, list, dict)):
+        items = value.values() if isinstance(value, dict) else value
+        rows = size = None
+        for item_rows, item_bytes in (measure(item) for item in items):
+            if item_rows is not None:
+                rows = (rows or 0) + item_rows
+            if item_bytes is not None:
+                size = (size or 0) + item_bytes
+        return rows, size
+    if isinstance(value, str) and os.path.isfile(value):
+        return None, os.path.getsize(value)
+    return None, None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of the process in MB, or None where `resource` is not available."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+class MemoryTracker:
+    """
+    Measures the memory high-water mark and top allocation sites of nested spans.
+
+    Python allocations are traced with tracemalloc. Its peak is reset when a span
+    starts and folded into the enclosing span when it ends, so each span reports
+    the peak reached while it was open. The process peak RSS cannot be reset, so
+    the growth of the peak RSS during a span shows which step raised it.
+    """
+
+    def __init__(self, top_n: int = 5):
+        """
+        Initialize the memory tracker.
+
+        Args:
+            top_n: Number of allocation sites reported per span
+        """
+        self.top_n = top_n
+        self._local = threading.local()
+
+    def _frames(self) -> list:
+        """Memory state of the open spans of the current thread, innermost last."""
+        if not hasattr(self._local, 'frames'):
+            self._local.frames = []
+        return self._local.frames
+
+    def start(self) -> None:
+        """
+        Start measuring a span.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        frames = self._frames()
+        current, peak = tracemalloc.get_traced_memory()
+        if frames:
+            frames[-1]['peak'] = max(frames[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+
+        frames.append({
+            'current': current,
+            'peak': current,
+            'rss': peak_rss_mb(),
+            'snapshot': tracemalloc.take_snapshot().filter_traces(MEMORY_FILTERS)
+        })
+
+    def stop(self) -> Dict[str, object]:
+        """
+        Finish measuring the innermost span.
+
+        Returns:
+            dict: py_peak_mb, py_retained_mb, rss_peak_mb, rss_growth_mb and top_allocations
+        """
+        frames = self._frames()
+        frame = frames.pop()
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(frame['peak'], peak)
+        if frames:
+            frames[-1]['peak'] = max(frames[-1]['peak'], peak)
+
+        # Sites that allocated the most memory still held at the end of the span
+        snapshot = tracemalloc.take_snapshot().filter_traces(MEMORY_FILTERS)
+        differences = sorted(snapshot.compare_to(frame['snapshot'], 'lineno'),
+                             key=lambda stat: stat.size_diff, reverse=True)
+        top_allocations = [
+            {
+                'site': f"{os.path.join(*stat.traceback[0].filename.split(os.sep)[-2:])}:{stat.traceback[0].lineno}",
+                'size_kb': round(stat.size_diff / 1024, 1),
+                'count': stat.count_diff
+            }
+            for stat in differences[:self.top_n] if stat.size_diff > 0
+        ]
+
+        rss = peak_rss_mb()
+        return {
+            'py_peak_mb': round(peak / (1024 * 1024), 3),
+            'py_retained_mb': round((current - frame['current']) / (1024 * 1024), 3),
+            'rss_peak_mb': round(rss, 1) if rss is not None else None,
+            'rss_growth_mb': round(rss - frame['rss'], 1) if rss is not None else None,
+            'top_allocations': top_allocations
+        }
+
+
+class SpanProfiler:
+    """
+    Profiles nested spans with cProfile, writing one .pstats file per span.
+
+    Only one profiler can be active per thread, so the enclosing span's profiler is
+    paused while a nested span runs. The nested span's stats are added back when the
+    enclosing span ends, so every file covers its whole span. A text summary of the
+    top cumulative functions of each span is appended to profile_summary.txt.
+    """
+
+    def __init__(self, profile_dir: str, top_n: int = 20):
+        """
+        Initialize the span profiler.
+
+        Args:
+            profile_dir: Directory of the .pstats files and the text summary
+            top_n: Number of functions listed per span in the text summary
+        """
+        self.profile_dir = profile_dir
+        self.summary_path = os.path.join(profile_dir, 'profile_summary.txt')
+        self.top_n = top_n
+        self._local = threading.local()
+
+    def _frames(self) -> list:
+        """Profilers of the open spans of the current thread, innermost last."""
+        if not hasattr(self._local, 'frames'):
+            self._local.frames = []
+        return self._local.frames
+
+    def start(self) -> None:
+        """
+        Start profiling a span.
+        """
+        frames = self._frames()
+        if frames:
+            frames[-1]['profile'].disable()
+        profile = cProfile.Profile()
+        frames.append({'profile': profile, 'children': []})
+        profile.enable()
+
+    def stop(self, record: Dict[str, object]) -> Dict[str, object]:
+        """
+        Finish profiling the innermost span and write its stats.
+
+        Args:
+            record: The span record, used to name the files
+
+        Returns:
+            dict: profile_path of the written .pstats file
+        """
+        frames = self._frames()
+        frame = frames.pop()
+        frame['profile'].disable()
+
+        stats = pstats.Stats(frame['profile'])
+        for child_stats in frame['children']:
+            stats.add(child_stats)
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profile_path = os.path.join(self.profile_dir, f"{record['span_id']:04d}_{record['name']}.pstats")
+        stats.dump_stats(profile_path)
+        with open(self.summary_path, 'a', encoding='utf-8') as f:
+            f.write(f"{'=' * 80}\n{record['name']} (span {record['span_id']}, "
+                    f"{record['duration_s']:.3f}s)\n{'=' * 80}\n")
+            stats.stream = f
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+
+        if frames:
+            frames[-1]['children'].append(stats)
+            frames[-1]['profile'].enable()
+        return {'profile_path': profile_path}
+
+
+class Tracer:
+    """
+    Records pipeline steps as spans with duration and input and output sizes.
+
+    Each finished span is appended to a JSON-lines file as soon as it ends, so a
+    crashed run still leaves its completed steps behind. Spans nest: a step called
+    from another step records the outer span as its parent.
+
+    Memory tracking is opt-in, as tracemalloc slows allocations down; when it is
+    off, spans do not touch tracemalloc at all. A disabled tracer records nothing
+    and writes no files.
+    """
+
+    def __init__(self, trace_dir: Optional[str] = None, run_id: Optional[str] = None,
+                 track_memory: Optional[bool] = None, enabled: bool = True):
+        """
+        Initialize the tracer.
+
+        Args:
+            trace_dir: Directory of the span files. If None, uses PIPELINE_TRACE_DIR or runs/ in the repo root.
+            run_id: Identifier of the run. If None, uses the start time and process id.
+            track_memory: Record peak memory and top allocation sites per span. If None, uses PIPELINE_TRACE_MEMORY.
+            enabled: Record spans. Spans of a disabled tracer only run their block.
+        """
+        self.trace_dir = trace_dir or os.environ.get(TRACE_DIR_ENV_VAR) or os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), 'runs'
+        )
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.trace_path = os.path.join(self.trace_dir, f"trace_{self.run_id}.jsonl")
+        self.spans: List[Dict[str, object]] = []
+
+        if track_memory is None:
+            track_memory = os.environ.get(MEMORY_ENV_VAR, '0') not in ('', '0')
+        self.memory_tracker = MemoryTracker() if track_memory else None
+        self.profiler = None
+        self.enabled = enabled
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def enable_profiling(self, top_n: int = 20) -> str:
+        """
+        Profile every following span with cProfile.
+
+        Args:
+            top_n: Number of functions listed per span in the text summary
+
+        Returns:
+            str: Directory of the profile files
+        """
+        if self.profiler is None:
+            self.profiler = SpanProfiler(os.path.join(self.trace_dir, f"profile_{self.run_id}"), top_n=top_n)
+        return self.profiler.profile_dir
+
+    def _stack(self) -> list:
+        """Open spans of the current thread, innermost last."""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, inputs=None, **attributes):
+        """
+        Record a block of work as a span.
+
+        The yielded record can be updated inside the block, e.g. with
+        `record['rows_out'], record['bytes_out'] = measure(result)`.
+
+        Args:
+            name: Span name, usually Class.method
+            inputs: Input data measured for rows_in and bytes_in
+            **attributes: Extra fields stored with the span
+
+        Yields:
+            dict: The span record
+        """
+        if not self.enabled:
+            yield {}
+            return
+
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+
+        stack = self._stack()
+        rows_in, bytes_in = measure(inputs)
+        record = {
+            'run_id': self.run_id,
+            'span_id': span_id,
+            'parent_id': stack[-1] if stack else None,
+            'name': name,
+            'start': datetime.now().isoformat(),
+            'duration_s': None,
+            'rows_in': rows_in,
+            'bytes_in': bytes_in,
+            'rows_out': None,
+            'bytes_out': None,
+            'status': 'ok',
+            **attributes
+        }
+
+        stack.append(span_id)
+        if self.memory_tracker is not None:
+            self.memory_tracker.start()
+        if self.profiler is not None:
+            self.profiler.start()
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['status'] = 'error'
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['duration_s'] = round(time.perf_counter() - start, 6)
+            if self.profiler is not None:
+                record.update(self.profiler.stop(record))
+            if self.memory_tracker is not None:
+                record.update(self.memory_tracker.stop())
+            stack.pop()
+            self._write(record)
+
+    def _write(self, record: Dict[str, object]) -> None:
+        """Keep a finished span and append it to the span file."""
+        with self._lock:
+            self.spans.append(record)
+            os.makedirs(self.trace_dir, exist_ok=True)
+            with open(self.trace_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+    def traced(self, name: Optional[str] = None, input_attr: Optional[str] = None) -> Callable:
+        """
+        Decorator recording each call of a processor method as a span.
+
+        Inputs are the dataframe arguments of the call; methods that work on
+        processor state instead name the attribute holding their input. The
+        return value is measured as the output.
+
+        Args:
+            name: Span name. If None, uses Class.method.
+            input_attr: Attribute of the instance measured as input when the call has no dataframe arguments
+
+        Returns:
+            Callable: The decorator
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+
+                self_arg = args[0] if args else None
+                span_name = name or (
+                    f"{type(self_arg).__name__}.{func.__name__}" if self_arg is not None else func.__name__
+                )
+                inputs = [arg for arg in list(args[1:]) + list(kwargs.values())
+                          if isinstance(arg, (pd.DataFrame, pd.Series))]
+                if not inputs and input_attr is not None:
+                    inputs = getattr(self_arg, input_attr, None)
+
+                with self.span(span_name, inputs=inputs) as record:
+                    result = func(*args, **kwargs)
+                    record['rows_out'], record['bytes_out'] = measure(result)
+                    return result
+            return wrapper
+        return decorator
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Aggregate the recorded spans by name.
+
+        Returns:
+            pd.DataFrame: Calls, total and max duration and rows and bytes in and out per span name
+        """
+        if not self.spans:
+            return pd.DataFrame()
+
+        spans_df = pd.DataFrame(self.spans)
+        # Sums stay empty for steps whose sizes do not apply
+        total = lambda values: values.sum(min_count=1)
+        summary = spans_df.groupby('name', sort=False).agg(
+            calls=('span_id', 'count'),
+            total_s=('duration_s', 'sum'),
+            max_s=('duration_s', 'max'),
+            rows_in=('rows_in', total),
+            rows_out=('rows_out', total),
+            kb_out=('bytes_out', total),
+            errors=('status', lambda status: int((status == 'error').sum()))
+        )
+        summary[['rows_in', 'rows_out']] = summary[['rows_in', 'rows_out']].astype('Int64')
+        summary['kb_out'] = (summary['kb_out'] / 1024).round(1)
+        summary[['total_s', 'max_s']] = summary[['total_s', 'max_s']].round(3)
+
+        if 'py_peak_mb' in spans_df.columns:
+            memory = spans_df.groupby('name', sort=False).agg(
+                py_peak_mb=('py_peak_mb', 'max'),
+                rss_peak_mb=('rss_peak_mb', 'max'),
+                rss_growth_mb=('rss_growth_mb', 'max')
+            )
+            summary = summary.join(memory)
+        return summary.reset_index()
+
+    def print_summary(self) -> None:
+        """
+        Print the span summary table and the span file path.
+        """
+        summary = self.summary()
+        if summary.empty:
+            return
+        print(f"\nRun {self.run_id} steps:")
+        print(summary.astype(object).where(summary.notna(), '-').to_string(index=False))
+
+        if self.memory_tracker is not None:
+            # Leaf spans attribute allocations to the step that made them
+            parent_ids = {record['parent_id'] for record in self.spans}
+            leaves = [record for record in self.spans if record['span_id'] not in parent_ids] or self.spans
+            heaviest = max(leaves, key=lambda record: record['py_peak_mb'])
+            print(f"\nTop allocation sites of {heaviest['name']} (peak {heaviest['py_peak_mb']:.1f} MB):")
+            for allocation in heaviest['top_allocations']:
+                print(f"  {allocation['site']}: {allocation['size_kb']} KB in {allocation['count']} blocks")
+
+        print(f"Spans written to '{self.trace_path}'")
+        if self.profiler is not None:
+            print(f"Profiles written to '{self.profiler.profile_dir}' (summary: {os.path.basename(self.profiler.summary_path)})")
+
+
+# Disabled until an entry point calls `configure`, so importing a processor records nothing
+_tracer = Tracer(enabled=False)
+
+
+def get_tracer() -> Tracer:
+    """The tracer of the current process."""
+    return _tracer
+
+
+def span(name: str, inputs=None, **attributes):
+    """Record a block of work as a span on the process tracer (see `Tracer.span`)."""
+    return _tracer.span(name, inputs=inputs, **attributes)
+
+
+def traced(name: Optional[str] = None, input_attr: Optional[str] = None) -> Callable:
+    """Record each call of a method as a span on the process tracer (see `Tracer.traced`)."""
+    return _tracer.traced(name=name, input_attr=input_attr)
+
+
+def argument_parser(description: str) -> argparse.ArgumentParser:
+    """
+    Command-line parser with the tracing options shared by every entry point.
+
+    Args:
+        description: Description of the script
+
+    Returns:
+        argparse.ArgumentParser: Parser with a --profile flag
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile each step with cProfile and write .pstats files and a summary to runs/')
+    return parser
+
+
+def enable() -> Tracer:
+    """
+    Start recording spans on the process tracer, with a step summary printed at exit.
+
+    Returns:
+        Tracer: The process tracer
+    """
+    if not _tracer.enabled:
+        _tracer.enabled = True
+        atexit.register(_print_run_summary)
+    return _tracer
+
+
+def configure(args: argparse.Namespace) -> None:
+    """
+    Enable tracing for a command-line run and apply the options parsed by `argument_parser`.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    enable()
+    if getattr(args, 'profile', False):
+        _tracer.enable_profiling()
+
+
+def _print_run_summary() -> None:
+    if verbosity() >= 1:
+        _tracer.print_summary()
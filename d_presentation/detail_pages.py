@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+from typing import Dict, List
+
+import pandas as pd
+
+
+# Rows of a detail table embedded in a dashboard; the full table is paged from data shards
+DEFAULT_MAX_TABLE_ROWS = 100
+
+# Rows per data shard
+DEFAULT_PAGE_SIZE = 1000
+
+# Global registry the data shards add their page to
+SHARD_REGISTRY = 'dashboardDetailPages'
+
+
+def write_detail_shards(tables: Dict[str, pd.DataFrame], html_path: str,
+                        page_size: int = DEFAULT_PAGE_SIZE) -> List[dict]:
+    """
+    Write full detail tables as paginated JSON data shards next to a dashboard.
+
+    Each shard holds one page of rows as a JSON object, wrapped in a one-line script
+    that registers it in `window.dashboardDetailPages`. The dashboard adds a script tag
+    when a page is requested, which, unlike fetch(), also works for dashboards opened
+    from disk. Shards are written to `<dashboard name>_data/<table>/` and shards of a
+    previous run are removed.
+
+    Args:
+        tables: Display-formatted tables keyed by table name, in dashboard order
+        html_path: Path of the dashboard HTML file
+        page_size: Rows per shard
+
+    Returns:
+        list: One manifest per table (name, title, columns, rows, page paths relative to the HTML file)
+    """
+    html_dir = os.path.dirname(html_path)
+    data_dir_name = f"{os.path.splitext(os.path.basename(html_path))[0]}_data"
+
+    manifests = []
+    for name, table in tables.items():
+        table_dir = os.path.join(html_dir, data_dir_name, name)
+        shutil.rmtree(table_dir, ignore_errors=True)
+        os.makedirs(table_dir, exist_ok=True)
+
+        pages = []
+        for page, start in enumerate(range(0, len(table), page_size), start=1):
+            payload = {
+                'table': name,
+                'page': page,
+                'columns': list(table.columns),
+                'data': table.iloc[start:start + page_size].to_numpy().tolist()
+            }
+            file_name = f"page_{page:04d}.js"
+            with open(os.path.join(table_dir, file_name), 'w', encoding='utf-8') as f:
+                f.write(f"window.{SHARD_REGISTRY} = window.{SHARD_REGISTRY} || {{}};\n")
+                f.write(f"window.{SHARD_REGISTRY}[{json.dumps(f'{name}/{page}')}] = "
+                        f"{json.dumps(payload, default=str)};\n")
+            pages.append(f"{data_dir_name}/{name}/{file_name}")
+
+        manifests.append({
+            'name': name,
+            'title': table.attrs.get('title', name.replace('_', ' ').title()),
+            'columns': list(table.columns),
+            'rows': len(table),
+            'pages': pages
+        })
+    return manifests
+
+
+def detail_pager_script(manifests: List[dict]) -> str:
+    """
+    JavaScript adding a paginated full-table viewer below a dashboard.
+
+    Pass the result as `post_script` to `write_html`. No shard is loaded until its
+    page is opened.
+
+    Args:
+        manifests: Table manifests from `write_detail_shards`
+
+    Returns:
+        str: The script
+    """
+    return """
+(function() {
+    var registry = window.%(registry)s = window.%(registry)s || {};
+    var tables = %(manifests)s;
+    var plot = document.getElementById('{plot_id}');
+
+    tables.forEach(function(table) {
+        if (!table.pages.length) { return; }
+        var section = document.createElement('div');
+        section.style.cssText = 'font-family: Arial; font-size: 12px; margin: 20px;';
+        var title = document.createElement('h3');
+        title.textContent = table.title + ' - all ' + table.rows + ' rows';
+        var previous = document.createElement('button');
+        var label = document.createElement('span');
+        var next = document.createElement('button');
+        var grid = document.createElement('table');
+        grid.style.cssText = 'border-collapse: collapse; margin-top: 8px;';
+        previous.textContent = 'Previous';
+        next.textContent = 'Load full table';
+        previous.style.display = 'none';
+        label.style.margin = '0 10px';
+        section.append(title, previous, label, next, grid);
+        plot.parentNode.appendChild(section);
+
+        var current = -1;
+        function render(page) {
+            grid.innerHTML = '';
+            var header = grid.insertRow();
+            page.columns.forEach(function(column) {
+                var cell = document.createElement('th');
+                cell.textContent = column;
+                cell.style.cssText = 'background: #E6F3FF; padding: 4px 8px; border: 1px solid #DDD;';
+                header.appendChild(cell);
+            });
+            page.data.forEach(function(values, index) {
+                var row = grid.insertRow();
+                row.style.background = index %% 2 ? '#FFFFFF' : '#F8F9FA';
+                values.forEach(function(value) {
+                    var cell = row.insertCell();
+                    cell.textContent = value;
+                    cell.style.cssText = 'padding: 4px 8px; border: 1px solid #DDD;';
+                });
+            });
+        }
+        function show(index) {
+            current = index;
+            previous.style.display = '';
+            previous.disabled = index === 0;
+            next.textContent = 'Next';
+            next.disabled = index >= table.pages.length - 1;
+            label.textContent = 'Page ' + (index + 1) + ' of ' + table.pages.length;
+            var key = table.name + '/' + (index + 1);
+            if (registry[key]) { render(registry[key]); return; }
+            var script = document.createElement('script');
+            script.src = table.pages[index];
+            script.onload = function() { if (current === index) { render(registry[key]); } };
+            script.onerror = function() { label.textContent = 'Could not load ' + table.pages[index]; };
+            document.head.appendChild(script);
+        }
+        previous.onclick = function() { show(current - 1); };
+        next.onclick = function() { show(current + 1); };
+    });
+})();
+""" % {'registry': SHARD_REGISTRY, 'manifests': json.dumps(manifests)}
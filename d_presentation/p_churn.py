@@ -11,7 +11,12 @@ import numpy as np
 # Add the parent directories to the path to import our processors
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+from common import compression
+from common.tracing import argument_parser, configure, traced
 from c_features.f_churn_data import ChurnDataProcessor
+from c_features.f_sketch_stats import SketchStatsProcessor
+from c_features.feature_store import FeatureStore
+from d_presentation.detail_pages import DEFAULT_MAX_TABLE_ROWS, detail_pager_script, write_detail_shards
 
 
 class ChurnDashboard:
@@ -19,22 +24,72 @@ class ChurnDashboard:
     A specialized dashboard class for churn analysis and insights.
     """
     
-    def __init__(self):
-        """Initialize the churn dashboard."""
-        self.churn_processor = ChurnDataProcessor()
+    # auto: read the features if they are up to date, else recompute them
+    # read: only read the existing features; recompute: always recompute them
+    MODES = ('auto', 'read', 'recompute')
+    
+    # Risk categories in detail table order, and their row colors
+    RISK_ORDER = ['High Risk', 'Medium Risk', 'Low Risk', 'Already Churned', 'Unknown']
+    RISK_ROW_COLORS = {
+        'High Risk': '#FFEBEE',        # Light red
+        'Medium Risk': '#FFF8E1',      # Light orange
+        'Low Risk': '#E8F5E8',         # Light green
+        'Already Churned': '#F3E5F5',  # Light purple
+        'Unknown': '#F5F5F5'           # Light gray
+    }
+    
+    # Default bin counts of the days-since distributions
+    DAYS_SINCE_EVENT_BINS = 30
+    DAYS_SINCE_SIGNED_BINS = 25
+    
+    # Mean durations shown in the summary and insights
+    DURATION_MEANS = ['days_since_last_event', 'days_since_signed', 'days_since_last_event_active']
+    
+    def __init__(self, mode='auto', feature_store=None, max_table_rows=DEFAULT_MAX_TABLE_ROWS,
+                 histogram_bins=None, histogram_bin_width=None, approximate=False):
+        """
+        Initialize the churn dashboard.
+        
+        Args:
+            mode: How features are obtained: 'auto', 'read' or 'recompute'
+            feature_store: Feature store used to check freshness and reuse runs. If None, uses the default store.
+            max_table_rows: Highest-priority rows embedded in the details table; all rows are paged from data shards
+            histogram_bins: Bin count of the days-since distributions. If None, uses each chart's default.
+            histogram_bin_width: Bin width in days of the days-since distributions; overrides histogram_bins
+            approximate: If True, mean durations come from the streamed sketch statistics instead of the churn table
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+        self.feature_store = feature_store or FeatureStore()
+        self.churn_processor = ChurnDataProcessor(feature_store=self.feature_store)
         self.churn_data = None
+        self.max_table_rows = max_table_rows
+        self.histogram_bins = histogram_bins
+        self.histogram_bin_width = histogram_bin_width
+        self.approximate = approximate
+        self.duration_means = {}
+        
+        # Full detail tables written as data shards next to the dashboard
+        self.detail_tables = {}
         
         # Set up plotly template
         self.template = "plotly_white"
         
+    @traced()
     def load_data(self):
         """Load churn data."""
         print("Loading churn data...")
         
-        # Process churn data
-        self.churn_processor.process_churn_analysis()
+        # Recompute the churn features only when they are missing or stale
+        recompute = self.mode == 'recompute' or (
+            self.mode == 'auto' and not self.feature_store.outputs_fresh(self.churn_processor))
+        if recompute:
+            self.churn_processor.process_churn_analysis()
+        else:
+            print("Churn features are up to date, reading existing outputs")
         churn_path = os.path.join(self.churn_processor.output_dir, 'f_churn_data.csv')
-        self.churn_data = pd.read_csv(churn_path)
+        self.churn_data = compression.read_csv(churn_path)
         
         # Convert date columns
         date_columns = ['last_event_date', 'applied_date', 'signed_date', 'churned_date']
@@ -42,45 +97,56 @@ class ChurnDashboard:
             if col in self.churn_data.columns:
                 self.churn_data[col] = pd.to_datetime(self.churn_data[col])
         
+        self.load_duration_means(recompute)
+        
         print("Churn data loaded successfully!")
         print(f"Churn data columns: {list(self.churn_data.columns)}")
         print(f"Churn data shape: {self.churn_data.shape}")
+    
+    @traced(input_attr='churn_data')
+    def load_duration_means(self, recompute=False):
+        """
+        Load the mean durations shown in the summary and insights.
+        
+        Exact means are taken once over the churn table. With approximate=True they are
+        read from `f_duration_quantiles_approx.csv`, whose means are exact sums kept while
+        the sketch statistics stream the staging data, so no full column is scanned here.
+        
+        Args:
+            recompute: If True, the sketch statistics are recomputed even if they exist
+        """
+        if not self.approximate:
+            active_clients = self.churn_data[self.churn_data['risk_category'] != 'Already Churned']
+            self.duration_means = {
+                'days_since_last_event': self.churn_data['days_since_last_event'].mean(),
+                'days_since_signed': self.churn_data['days_since_signed'].mean(),
+                'days_since_last_event_active': active_clients['days_since_last_event'].mean()
+            }
+            return
+        
+        sketch_processor = SketchStatsProcessor(as_of=self.churn_processor.as_of)
+        quantiles_path = os.path.join(sketch_processor.output_dir, 'f_duration_quantiles_approx.csv')
+        if self.mode == 'read' and not compression.output_exists(quantiles_path):
+            raise FileNotFoundError(
+                f"Approximate statistics not found at '{quantiles_path}'; run c_features/f_sketch_stats.py first, "
+                "or generate the dashboard with --mode auto"
+            )
+        if recompute or not compression.output_exists(quantiles_path):
+            sketch_processor.process_sketch_stats()
         
+        means = compression.read_csv(quantiles_path).set_index('metric')['mean']
+        self.duration_means = {metric: means.get(metric, np.nan) for metric in self.DURATION_MEANS}
+        
+    @traced(input_attr='churn_data')
     def create_churn_summary_stats(self):
         """Create churn summary statistics."""
         # Calculate churn statistics
         total_clients = len(self.churn_data)
         clients_with_signed = self.churn_data['signed_date'].notna().sum()
-        avg_days_last_event = self.churn_data['days_since_last_event'].mean()
-        avg_days_since_signed = self.churn_data['days_since_signed'].mean()
-        
-        # Risk categorization based on churn status and days since last event
-        def categorize_risk(row):
-            # If client is already churned, mark as churned
-            if 'is_churned' in row and row['is_churned'] == 1:
-                return 'Already Churned'
-            
-            days = row['days_since_last_event']
-            if pd.isna(days):
-                return 'Unknown'
-            elif days <= 30:
-                return 'Low Risk'
-            elif days <= 60:
-                return 'Medium Risk'
-            else:
-                return 'High Risk'
         
-        # Apply risk categorization considering churn status
-        if 'is_churned' in self.churn_data.columns:
-            self.churn_data['risk_category'] = self.churn_data.apply(categorize_risk, axis=1)
-        else:
-            # Fallback if is_churned column doesn't exist yet
-            self.churn_data['risk_category'] = self.churn_data['days_since_last_event'].apply(
-                lambda days: 'Unknown' if pd.isna(days) else 
-                            'Low Risk' if days <= 30 else 
-                            'Medium Risk' if days <= 60 else 
-                            'High Risk'
-            )
+        # Risk thresholds used by the features layer for risk_category
+        medium_days = self.churn_processor.medium_risk_days
+        high_days = self.churn_processor.high_risk_days
         
         # Count metrics for different risk categories
         churned_count = (self.churn_data['risk_category'] == 'Already Churned').sum()
@@ -89,11 +155,8 @@ class ChurnDashboard:
         low_risk_count = (self.churn_data['risk_category'] == 'Low Risk').sum()
         unknown_risk_count = (self.churn_data['risk_category'] == 'Unknown').sum()
         
-        # Calculate averages for active clients only (excluding churned)
-        active_clients = self.churn_data[self.churn_data['risk_category'] != 'Already Churned']
-        avg_days_last_event = self.churn_data['days_since_last_event'].mean()
-        avg_days_last_event_active = active_clients['days_since_last_event'].mean() if len(active_clients) > 0 else 0
-        avg_days_since_signed = self.churn_data['days_since_signed'].mean()
+        # Average for active clients only (excluding churned), 0 without active clients
+        avg_days_last_event_active = np.nan_to_num(self.duration_means['days_since_last_event_active'])
         
         # Calculate clients at risk (excluding churned)
         at_risk_count = high_risk_count + medium_risk_count
@@ -104,9 +167,9 @@ class ChurnDashboard:
             ['Clients Churned', str(churned_count)],
             ['Clients in Risk of Churn', str(at_risk_count)],
             ['', ''],
-            ['High Risk (>60 days)', str(high_risk_count)],
-            ['Medium Risk (31-60 days)', str(medium_risk_count)],
-            ['Low Risk (≤30 days)', str(low_risk_count)],
+            [f'High Risk (>{high_days} days)', str(high_risk_count)],
+            [f'Medium Risk ({medium_days + 1}-{high_days} days)', str(medium_risk_count)],
+            [f'Low Risk (≤{medium_days} days)', str(low_risk_count)],
             ['Unknown Risk', str(unknown_risk_count)],
             ['', ''],
             ['Avg Days Since Last Event (Active)', f"{avg_days_last_event_active:.1f}"],
@@ -139,6 +202,7 @@ class ChurnDashboard:
         
         return fig
         
+    @traced(input_attr='churn_data')
     def create_churn_distribution(self):
         """Create churn risk distribution chart (excluding already churned)."""
         # Only show risk distribution for active clients (excluding churned)
@@ -169,17 +233,51 @@ class ChurnDashboard:
         
         return fig
     
+    def _binned_histogram(self, values, default_bins, color):
+        """
+        Bin values with NumPy and return the counts as a bar trace.
+        
+        Only bin edges and counts are written to the HTML, so its size does not
+        grow with the number of clients.
+        
+        Args:
+            values: Values to bin; missing values are ignored
+            default_bins: Bin count used when neither histogram_bins nor histogram_bin_width is set
+            color: Bar color
+            
+        Returns:
+            go.Bar: One bar per bin, spanning the bin's edges
+        """
+        values = pd.Series(values, dtype=float).dropna().to_numpy()
+        if len(values) == 0:
+            edges = np.array([0.0, 1.0])
+        elif self.histogram_bin_width:
+            width = self.histogram_bin_width
+            start = np.floor(values.min() / width) * width
+            bin_count = max(1, int(np.ceil((values.max() - start) / width)))
+            edges = start + width * np.arange(bin_count + 1)
+        else:
+            edges = np.histogram_bin_edges(values, bins=self.histogram_bins or default_bins)
+        counts, edges = np.histogram(values, bins=edges)
+        
+        return go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            customdata=np.column_stack([edges[:-1], edges[1:]]),
+            marker_color=color,
+            opacity=0.7,
+            hovertemplate='Days: %{customdata[0]:.0f}-%{customdata[1]:.0f}<br>Count: %{y}<extra></extra>'
+        )
+    
+    @traced(input_attr='churn_data')
     def create_days_since_analysis(self):
         """Create distribution of days since last event (active clients only)."""
         # Only show distribution for active clients (excluding churned)
         active_clients = self.churn_data[self.churn_data['risk_category'] != 'Already Churned']
         
-        fig = go.Figure(go.Histogram(
-            x=active_clients['days_since_last_event'],
-            nbinsx=30,
-            marker_color='#3498DB',
-            opacity=0.7,
-            hovertemplate='Days: %{x}<br>Count: %{y}<extra></extra>'
+        fig = go.Figure(self._binned_histogram(
+            active_clients['days_since_last_event'], self.DAYS_SINCE_EVENT_BINS, '#3498DB'
         ))
         
         fig.update_layout(
@@ -192,17 +290,14 @@ class ChurnDashboard:
         
         return fig
     
+    @traced(input_attr='churn_data')
     def create_days_since_signed_distribution(self):
         """Create distribution of days since signed."""
         signed_data = self.churn_data[self.churn_data['days_since_signed'].notna()]
         
         if len(signed_data) > 0:
-            fig = go.Figure(go.Histogram(
-                x=signed_data['days_since_signed'],
-                nbinsx=25,
-                marker_color='#2ECC71',
-                opacity=0.7,
-                hovertemplate='Days: %{x}<br>Count: %{y}<extra></extra>'
+            fig = go.Figure(self._binned_histogram(
+                signed_data['days_since_signed'], self.DAYS_SINCE_SIGNED_BINS, '#2ECC71'
             ))
             
             fig.update_layout(
@@ -229,6 +324,7 @@ class ChurnDashboard:
             )
             return fig
     
+    @traced(input_attr='churn_data')
     def create_churned_vs_at_risk_comparison(self):
         """Create comparison between churned clients and those at risk."""
         churned_count = (self.churn_data['risk_category'] == 'Already Churned').sum()
@@ -259,84 +355,50 @@ class ChurnDashboard:
         
         return fig
     
+    @traced(input_attr='churn_data')
     def create_churn_events_details_table(self):
         """Create detailed churn events table showing client progression."""
-        # Prepare events details data
-        events_data = []
-        
-        for _, row in self.churn_data.iterrows():
-            client_id = row['client_id']
-            events_row = [str(client_id)]
-            
-            # Add key dates
-            date_columns = ['applied_date', 'signed_date', 'last_event_date', 'churned_date']
-            for col in date_columns:
-                if col in row and pd.notna(row[col]):
-                    # Format date as string for display
-                    if pd.api.types.is_datetime64_any_dtype(self.churn_data[col]):
-                        date_str = row[col].strftime('%Y-%m-%d')
-                    else:
-                        date_str = str(row[col])
-                    events_row.append(date_str)
-                else:
-                    events_row.append('-')
-            
-            # Add metrics and event details
-            days_since_last = row.get('days_since_last_event', '-')
-            days_since_signed = row.get('days_since_signed', '-')
-            last_event_type = row.get('last_event_type', 'Unknown')
-            risk_category = row.get('risk_category', 'Unknown')
-            
-            events_row.extend([
-                str(int(days_since_last)) if pd.notna(days_since_last) else '-',
-                str(int(days_since_signed)) if pd.notna(days_since_signed) else '-',
-                last_event_type,
-                risk_category
-            ])
-            
-            events_data.append(events_row)
-        
-        # Sort by risk category and days since last event
-        def sort_key(x):
-            risk_order = {'High Risk': 0, 'Medium Risk': 1, 'Low Risk': 2, 'Already Churned': 3, 'Unknown': 4}
-            risk_priority = risk_order.get(x[8], 5)  # Risk category is now at index 8
-            days = float(x[5]) if x[5] != '-' else 999  # Days since last event at index 5
-            return (risk_priority, -days)  # Negative days to sort highest days first within same risk
-        
-        events_data.sort(key=sort_key)
+        churn_data = self.churn_data
+        
+        # Sort by risk priority (unlisted categories last), then most days since last event first
+        risk_priority = pd.Categorical(churn_data['risk_category'], categories=self.RISK_ORDER, ordered=True).codes
+        risk_priority = np.where(risk_priority < 0, len(self.RISK_ORDER), risk_priority)
+        days_since_last = np.trunc(churn_data['days_since_last_event'])
+        order = np.lexsort((-days_since_last.fillna(999).to_numpy(), risk_priority))
+        churn_data = churn_data.iloc[order]
+        
+        # Format whole columns for display
+        columns = [churn_data['client_id'].astype(str)]
+        for col in ['applied_date', 'signed_date', 'last_event_date', 'churned_date']:
+            if col not in churn_data.columns:
+                columns.append(pd.Series('-', index=churn_data.index))
+            elif pd.api.types.is_datetime64_any_dtype(churn_data[col]):
+                columns.append(churn_data[col].dt.strftime('%Y-%m-%d').fillna('-'))
+            else:
+                columns.append(churn_data[col].astype(str).where(churn_data[col].notna(), '-'))
+        for col in ['days_since_last_event', 'days_since_signed']:
+            days = np.trunc(churn_data[col])
+            columns.append(days.astype('Int64').astype(str).where(days.notna(), '-'))
+        columns.extend([churn_data['last_event_type'], churn_data['risk_category']])
         
         # Define headers
-        headers = [
-            '<b>Client ID</b>',
-            '<b>Applied Date</b>',
-            '<b>Signed Date</b>',
-            '<b>Last Event Date</b>',
-            '<b>Churned Date</b>',
-            '<b>Days Since Last Event</b>',
-            '<b>Days Since Signed</b>',
-            '<b>Last Event Type</b>',
-            '<b>Risk Category</b>'
+        names = [
+            'Client ID', 'Applied Date', 'Signed Date', 'Last Event Date', 'Churned Date',
+            'Days Since Last Event', 'Days Since Signed', 'Last Event Type', 'Risk Category'
         ]
+        headers = [f'<b>{name}</b>' for name in names]
         
-        # Prepare data for table (transpose for plotly table format)
-        table_data = list(zip(*events_data)) if events_data else [[] for _ in headers]
-        
-                        # Create colors for rows based on risk category
-        def get_row_color(risk_category):
-            if risk_category == 'High Risk':
-                return '#FFEBEE'  # Light red
-            elif risk_category == 'Medium Risk':
-                return '#FFF8E1'  # Light orange
-            elif risk_category == 'Low Risk':
-                return '#E8F5E8'  # Light green
-            elif risk_category == 'Already Churned':
-                return '#F3E5F5'  # Light purple
-            elif risk_category == 'Unknown':
-                return '#F5F5F5'  # Light gray
-            else:
-                return '#FFFFFF'  # White
+        # The full table is paged from data shards; only the highest-risk rows are embedded
+        details = pd.DataFrame(dict(zip(names, [column.to_numpy() for column in columns])))
+        details.attrs['title'] = 'Client Churn Events (Sorted by Risk)'
+        self.detail_tables['churn_events'] = details
+        shown = details.head(self.max_table_rows)
+        
+        # Table values are column lists in plotly table format
+        table_data = [shown[name].tolist() for name in names]
         
-        row_colors = [get_row_color(events_data[i][8]) for i in range(len(events_data))]
+        # Create colors for rows based on risk category; one color column is reused for all columns
+        row_colors = shown['Risk Category'].map(self.RISK_ROW_COLORS).fillna('#FFFFFF').tolist()
         
         fig = go.Figure(data=[go.Table(
             header=dict(
@@ -348,7 +410,7 @@ class ChurnDashboard:
             ),
             cells=dict(
                 values=table_data,
-                fill_color=[row_colors for _ in range(len(headers))],
+                fill_color=[row_colors],
                 align='center',
                 font=dict(size=10, family='Arial'),
                 height=25
@@ -356,7 +418,7 @@ class ChurnDashboard:
         )])
         
         fig.update_layout(
-            title='Detailed Client Churn Events (Sorted by Risk)',
+            title=f'Detailed Client Churn Events (Top {len(shown)} of {len(details)} by Risk)',
             template=self.template,
             height=600,
             margin=dict(t=50, b=20, l=20, r=20)
@@ -364,6 +426,7 @@ class ChurnDashboard:
         
         return fig
     
+    @traced(input_attr='churn_data')
     def create_churn_timeline_analysis(self):
         """Create churn timeline if date data is available."""
         # Check if we have any date columns
@@ -425,6 +488,7 @@ class ChurnDashboard:
             )
             return fig
     
+    @traced(input_attr='churn_data')
     def create_risk_by_client_segment(self):
         """Create risk distribution by client segment."""
         # Create risk level analysis by available segments
@@ -470,10 +534,9 @@ class ChurnDashboard:
             )
             return fig
     
-    def generate_dashboard(self, save_path=None):
-        """Generate the complete churn dashboard as HTML."""
-        print("Generating churn analysis dashboard...")
-        
+    @traced(input_attr='churn_data')
+    def create_dashboard_figure(self):
+        """Create the complete churn dashboard figure."""
         # Create individual charts
         fig1 = self.create_churn_summary_stats()
         fig2 = self.create_churn_distribution()
@@ -490,11 +553,11 @@ class ChurnDashboard:
                 'Summary Statistics', 'Risk Distribution (Active)',
                 'Days Since Last Event (Active)', 'Churned vs At Risk',
                 'Timeline Analysis', 'Risk by Segment',
-                'Detailed Client Events (Sorted by Risk)', ''
+                f'Detailed Client Events (Top {min(self.max_table_rows, len(self.churn_data))} by Risk)', ''
             ),
             specs=[
                 [{"type": "table"}, {"type": "pie"}],
-                [{"type": "histogram"}, {"type": "bar"}],
+                [{"type": "bar"}, {"type": "bar"}],
                 [{"type": "scatter"}, {"type": "bar"}],
                 [{"type": "table", "colspan": 2}, None]
             ],
@@ -556,9 +619,18 @@ class ChurnDashboard:
             font=dict(size=10)
         )
         
+        return subplot_fig
+    
+    @traced(input_attr='churn_data')
+    def generate_dashboard(self, save_path=None):
+        """Generate the complete churn dashboard as HTML."""
+        print("Generating churn analysis dashboard...")
+        subplot_fig = self.create_dashboard_figure()
+        
         # Save or show
         if save_path:
-            pyo.plot(subplot_fig, filename=save_path, auto_open=False)
+            manifests = write_detail_shards(self.detail_tables, save_path)
+            subplot_fig.write_html(save_path, include_plotlyjs=True, post_script=detail_pager_script(manifests))
             print(f"Churn dashboard saved to: {save_path}")
         else:
             pyo.plot(subplot_fig, auto_open=True)
@@ -577,19 +649,19 @@ class ChurnDashboard:
         at_risk_count = high_risk_count + medium_risk_count
         at_risk_percentage = (at_risk_count / total_clients * 100) if total_clients > 0 else 0
         
-        # Calculate average for active clients only
-        active_clients = self.churn_data[self.churn_data['risk_category'] != 'Already Churned']
-        avg_days_last_event_active = active_clients['days_since_last_event'].mean() if len(active_clients) > 0 else 0
+        # Average for active clients only, 0 without active clients
+        avg_days_last_event_active = np.nan_to_num(self.duration_means['days_since_last_event_active'])
         
         insights = [
             f"• {churned_count} clients churned",
             f"• {at_risk_count} clients in risk of churn",
-            f"• {high_risk_count} clients at high risk (>60 days inactive)",
+            f"• {high_risk_count} clients at high risk (>{self.churn_processor.high_risk_days} days inactive)",
             f"• Average days since last activity (active clients): {avg_days_last_event_active:.1f} days"
         ]
         
         return '\n'.join(insights)
     
+    @traced()
     def run_dashboard(self, save_path=None):
         """Run the complete dashboard generation process."""
         self.load_data()
@@ -597,8 +669,24 @@ class ChurnDashboard:
 
 
 if __name__ == "__main__":
+    parser = argument_parser('Generate the churn dashboard.')
+    parser.add_argument('--mode', choices=ChurnDashboard.MODES, default='auto',
+                        help='Read up-to-date features (auto), only read them (read) or always recompute them (recompute)')
+    parser.add_argument('--max-table-rows', type=int, default=DEFAULT_MAX_TABLE_ROWS,
+                        help='Rows embedded in detail tables; the full tables are paged from data shards')
+    parser.add_argument('--histogram-bins', type=int, default=None,
+                        help='Bin count of the days-since distributions')
+    parser.add_argument('--histogram-bin-width', type=float, default=None,
+                        help='Bin width in days of the days-since distributions (overrides --histogram-bins)')
+    parser.add_argument('--approximate', action='store_true',
+                        help='Take mean durations from the streamed sketch statistics')
+    args = parser.parse_args()
+    configure(args)
+
     # Create dashboard instance
-    dashboard = ChurnDashboard()
+    dashboard = ChurnDashboard(mode=args.mode, max_table_rows=args.max_table_rows,
+                               histogram_bins=args.histogram_bins, histogram_bin_width=args.histogram_bin_width,
+                               approximate=args.approximate)
     
     # Create dashboards directory if it doesn't exist
     dashboards_dir = os.path.join(os.path.dirname(__file__), 'dashboards')
@@ -11,7 +11,11 @@ import numpy as np
 # Add the parent directories to the path to import our processors
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+from common import compression
+from common.tracing import argument_parser, configure, traced
 from c_features.f_funnel_data import FunnelDataProcessor
+from c_features.feature_store import FeatureStore
+from d_presentation.detail_pages import DEFAULT_MAX_TABLE_ROWS, detail_pager_script, write_detail_shards
 
 
 class FunnelDashboard:
@@ -19,23 +23,49 @@ class FunnelDashboard:
     A specialized dashboard class for funnel analysis and conversion insights.
     """
     
-    def __init__(self):
-        """Initialize the funnel dashboard."""
-        self.funnel_processor = FunnelDataProcessor()
+    # auto: read the features if they are up to date, else recompute them
+    # read: only read the existing features; recompute: always recompute them
+    MODES = ('auto', 'read', 'recompute')
+    
+    def __init__(self, mode='auto', feature_store=None, max_table_rows=DEFAULT_MAX_TABLE_ROWS):
+        """
+        Initialize the funnel dashboard.
+        
+        Args:
+            mode: How features are obtained: 'auto', 'read' or 'recompute'
+            feature_store: Feature store used to check freshness and reuse runs. If None, uses the default store.
+            max_table_rows: Earliest-applied rows embedded in the events table; all rows are paged from data shards
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+        self.feature_store = feature_store or FeatureStore()
+        self.funnel_processor = FunnelDataProcessor(feature_store=self.feature_store)
         self.funnel_data = None
         self.funnel_metrics = None
+        self.stage_transitions = None
+        self.max_table_rows = max_table_rows
+        
+        # Full detail tables written as data shards next to the dashboard
+        self.detail_tables = {}
         
         # Set up plotly template
         self.template = "plotly_white"
         
+    @traced()
     def load_data(self):
         """Load funnel data."""
         print("Loading funnel data...")
         
-        # Process funnel data
-        _, self.funnel_metrics = self.funnel_processor.process_funnel_analysis()
+        # Recompute the funnel features only when they are missing or stale
+        if self.mode == 'recompute' or (self.mode == 'auto' and not self.feature_store.outputs_fresh(self.funnel_processor)):
+            _, self.funnel_metrics = self.funnel_processor.process_funnel_analysis()
+        else:
+            print("Funnel features are up to date, reading existing outputs")
+            metrics_path = os.path.join(self.funnel_processor.output_dir, 'f_funnel_metrics.csv')
+            self.funnel_metrics = compression.read_csv(metrics_path).iloc[0].to_dict()
         funnel_path = os.path.join(self.funnel_processor.output_dir, 'f_funnel_data.csv')
-        self.funnel_data = pd.read_csv(funnel_path)
+        self.funnel_data = compression.read_csv(funnel_path)
         
         # Convert date columns
         date_columns = ['applied_date', 'docs_submitted_date', 'rejected_date', 'signed_date', 'churned_date']
@@ -43,8 +73,16 @@ class FunnelDashboard:
             if col in self.funnel_data.columns:
                 self.funnel_data[col] = pd.to_datetime(self.funnel_data[col])
         
+        # Load precomputed stage transition statistics; the timeline shows a message without them
+        transitions_path = os.path.join(self.funnel_processor.output_dir, 'f_funnel_transitions.csv')
+        if compression.output_exists(transitions_path):
+            self.stage_transitions = compression.read_csv(transitions_path)
+        else:
+            print(f"Stage transitions not found at '{transitions_path}', run c_features/f_funnel_data.py to create them")
+        
         print("Funnel data loaded successfully!")
         
+    @traced(input_attr='funnel_data')
     def create_funnel_overview(self):
         """Create comprehensive funnel overview visualization with all event types."""
         stages = ['Applied', 'Docs Submitted', 'Rejected', 'Signed', 'Churned', 'Active']
@@ -80,6 +118,7 @@ class FunnelDashboard:
         
         return fig
         
+    @traced(input_attr='funnel_data')
     def create_conversion_rates(self):
         """Create comprehensive conversion rates visualization."""
         rates_data = {
@@ -113,6 +152,7 @@ class FunnelDashboard:
         
         return fig
     
+    @traced(input_attr='funnel_data')
     def create_funnel_metrics_summary(self):
         """Create comprehensive funnel metrics summary table."""
         # Prepare comprehensive summary statistics
@@ -155,63 +195,26 @@ class FunnelDashboard:
         
         return fig
     
+    @traced(input_attr='funnel_data')
     def create_funnel_progression_timeline(self):
         """Create comprehensive timeline analysis of all funnel progression stages."""
-        # Calculate time differences between all stages
-        progression_data = []
-        
-        for _, row in self.funnel_data.iterrows():
-            # Applied → Docs Submitted
-            if pd.notna(row['applied_date']) and pd.notna(row['docs_submitted_date']):
-                days = (row['docs_submitted_date'] - row['applied_date']).days
-                progression_data.append({
-                    'client_id': row['client_id'],
-                    'stage': 'Applied → Docs',
-                    'days': days
-                })
-            
-            # Applied → Rejected
-            if pd.notna(row['applied_date']) and pd.notna(row['rejected_date']):
-                days = (row['rejected_date'] - row['applied_date']).days
-                progression_data.append({
-                    'client_id': row['client_id'],
-                    'stage': 'Applied → Rejected',
-                    'days': days
-                })
-            
-            # Applied → Signed (direct)
-            if pd.notna(row['applied_date']) and pd.notna(row['signed_date']):
-                days = (row['signed_date'] - row['applied_date']).days
-                progression_data.append({
-                    'client_id': row['client_id'],
-                    'stage': 'Applied → Signed',
-                    'days': days
-                })
-            
-            # Signed → Churned
-            if pd.notna(row['signed_date']) and pd.notna(row['churned_date']):
-                days = (row['churned_date'] - row['signed_date']).days
-                progression_data.append({
-                    'client_id': row['client_id'],
-                    'stage': 'Signed → Churned',
-                    'days': days
-                })
-        
-        if progression_data:
-            prog_df = pd.DataFrame(progression_data)
-            
+        # Box statistics are precomputed per transition in the features layer
+        if self.stage_transitions is not None and not self.stage_transitions.empty:
             fig = go.Figure()
             
-            stages = prog_df['stage'].unique()
             colors = ['#F39C12', '#E74C3C', '#3498DB', '#8E44AD']
             
-            for i, stage in enumerate(stages):
-                stage_data = prog_df[prog_df['stage'] == stage]['days']
+            for i, (_, row) in enumerate(self.stage_transitions.iterrows()):
                 fig.add_trace(go.Box(
-                    y=stage_data,
-                    name=stage,
-                    marker_color=colors[i % len(colors)],
-                    boxpoints='outliers'
+                    x=[row['stage']],
+                    q1=[row['p25_days']],
+                    median=[row['p50_days']],
+                    q3=[row['p75_days']],
+                    lowerfence=[row['min_days']],
+                    upperfence=[row['max_days']],
+                    mean=[row['mean_days']],
+                    name=row['stage'],
+                    marker_color=colors[i % len(colors)]
                 ))
             
             fig.update_layout(
@@ -239,6 +242,7 @@ class FunnelDashboard:
             )
             return fig
     
+    @traced(input_attr='funnel_data')
     def create_client_journey_analysis(self):
         """Create comprehensive analysis of different client journey patterns."""
         # Categorize clients by their comprehensive journey
@@ -285,6 +289,7 @@ class FunnelDashboard:
         
         return fig
     
+    @traced(input_attr='funnel_data')
     def create_conversion_funnel_waterfall(self):
         """Create comprehensive waterfall chart showing all funnel stages."""
         # Calculate comprehensive funnel stages
@@ -321,59 +326,43 @@ class FunnelDashboard:
         
         return fig
     
+    @traced(input_attr='funnel_data')
     def create_events_details_table(self):
         """Create detailed events table showing earliest application times for each event type."""
-        # Prepare events details data
-        events_data = []
+        # Sort by applied day (earliest first, clients without an application last)
+        funnel_data = self.funnel_data.sort_values(
+            'applied_date', key=lambda dates: dates.dt.normalize(), na_position='last', kind='stable'
+        )
         
-        for _, row in self.funnel_data.iterrows():
-            client_id = row['client_id']
-            events_row = [str(client_id)]
-            
-            # Add each event date (convert to string for display)
-            event_columns = ['applied_date', 'docs_submitted_date', 'rejected_date', 'signed_date', 'churned_date']
-            for col in event_columns:
-                if pd.notna(row[col]):
-                    # Format date as string for display
-                    date_str = row[col].strftime('%Y-%m-%d') if pd.notna(row[col]) else '-'
-                    events_row.append(date_str)
-                else:
-                    events_row.append('-')
-            
-            # Calculate days between key events
-            days_to_sign = '-'
-            days_to_churn = '-'
-            
-            if pd.notna(row['applied_date']) and pd.notna(row['signed_date']):
-                days_to_sign = str((row['signed_date'] - row['applied_date']).days)
-            
-            if pd.notna(row['signed_date']) and pd.notna(row['churned_date']):
-                days_to_churn = str((row['churned_date'] - row['signed_date']).days)
-            
-            events_row.extend([days_to_sign, days_to_churn])
-            events_data.append(events_row)
+        # Format whole columns for display
+        columns = [funnel_data['client_id'].astype(str)]
+        event_columns = ['applied_date', 'docs_submitted_date', 'rejected_date', 'signed_date', 'churned_date']
+        for col in event_columns:
+            columns.append(funnel_data[col].dt.strftime('%Y-%m-%d').fillna('-'))
         
-        # Sort by applied_date (earliest first)
-        events_data.sort(key=lambda x: x[1] if x[1] != '-' else '9999-12-31')
+        # Days between key events
+        for start_col, end_col in [('applied_date', 'signed_date'), ('signed_date', 'churned_date')]:
+            days = (funnel_data[end_col] - funnel_data[start_col]).dt.days
+            columns.append(days.astype('Int64').astype(str).where(days.notna(), '-'))
         
         # Define headers
-        headers = [
-            '<b>Client ID</b>',
-            '<b>Applied Date</b>',
-            '<b>Docs Submitted</b>',
-            '<b>Rejected Date</b>',
-            '<b>Signed Date</b>',
-            '<b>Churned Date</b>',
-            '<b>Days to Sign</b>',
-            '<b>Days to Churn</b>'
+        names = [
+            'Client ID', 'Applied Date', 'Docs Submitted', 'Rejected Date', 'Signed Date',
+            'Churned Date', 'Days to Sign', 'Days to Churn'
         ]
+        headers = [f'<b>{name}</b>' for name in names]
+        
+        # The full table is paged from data shards; only the earliest applications are embedded
+        details = pd.DataFrame(dict(zip(names, [column.to_numpy() for column in columns])))
+        details.attrs['title'] = 'Client Events Timeline (Earliest Events)'
+        self.detail_tables['funnel_events'] = details
+        shown = details.head(self.max_table_rows)
         
-        # Prepare data for table (transpose for plotly table format)
-        table_data = list(zip(*events_data)) if events_data else [[] for _ in headers]
+        # Table values are column lists in plotly table format
+        table_data = [shown[name].tolist() for name in names]
         
-        # Create colors for alternating rows
-        num_rows = len(events_data)
-        row_colors = ['#F8F9FA' if i % 2 == 0 else '#FFFFFF' for i in range(num_rows)]
+        # Create colors for alternating rows; one color column is reused for all columns
+        row_colors = np.where(np.arange(len(shown)) % 2 == 0, '#F8F9FA', '#FFFFFF').tolist()
         
         fig = go.Figure(data=[go.Table(
             header=dict(
@@ -385,7 +374,7 @@ class FunnelDashboard:
             ),
             cells=dict(
                 values=table_data,
-                fill_color=[row_colors for _ in range(len(headers))],
+                fill_color=[row_colors],
                 align='center',
                 font=dict(size=10, family='Arial'),
                 height=25
@@ -393,7 +382,7 @@ class FunnelDashboard:
         )])
         
         fig.update_layout(
-            title='Detailed Client Events Timeline (Earliest Events)',
+            title=f'Detailed Client Events Timeline (First {len(shown)} of {len(details)} by Applied Date)',
             template=self.template,
             height=600,
             margin=dict(t=50, b=20, l=20, r=20)
@@ -401,6 +390,7 @@ class FunnelDashboard:
         
         return fig
     
+    @traced(input_attr='funnel_data')
     def create_monthly_trend_analysis(self, ax):
         """Create monthly trend analysis if date data is available."""
         # Check if we have date data for trend analysis
@@ -444,10 +434,9 @@ class FunnelDashboard:
                    ha='center', va='center', transform=ax.transAxes, fontsize=12)
             ax.set_title('Trend Analysis', fontsize=14, fontweight='bold')
     
-    def generate_dashboard(self, save_path=None):
-        """Generate the complete funnel dashboard as HTML."""
-        print("Generating funnel analysis dashboard...")
-        
+    @traced(input_attr='funnel_data')
+    def create_dashboard_figure(self):
+        """Create the complete funnel dashboard figure."""
         # Create individual charts
         fig1 = self.create_funnel_overview()
         fig2 = self.create_conversion_rates()
@@ -464,7 +453,7 @@ class FunnelDashboard:
                 'Funnel Overview', 'Conversion Rates',
                 'Journey Patterns', 'Timeline Analysis',
                 'Waterfall Analysis', 'Metrics Summary',
-                'Detailed Client Events Timeline', ''
+                f'Detailed Client Events Timeline (First {min(self.max_table_rows, len(self.funnel_data))} by Applied Date)', ''
             ),
             specs=[
                 [{"type": "bar"}, {"type": "bar"}],
@@ -530,9 +519,18 @@ class FunnelDashboard:
             font=dict(size=10)
         )
         
+        return subplot_fig
+    
+    @traced(input_attr='funnel_data')
+    def generate_dashboard(self, save_path=None):
+        """Generate the complete funnel dashboard as HTML."""
+        print("Generating funnel analysis dashboard...")
+        subplot_fig = self.create_dashboard_figure()
+        
         # Save or show
         if save_path:
-            pyo.plot(subplot_fig, filename=save_path, auto_open=False)
+            manifests = write_detail_shards(self.detail_tables, save_path)
+            subplot_fig.write_html(save_path, include_plotlyjs=True, post_script=detail_pager_script(manifests))
             print(f"Funnel dashboard saved to: {save_path}")
         else:
             pyo.plot(subplot_fig, auto_open=True)
@@ -557,6 +555,7 @@ FUNNEL ANALYSIS INSIGHTS:
         
         return insights
     
+    @traced()
     def run_dashboard(self, save_path=None):
         """Run the complete funnel dashboard generation process."""
         try:
@@ -572,7 +571,15 @@ FUNNEL ANALYSIS INSIGHTS:
 
 # Main execution
 if __name__ == "__main__":
-    dashboard = FunnelDashboard()
+    parser = argument_parser('Generate the funnel dashboard.')
+    parser.add_argument('--mode', choices=FunnelDashboard.MODES, default='auto',
+                        help='Read up-to-date features (auto), only read them (read) or always recompute them (recompute)')
+    parser.add_argument('--max-table-rows', type=int, default=DEFAULT_MAX_TABLE_ROWS,
+                        help='Rows embedded in detail tables; the full tables are paged from data shards')
+    args = parser.parse_args()
+    configure(args)
+
+    dashboard = FunnelDashboard(mode=args.mode, max_table_rows=args.max_table_rows)
     
     # Create dashboards directory if it doesn't exist
     dashboards_dir = os.path.join(os.path.dirname(__file__), 'dashboards')
@@ -11,7 +11,11 @@ import numpy as np
 # Add the parent directories to the path to import our processors
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+from common import compression
+from common.tracing import argument_parser, configure, traced
 from c_features.f_inconsistencies import InconsistenciesProcessor
+from c_features.feature_store import FeatureStore
+from d_presentation.detail_pages import DEFAULT_MAX_TABLE_ROWS, detail_pager_script, write_detail_shards
 
 
 class InconsistenciesDashboard:
@@ -24,54 +28,147 @@ class InconsistenciesDashboard:
     4. Multiple applied events
     """
     
-    def __init__(self):
-        """Initialize the inconsistencies dashboard."""
+    # auto: read the features if they are up to date, else recompute them
+    # read: only read the existing features; recompute: always recompute them
+    MODES = ('auto', 'read', 'recompute')
+    
+    # Inconsistency types listed in the problematic events table, and their labels and row colors
+    PROBLEMATIC_EVENT_LABELS = {
+        'unknown_values': 'Unknown Values',
+        'sequence_violation': 'Sequence Violation',
+        'Q1_multiple_applications': 'Multiple Applications',
+        'docs_submitted_analysis': 'Document Pattern'
+    }
+    SEVERITY_ORDER = ['High', 'Medium', 'Low']
+    PROBLEMATIC_EVENT_COLORS = {
+        'Unknown Values': '#FFEBEE',         # Light red
+        'Sequence Violation': '#FFF3E0',     # Light orange
+        'Multiple Applications': '#E3F2FD',  # Light blue
+        'Document Pattern': '#F3E5F5'        # Light purple
+    }
+    
+    def __init__(self, mode='auto', feature_store=None, max_table_rows=DEFAULT_MAX_TABLE_ROWS):
+        """
+        Initialize the inconsistencies dashboard.
+        
+        Args:
+            mode: How features are obtained: 'auto', 'read' or 'recompute'
+            feature_store: Feature store used to check freshness and reuse runs. If None, uses the default store.
+            max_table_rows: Most severe rows embedded in the problematic events table; all rows are paged from data shards
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+        self.feature_store = feature_store or FeatureStore()
+        self.inconsistencies_processor = InconsistenciesProcessor(feature_store=self.feature_store)
         self.inconsistencies_data = None
+        self.inconsistency_types = None
+        self.inconsistency_details = {}
         self.client_details = None
         self.event_distribution = None
+        self.max_table_rows = max_table_rows
+        
+        # Full detail tables written as data shards next to the dashboard
+        self.detail_tables = {}
         
         # Set up plotly template
         self.template = "plotly_white"
         
         # Data paths
-        self.features_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'c_features', 'data_output')
+        self.features_dir = self.inconsistencies_processor.output_dir
         self.output_dir = os.path.join(os.path.dirname(__file__), 'dashboards')
         
+    @traced()
     def load_data(self):
         """Load inconsistencies data from features layer."""
         print("Loading inconsistencies data from features layer...")
         
-        # Load inconsistencies summary
+        # Recompute the inconsistencies features only when they are missing or stale
+        if self.mode == 'recompute' or (self.mode == 'auto' and not self.feature_store.outputs_fresh(self.inconsistencies_processor)):
+            self.inconsistencies_processor.process_inconsistencies_analysis()
+        else:
+            print("Inconsistencies features are up to date, reading existing outputs")
+        
+        # Load the compact inconsistencies table and decode it with the types dictionary
+        types_path = os.path.join(self.features_dir, 'f_inconsistency_types.csv')
+        if not compression.output_exists(types_path):
+            raise FileNotFoundError(
+                f"Inconsistencies features not found at '{self.features_dir}': run c_features/f_inconsistencies.py "
+                f"first, or generate the dashboard with --mode auto"
+            )
+        self.inconsistency_types = compression.read_csv(types_path).set_index('type_code')
+        
         inconsistencies_path = os.path.join(self.features_dir, 'f_inconsistencies.csv')
-        self.inconsistencies_data = pd.read_csv(inconsistencies_path)
+        self.inconsistencies_data = compression.read_csv(inconsistencies_path, parse_dates=['relevant_date'])
+        type_codes = self.inconsistencies_data['type_code']
+        self.inconsistencies_data['inconsistency_type'] = type_codes.map(self.inconsistency_types['inconsistency_type'])
+        self.inconsistencies_data['severity'] = type_codes.map(self.inconsistency_types['severity'])
+        self.inconsistency_details = {}
         
         # Load client details
         client_details_path = os.path.join(self.features_dir, 'f_inconsistencies_client_details.csv')
-        self.client_details = pd.read_csv(client_details_path)
+        self.client_details = compression.read_csv(client_details_path)
         
         # Load event distribution
         event_dist_path = os.path.join(self.features_dir, 'f_event_distribution_analysis.csv')
-        self.event_distribution = pd.read_csv(event_dist_path)
+        self.event_distribution = compression.read_csv(event_dist_path)
         
         # Convert date columns
         date_columns = ['event_date', 'relevant_date', 'first_applied_date', 'first_signed_date', 
                        'first_docs_date', 'first_rejected_date', 'first_churned_date']
         
-        for df in [self.inconsistencies_data, self.client_details]:
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
+        for col in date_columns:
+            if col in self.client_details.columns:
+                self.client_details[col] = pd.to_datetime(self.client_details[col], errors='coerce')
         
         print("Inconsistencies data loaded successfully!")
     
+    @staticmethod
+    def _format_dates(values):
+        """Format a column of dates as YYYY-MM-DD, with '-' for missing dates."""
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values.dt.strftime('%Y-%m-%d').fillna('-')
+        return values.astype(str).str[:10].where(values.notna(), '-')
+    
+    def _get_inconsistency_details(self, inconsistency_type):
+        """
+        Get the type-specific columns of one inconsistency type.
+        
+        Side tables are only read when a chart needs them and the core table has
+        rows of the type, and only their date columns are parsed. Side table rows are
+        joined to the core table on row_id.
+        """
+        if inconsistency_type in self.inconsistency_details:
+            return self.inconsistency_details[inconsistency_type]
+        
+        core_rows = self.inconsistencies_data.loc[
+            self.inconsistencies_data['inconsistency_type'] == inconsistency_type, ['row_id']
+        ]
+        details_path = os.path.join(self.features_dir, f'f_inconsistencies_{inconsistency_type}.csv')
+        if core_rows.empty or not compression.output_exists(details_path):
+            details = pd.DataFrame(columns=['row_id', 'client_id', 'description'])
+        else:
+            details = core_rows.merge(compression.read_csv(details_path), on='row_id', how='inner')
+            for col in details.columns:
+                if ('date' in col or col.startswith(('first_', 'last_'))) and not col.endswith('_days'):
+                    details[col] = pd.to_datetime(details[col], errors='coerce')
+        
+        # Constant descriptions are only stored in the types dictionary
+        if 'description' not in details.columns:
+            type_info = self.inconsistency_types[self.inconsistency_types['inconsistency_type'] == inconsistency_type]
+            details['description'] = type_info['description'].iloc[0] if not type_info.empty else ''
+        
+        details['inconsistency_type'] = inconsistency_type
+        self.inconsistency_details[inconsistency_type] = details
+        return details
+    
+    @traced(input_attr='inconsistencies_data')
     def create_unknown_values_analysis(self):
         """Analyze fields with unknown values - Scenario 1."""
         print("Creating unknown values analysis...")
         
-        # Filter for unknown values
-        unknown_data = self.inconsistencies_data[
-            self.inconsistencies_data['inconsistency_type'] == 'unknown_values'
-        ].copy()
+        # Get unknown values details
+        unknown_data = self._get_inconsistency_details('unknown_values')
         
         if unknown_data.empty:
             # Create empty chart
@@ -106,14 +203,13 @@ class InconsistenciesDashboard:
         
         return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_sequence_violations_analysis(self):
         """Analyze date coherence/sequence violations - Scenario 2."""
         print("Creating sequence violations analysis...")
         
-        # Filter for sequence violations
-        sequence_data = self.inconsistencies_data[
-            self.inconsistencies_data['inconsistency_type'] == 'sequence_violation'
-        ].copy()
+        # Get sequence violations details
+        sequence_data = self._get_inconsistency_details('sequence_violation')
         
         if sequence_data.empty:
             # Create empty chart
@@ -157,14 +253,13 @@ class InconsistenciesDashboard:
         
         return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_docs_submitted_analysis(self):
         """Analyze the rare docs_submitted events - Scenario 3."""
         print("Creating docs_submitted analysis...")
         
-        # Filter for docs submission analysis
-        docs_data = self.inconsistencies_data[
-            self.inconsistencies_data['inconsistency_type'] == 'docs_submitted_analysis'
-        ].copy()
+        # Get docs submission analysis details
+        docs_data = self._get_inconsistency_details('docs_submitted_analysis')
         
         if docs_data.empty:
             # Create empty chart
@@ -196,14 +291,13 @@ class InconsistenciesDashboard:
         
         return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_multiple_applications_analysis(self):
         """Analyze multiple application events - Scenario 4."""
         print("Creating multiple applications analysis...")
         
-        # Filter for multiple applications
-        apps_data = self.inconsistencies_data[
-            self.inconsistencies_data['inconsistency_type'] == 'Q1_multiple_applications'
-        ].copy()
+        # Get multiple applications details
+        apps_data = self._get_inconsistency_details('Q1_multiple_applications')
         
         if apps_data.empty:
             # Create empty chart
@@ -237,6 +331,7 @@ class InconsistenciesDashboard:
         
         return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_event_distribution_summary(self):
         """Create event distribution summary showing why docs_submitted is rare."""
         print("Creating event distribution summary...")
@@ -272,6 +367,7 @@ class InconsistenciesDashboard:
         
         return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_scenario_summary_table(self):
         """Create a comprehensive summary table of all four scenarios."""
         print("Creating scenario summary table...")
@@ -290,9 +386,7 @@ class InconsistenciesDashboard:
         ]) if not self.inconsistencies_data.empty else 0
         
         # Scenario 3: Documents Submission
-        docs_analysis = self.inconsistencies_data[
-            self.inconsistencies_data['inconsistency_type'] == 'docs_submitted_analysis'
-        ] if not self.inconsistencies_data.empty else pd.DataFrame()
+        docs_analysis = self._get_inconsistency_details('docs_submitted_analysis')
         
         docs_has_submission = len(docs_analysis[docs_analysis['description'] == 'Has docs submission event']) if not docs_analysis.empty else 0
         docs_without_submission = len(docs_analysis[docs_analysis['description'] == 'Applied and signed without docs submission']) if not docs_analysis.empty else 0
@@ -338,6 +432,7 @@ class InconsistenciesDashboard:
         
         return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_problematic_events_table(self):
         """Create a detailed table showing the actual events with issues."""
         print("Creating problematic events table...")
@@ -350,84 +445,58 @@ class InconsistenciesDashboard:
             fig.update_layout(title="Problematic Events Details", template=self.template, height=400)
             return fig
         
-        # Prepare events data for display
-        events_data = []
-        
-        # Process each inconsistency type
-        for _, row in self.inconsistencies_data.iterrows():
-            client_id = row['client_id']
-            issue_type = row['inconsistency_type']
-            description = row['description']
+        # Format each inconsistency type's side table column-wise
+        events_tables = []
+        for issue_type in self.inconsistencies_data['inconsistency_type'].unique():
+            if issue_type not in self.PROBLEMATIC_EVENT_LABELS:
+                continue
+            details = self._get_inconsistency_details(issue_type)
+            column = lambda col: details[col] if col in details.columns else pd.Series('-', index=details.index)
+            no_value = pd.Series('-', index=details.index)
             
-            # Get relevant event details based on issue type
             if issue_type == 'unknown_values':
                 # Show the specific event with unknown values
-                event_date = row.get('event_date', '-')
-                event_type = row.get('event_type', '-')
-                plan = row.get('plan', '-')
-                sales_rep_id = row.get('sales_rep_id', '-')
-                
-                events_data.append([
-                    str(client_id),
-                    'Unknown Values',
-                    event_type,
-                    str(event_date)[:10] if pd.notna(event_date) else '-',
-                    str(plan),
-                    str(sales_rep_id),
-                    description
-                ])
-                
+                event_details = column('event_type')
+                date_info = self._format_dates(column('event_date'))
+                additional_info = column('plan').astype(str)
+                sales_rep = column('sales_rep_id').astype(str)
             elif issue_type == 'sequence_violation':
                 # Show the violating events
-                applied_date = row.get('first_applied_date', '-')
-                signed_date = row.get('first_signed_date', '-')
-                violation_type = row.get('violation_type', '-')
-                
-                events_data.append([
-                    str(client_id),
-                    'Sequence Violation',
-                    violation_type.replace('_', ' ').title(),
-                    f"Applied: {str(applied_date)[:10] if pd.notna(applied_date) else '-'}, Signed: {str(signed_date)[:10] if pd.notna(signed_date) else '-'}",
-                    '-',
-                    '-',
-                    description
-                ])
-                
+                event_details = column('violation_type').str.replace('_', ' ').str.title()
+                date_info = ('Applied: ' + self._format_dates(column('first_applied_date'))
+                             + ', Signed: ' + self._format_dates(column('first_signed_date')))
+                additional_info = sales_rep = no_value
             elif issue_type == 'Q1_multiple_applications':
                 # Show multiple applications info
-                app_count = row.get('application_count', '-')
-                date_range = row.get('date_range_days', '-')
-                relevant_date = row.get('relevant_date', '-')
-                
-                events_data.append([
-                    str(client_id),
-                    'Multiple Applications',
-                    f"{app_count} applications",
-                    str(relevant_date)[:10] if pd.notna(relevant_date) else '-',
-                    f"{date_range} days" if pd.notna(date_range) else '-',
-                    '-',
-                    description
-                ])
-                
-            elif issue_type == 'docs_submitted_analysis':
+                event_details = column('application_count').astype(str) + ' applications'
+                date_info = self._format_dates(column('relevant_date'))
+                date_range = column('date_range_days')
+                additional_info = (date_range.astype(str) + ' days').where(date_range.notna(), '-')
+                sales_rep = no_value
+            else:
                 # Show docs submission patterns
-                applied_count = row.get('applied_count', '-')
-                docs_count = row.get('docs_count', '-')
-                signed_count = row.get('signed_count', '-')
-                first_applied = row.get('first_applied', '-')
-                first_signed = row.get('first_signed', '-')
-                
-                events_data.append([
-                    str(client_id),
-                    'Document Pattern',
-                    f"Applied: {applied_count}, Docs: {docs_count}, Signed: {signed_count}",
-                    f"Applied: {str(first_applied)[:10] if pd.notna(first_applied) else '-'}",
-                    f"Signed: {str(first_signed)[:10] if pd.notna(first_signed) else '-'}",
-                    '-',
-                    description
-                ])
-        
-        if not events_data:
+                event_details = ('Applied: ' + column('applied_count').astype(str)
+                                 + ', Docs: ' + column('docs_count').astype(str)
+                                 + ', Signed: ' + column('signed_count').astype(str))
+                date_info = 'Applied: ' + self._format_dates(column('first_applied'))
+                additional_info = 'Signed: ' + self._format_dates(column('first_signed'))
+                sales_rep = no_value
+            
+            type_info = self.inconsistency_types[self.inconsistency_types['inconsistency_type'] == issue_type]
+            events_tables.append(pd.DataFrame({
+                'severity': type_info['severity'].iloc[0] if not type_info.empty else None,
+                'client_id': details['client_id'].astype(int),
+                'issue_type': self.PROBLEMATIC_EVENT_LABELS[issue_type],
+                'event_details': event_details,
+                'date_info': date_info,
+                'additional_info': additional_info,
+                'sales_rep': sales_rep,
+                'description': details['description']
+            }))
+        
+        events_df = pd.concat(events_tables, ignore_index=True) if events_tables else pd.DataFrame()
+        
+        if events_df.empty:
             # No data to display
             fig = go.Figure()
             fig.add_annotation(text="No events data available for display", 
@@ -436,37 +505,28 @@ class InconsistenciesDashboard:
             fig.update_layout(title="Problematic Events Details", template=self.template, height=400)
             return fig
         
-        # Sort by issue type and client ID
-        events_data.sort(key=lambda x: (x[1], int(x[0])))
+        # Sort by severity (most severe first), issue type and client ID
+        events_df['severity'] = pd.Categorical(events_df['severity'], categories=self.SEVERITY_ORDER, ordered=True)
+        events_df = events_df.sort_values(['severity', 'issue_type', 'client_id'], kind='stable', na_position='last')
+        events_df = events_df.drop(columns='severity')
+        events_df['client_id'] = events_df['client_id'].astype(str)
         
         # Define headers
-        headers = [
-            '<b>Client ID</b>',
-            '<b>Issue Type</b>',
-            '<b>Event Details</b>',
-            '<b>Date Info</b>',
-            '<b>Additional Info</b>',
-            '<b>Sales Rep</b>',
-            '<b>Description</b>'
-        ]
+        names = ['Client ID', 'Issue Type', 'Event Details', 'Date Info', 'Additional Info', 'Sales Rep', 'Description']
+        headers = [f'<b>{name}</b>' for name in names]
         
-        # Prepare data for table (transpose for plotly table format)
-        table_data = list(zip(*events_data)) if events_data else [[] for _ in headers]
-        
-        # Create colors for rows based on issue type
-        def get_row_color(issue_type):
-            if 'Unknown Values' in issue_type:
-                return '#FFEBEE'  # Light red
-            elif 'Sequence Violation' in issue_type:
-                return '#FFF3E0'  # Light orange
-            elif 'Multiple Applications' in issue_type:
-                return '#E3F2FD'  # Light blue
-            elif 'Document Pattern' in issue_type:
-                return '#F3E5F5'  # Light purple
-            else:
-                return '#F5F5F5'  # Light gray
+        # The full table is paged from data shards; only the most severe rows are embedded
+        events_df.columns = names
+        events_df = events_df.reset_index(drop=True)
+        events_df.attrs['title'] = 'Problematic Events Details (Sorted by Severity)'
+        self.detail_tables['problematic_events'] = events_df
+        shown = events_df.head(self.max_table_rows)
         
-        row_colors = [get_row_color(events_data[i][1]) for i in range(len(events_data))]
+        # Table values are column lists in plotly table format
+        table_data = [shown[name].tolist() for name in names]
+        
+        # Create colors for rows based on issue type; one color column is reused for all columns
+        row_colors = shown['Issue Type'].map(self.PROBLEMATIC_EVENT_COLORS).fillna('#F5F5F5').tolist()
         
         fig = go.Figure(data=[go.Table(
             header=dict(
@@ -478,7 +538,7 @@ class InconsistenciesDashboard:
             ),
             cells=dict(
                 values=table_data,
-                fill_color=[row_colors for _ in range(len(headers))],
+                fill_color=[row_colors],
                 align='left',
                 font=dict(size=10, family='Arial'),
                 height=30
@@ -486,7 +546,7 @@ class InconsistenciesDashboard:
         )])
         
         fig.update_layout(
-            title='Problematic Events Details - Identified Issues',
+            title=f'Problematic Events Details - Top {len(shown)} of {len(events_df)} by Severity',
             template=self.template,
             height=500,
             margin=dict(t=50, b=20, l=20, r=20)
@@ -494,6 +554,7 @@ class InconsistenciesDashboard:
         
         return fig
         
+    @traced(input_attr='inconsistencies_data')
     def create_inconsistencies_overview(self):
         """Create overview of inconsistencies by category."""
         if not self.inconsistencies_data.empty:
@@ -530,6 +591,7 @@ class InconsistenciesDashboard:
             )
             return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_business_questions_mapping(self):
         """Create mapping of business questions to inconsistencies."""
         if not self.inconsistencies_data.empty:
@@ -605,6 +667,7 @@ class InconsistenciesDashboard:
             )
             return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_client_distribution(self):
         """Create distribution of clients with inconsistencies."""
         if not self.inconsistencies_data.empty:
@@ -645,6 +708,7 @@ class InconsistenciesDashboard:
             )
             return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_timeline_analysis(self):
         """Create timeline analysis of inconsistencies."""
         if not self.client_details.empty and 'event_date' in self.client_details.columns:
@@ -703,19 +767,11 @@ class InconsistenciesDashboard:
             )
             return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_severity_assessment(self):
         """Create severity assessment of inconsistencies."""
         if not self.inconsistencies_data.empty:
-            # Define severity levels based on inconsistency type
-            severity_mapping = {
-                'multiple_applications': 'Medium',
-                'signed_without_applied': 'High',
-                'churned_without_signed': 'High',
-                'long_inactive_unsigned': 'Low'
-            }
-            
-            # Apply severity mapping
-            self.inconsistencies_data['severity'] = self.inconsistencies_data['inconsistency_type'].map(severity_mapping)
+            # Severity is stored with each inconsistency
             severity_counts = self.inconsistencies_data['severity'].value_counts()
             
             colors = {'High': '#E74C3C', 'Medium': '#F39C12', 'Low': '#2ECC71'}
@@ -754,6 +810,7 @@ class InconsistenciesDashboard:
             )
             return fig
     
+    @traced(input_attr='inconsistencies_data')
     def create_affected_clients_sample(self):
         """Create sample of affected clients."""
         if not self.client_details.empty:
@@ -766,30 +823,18 @@ class InconsistenciesDashboard:
             available_columns = [col for col in display_columns if col in sample_clients.columns]
             
             if available_columns:
-                table_data = []
-                for _, row in sample_clients.iterrows():
-                    table_row = []
-                    for col in available_columns:
-                        value = row[col]
-                        if pd.isna(value):
-                            table_row.append('-')
-                        else:
-                            # Format dates nicely
-                            if col == 'event_date' and pd.notna(value):
-                                try:
-                                    date_val = pd.to_datetime(value)
-                                    table_row.append(date_val.strftime('%Y-%m-%d'))
-                                except:
-                                    table_row.append(str(value))
-                            else:
-                                table_row.append(str(value))
-                    table_data.append(table_row)
-                
-                # Transpose data for plotly table format
-                transposed_data = list(zip(*table_data)) if table_data else [[] for _ in available_columns]
+                # Format whole columns, with dates formatted nicely
+                transposed_data = []
+                for col in available_columns:
+                    values = sample_clients[col]
+                    formatted = values.astype(str).where(values.notna(), '-')
+                    if col == 'event_date':
+                        dates = pd.to_datetime(values, errors='coerce')
+                        formatted = dates.dt.strftime('%Y-%m-%d').where(dates.notna(), formatted)
+                    transposed_data.append(formatted.tolist())
                 
                 header_color = '#E6F3FF'
-                row_colors = ['#F8F9FA', '#FFFFFF']
+                row_colors = np.where(np.arange(len(sample_clients)) % 2 == 0, '#F8F9FA', '#FFFFFF').tolist()
                 
                 fig = go.Figure(data=[go.Table(
                     header=dict(
@@ -800,7 +845,7 @@ class InconsistenciesDashboard:
                     ),
                     cells=dict(
                         values=transposed_data,
-                        fill_color=[row_colors[i % 2] for i in range(len(table_data))],
+                        fill_color=[row_colors],
                         align='center',
                         font=dict(size=10)
                     )
@@ -842,10 +887,9 @@ class InconsistenciesDashboard:
             )
             return fig
     
-    def generate_dashboard(self, save_path=None):
-        """Generate the complete inconsistencies dashboard as HTML - Focused on 4 Key Scenarios."""
-        print("Generating data inconsistencies dashboard (4 key scenarios)...")
-        
+    @traced(input_attr='inconsistencies_data')
+    def create_dashboard_figure(self):
+        """Create the complete inconsistencies dashboard figure - Focused on 4 Key Scenarios."""
         # Create individual charts for the 4 scenarios
         fig0 = self.create_problematic_events_table()  # New events table
         fig1 = self.create_scenario_summary_table()
@@ -859,7 +903,7 @@ class InconsistenciesDashboard:
         subplot_fig = make_subplots(
             rows=4, cols=2,
             subplot_titles=(
-                'Problematic Events Details - Identified Issues', '',
+                'Problematic Events Details - Most Severe Issues', '',
                 'Summary: Four Key Scenarios', 'Scenario 1: Unknown Values',
                 'Scenario 2: Date Sequence Violations', 'Scenario 3: Document Submission Patterns',
                 'Scenario 4: Multiple Applications', 'Event Distribution (Context)'
@@ -927,9 +971,18 @@ class InconsistenciesDashboard:
             font=dict(size=10)
         )
         
+        return subplot_fig
+    
+    @traced(input_attr='inconsistencies_data')
+    def generate_dashboard(self, save_path=None):
+        """Generate the complete inconsistencies dashboard as HTML - Focused on 4 Key Scenarios."""
+        print("Generating data inconsistencies dashboard (4 key scenarios)...")
+        subplot_fig = self.create_dashboard_figure()
+        
         # Save or show
         if save_path:
-            pyo.plot(subplot_fig, filename=save_path, auto_open=False)
+            manifests = write_detail_shards(self.detail_tables, save_path)
+            subplot_fig.write_html(save_path, include_plotlyjs=True, post_script=detail_pager_script(manifests))
             print(f"Inconsistencies dashboard saved to: {save_path}")
         else:
             pyo.plot(subplot_fig, auto_open=True)
@@ -951,16 +1004,13 @@ class InconsistenciesDashboard:
             insights.append(f"• {unknown_count} records have unknown/missing values (plan='Unknown', sales_rep_id=-1)")
         
         # Scenario 2: Sequence Violations  
-        sequence_count = len(self.inconsistencies_data[
-            self.inconsistencies_data['inconsistency_type'] == 'sequence_violation'
-        ])
-        if sequence_count > 0:
-            insights.append(f"• {sequence_count} clients have events in wrong chronological order")
+        sequence_data = self._get_inconsistency_details('sequence_violation')
+        if not sequence_data.empty:
+            insights.append(f"• {sequence_data['client_id'].nunique()} clients have events in wrong chronological order "
+                            f"({len(sequence_data)} violations)")
         
         # Scenario 3: Document Submission Gap
-        docs_analysis = self.inconsistencies_data[
-            self.inconsistencies_data['inconsistency_type'] == 'docs_submitted_analysis'
-        ]
+        docs_analysis = self._get_inconsistency_details('docs_submitted_analysis')
         if not docs_analysis.empty:
             docs_without = len(docs_analysis[docs_analysis['description'] == 'Applied and signed without docs submission'])
             docs_with = len(docs_analysis[docs_analysis['description'] == 'Has docs submission event'])
@@ -984,6 +1034,7 @@ class InconsistenciesDashboard:
         
         return '\n'.join(insights)
     
+    @traced()
     def run_dashboard(self, save_path=None):
         """Run the complete dashboard generation process."""
         self.load_data()
@@ -991,8 +1042,16 @@ class InconsistenciesDashboard:
 
 
 if __name__ == "__main__":
+    parser = argument_parser('Generate the inconsistencies dashboard.')
+    parser.add_argument('--mode', choices=InconsistenciesDashboard.MODES, default='auto',
+                        help='Read up-to-date features (auto), only read them (read) or always recompute them (recompute)')
+    parser.add_argument('--max-table-rows', type=int, default=DEFAULT_MAX_TABLE_ROWS,
+                        help='Rows embedded in detail tables; the full tables are paged from data shards')
+    args = parser.parse_args()
+    configure(args)
+
     # Create dashboard instance
-    dashboard = InconsistenciesDashboard()
+    dashboard = InconsistenciesDashboard(mode=args.mode, max_table_rows=args.max_table_rows)
     
     # Create dashboards directory if it doesn't exist
     dashboards_dir = os.path.join(os.path.dirname(__file__), 'dashboards')
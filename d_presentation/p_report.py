@@ -0,0 +1,311 @@
+import json
+import os
+import sys
+from html import escape
+
+import plotly.offline as pyo
+
+# Add the parent directories to the path to import our dashboards
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common.tracing import argument_parser, configure, traced
+from c_features.feature_store import FeatureStore
+from d_presentation.detail_pages import DEFAULT_MAX_TABLE_ROWS, detail_pager_script, write_detail_shards
+from d_presentation.p_churn import ChurnDashboard
+from d_presentation.p_funnel import FunnelDashboard
+from d_presentation.p_inconsistencies import InconsistenciesDashboard
+
+
+class CombinedReport:
+    """
+    A single HTML report with one tab per dashboard.
+
+    The standalone dashboards each inline the plotly.js bundle and serialize their
+    figures separately. The report loads plotly.js from one shared local asset and
+    stores the figures of all tabs in one data payload, where values repeated across
+    figures (plot templates, client id arrays, etc.) are stored once.
+    """
+
+    MODES = FunnelDashboard.MODES
+
+    # Shared plotly.js asset, relative to the report
+    PLOTLY_ASSET = os.path.join('assets', 'plotly.min.js')
+
+    # JSON values shorter than this are kept inline rather than shared
+    MIN_SHARED_CHARS = 64
+
+    # Key marking a reference to a shared value in the data payload; a genuine one-key
+    # object with this key is escaped by wrapping its value in a list, references are integers
+    REF_KEY = '$ref'
+
+    def __init__(self, mode='auto', feature_store=None, max_table_rows=DEFAULT_MAX_TABLE_ROWS):
+        """
+        Initialize the combined report.
+
+        Args:
+            mode: How features are obtained: 'auto', 'read' or 'recompute'
+            feature_store: Feature store shared by the dashboards. If None, uses the default store.
+            max_table_rows: Rows embedded in detail tables; all rows are paged from data shards
+        """
+        self.feature_store = feature_store or FeatureStore()
+
+        # Tab name -> (tab label, dashboard), in tab order
+        options = dict(mode=mode, feature_store=self.feature_store, max_table_rows=max_table_rows)
+        self.dashboards = {
+            'funnel': ('Funnel', FunnelDashboard(**options)),
+            'churn': ('Churn', ChurnDashboard(**options)),
+            'inconsistencies': ('Inconsistencies', InconsistenciesDashboard(**options))
+        }
+
+    @traced()
+    def load_data(self):
+        """Load the data of every dashboard."""
+        print("Loading report data...")
+        for _, dashboard in self.dashboards.values():
+            dashboard.load_data()
+        print("Report data loaded successfully!")
+
+    def _deduplicate(self, figures: dict) -> dict:
+        """
+        Build the report data payload with repeated values stored once.
+
+        Every JSON object or array that occurs more than once across the figures is
+        moved to a shared list and replaced by {"$ref": <position>}. Shared values are
+        stored with their own repeated children replaced too, and a genuine
+        {"$ref": <value>} object is written as {"$ref": [<value>]}.
+
+        Args:
+            figures: Plotly figure JSON keyed by tab name
+
+        Returns:
+            dict: The figures with references, and the shared values
+        """
+        texts = {}
+        counts = {}
+
+        # Canonical JSON of every object and array, built bottom-up
+        def count(node):
+            if isinstance(node, dict):
+                text = '{' + ','.join(f'{json.dumps(key)}:{count(node[key])}' for key in sorted(node)) + '}'
+            elif isinstance(node, list):
+                text = '[' + ','.join(count(value) for value in node) + ']'
+            else:
+                return json.dumps(node)
+            texts[id(node)] = text
+            counts[text] = counts.get(text, 0) + 1
+            return text
+
+        shared = []
+        positions = {}
+
+        def replace_children(node):
+            if isinstance(node, dict):
+                result = {key: replace(value) for key, value in node.items()}
+                if list(result) == [self.REF_KEY]:
+                    result[self.REF_KEY] = [result[self.REF_KEY]]
+                return result
+            return [replace(value) for value in node]
+
+        def replace(node):
+            if not isinstance(node, (dict, list)):
+                return node
+            text = texts[id(node)]
+            if counts[text] > 1 and len(text) >= self.MIN_SHARED_CHARS:
+                if text not in positions:
+                    positions[text] = len(shared)
+                    shared.append(None)
+                    shared[positions[text]] = replace_children(node)
+                return {self.REF_KEY: positions[text]}
+            return replace_children(node)
+
+        count(figures)
+        return {'figures': {name: replace(figure) for name, figure in figures.items()}, 'shared': shared}
+
+    @staticmethod
+    def _write_plotly_asset(asset_path: str) -> None:
+        """Write the plotly.js bundle unless the asset is already up to date."""
+        plotly_js = pyo.get_plotlyjs()
+        if os.path.exists(asset_path):
+            with open(asset_path, encoding='utf-8') as f:
+                if f.read() == plotly_js:
+                    return
+        os.makedirs(os.path.dirname(asset_path), exist_ok=True)
+        with open(asset_path, 'w', encoding='utf-8') as f:
+            f.write(plotly_js)
+
+    @traced()
+    def generate_report(self, save_path):
+        """
+        Generate the combined report.
+
+        Writes the HTML shell to save_path, the shared plotly.js asset to
+        assets/plotly.min.js next to it, and the data payload and detail table
+        shards to <report name>_data/.
+
+        Args:
+            save_path: Path of the report HTML file
+
+        Returns:
+            str: Path of the report HTML file
+        """
+        print("Generating combined report...")
+        report_dir = os.path.dirname(save_path)
+        data_dir_name = f"{os.path.splitext(os.path.basename(save_path))[0]}_data"
+
+        figures = {}
+        manifests = {}
+        for name, (_, dashboard) in self.dashboards.items():
+            figures[name] = json.loads(dashboard.create_dashboard_figure().to_json())
+            manifests[name] = write_detail_shards(dashboard.detail_tables, save_path)
+
+        # Shared plotly.js asset
+        self._write_plotly_asset(os.path.join(report_dir, self.PLOTLY_ASSET))
+
+        # Deduplicated figure payload
+        payload_path = os.path.join(report_dir, data_dir_name, 'report_data.js')
+        os.makedirs(os.path.dirname(payload_path), exist_ok=True)
+        with open(payload_path, 'w', encoding='utf-8') as f:
+            f.write(f"window.reportData = {json.dumps(self._deduplicate(figures), separators=(',', ':'))};\n")
+
+        with open(save_path, 'w', encoding='utf-8') as f:
+            f.write(self._render_shell(f"{data_dir_name}/report_data.js", manifests))
+
+        payload_kb = os.path.getsize(payload_path) / 1024
+        print(f"Combined report saved to: {save_path} (data payload {payload_kb:.1f} KB)")
+        return save_path
+
+    def _render_shell(self, payload_src: str, manifests: dict) -> str:
+        """
+        HTML shell of the report: one tab per dashboard, each plotted when first opened.
+
+        Args:
+            payload_src: Path of the data payload, relative to the report
+            manifests: Detail table manifests keyed by tab name
+
+        Returns:
+            str: The HTML document
+        """
+        buttons = []
+        panels = []
+        pagers = []
+        for name, (label, _) in self.dashboards.items():
+            buttons.append(f'<button class="tab" data-tab="{name}">{escape(label)}</button>')
+            panels.append(f'<div class="panel" id="panel-{name}"><div id="plot-{name}"></div></div>')
+            pagers.append(detail_pager_script(manifests[name]).replace('{plot_id}', f'plot-{name}'))
+
+        return """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Client Analytics Report</title>
+<style>
+    body { font-family: Arial; margin: 0; }
+    .tabs { display: flex; gap: 4px; padding: 10px 20px 0; border-bottom: 1px solid #DDD; }
+    .tab { border: 1px solid #DDD; border-bottom: none; background: #F8F9FA; padding: 8px 16px; cursor: pointer; }
+    .tab.active { background: #FFFFFF; font-weight: bold; }
+    .panel { display: none; }
+    .panel.active { display: block; }
+</style>
+<script src="%(plotly)s"></script>
+<script src="%(payload)s"></script>
+</head>
+<body>
+<div class="tabs">
+%(buttons)s
+</div>
+%(panels)s
+<script>
+(function() {
+    var shared = window.reportData.shared;
+    var plotted = {};
+
+    function resolve(node) {
+        if (Array.isArray(node)) { return node.map(resolve); }
+        if (node && typeof node === 'object') {
+            if (Object.keys(node).length === 1 && node.hasOwnProperty('%(ref)s')) {
+                var value = node['%(ref)s'];
+                if (Array.isArray(value)) {
+                    // Escaped genuine object
+                    var escaped = {};
+                    escaped['%(ref)s'] = resolve(value[0]);
+                    return escaped;
+                }
+                return resolve(shared[value]);
+            }
+            var result = {};
+            Object.keys(node).forEach(function(key) { result[key] = resolve(node[key]); });
+            return result;
+        }
+        return node;
+    }
+
+    function showTab(name) {
+        document.querySelectorAll('.tab').forEach(function(tab) {
+            tab.classList.toggle('active', tab.dataset.tab === name);
+        });
+        document.querySelectorAll('.panel').forEach(function(panel) {
+            panel.classList.toggle('active', panel.id === 'panel-' + name);
+        });
+        // Tabs are plotted on first open, when their panel has a size
+        if (!plotted[name]) {
+            var figure = resolve(window.reportData.figures[name]);
+            Plotly.newPlot('plot-' + name, figure.data, figure.layout, {responsive: true});
+            plotted[name] = true;
+        }
+    }
+
+    document.querySelectorAll('.tab').forEach(function(tab) {
+        tab.onclick = function() { showTab(tab.dataset.tab); };
+    });
+    showTab(%(first)s);
+})();
+</script>
+<script>
+%(pagers)s
+</script>
+</body>
+</html>
+""" % {
+            'plotly': self.PLOTLY_ASSET.replace(os.sep, '/'),
+            'payload': payload_src,
+            'buttons': '\n'.join(buttons),
+            'panels': '\n'.join(panels),
+            'ref': self.REF_KEY,
+            'first': json.dumps(next(iter(self.dashboards))),
+            'pagers': '\n'.join(pagers)
+        }
+
+    @traced()
+    def run_report(self, save_path):
+        """Run the complete report generation process."""
+        try:
+            self.load_data()
+            report_path = self.generate_report(save_path)
+            print("Combined report generation completed successfully!")
+            return report_path
+
+        except Exception as e:
+            print(f"Error generating combined report: {str(e)}")
+            raise
+
+
+# -------------------------------
+# Generate the combined report
+# -------------------------------
+if __name__ == "__main__":
+    parser = argument_parser('Generate the combined funnel, churn and inconsistencies report.')
+    parser.add_argument('--mode', choices=CombinedReport.MODES, default='auto',
+                        help='Read up-to-date features (auto), only read them (read) or always recompute them (recompute)')
+    parser.add_argument('--max-table-rows', type=int, default=DEFAULT_MAX_TABLE_ROWS,
+                        help='Rows embedded in detail tables; the full tables are paged from data shards')
+    args = parser.parse_args()
+    configure(args)
+
+    report = CombinedReport(mode=args.mode, max_table_rows=args.max_table_rows)
+
+    # Create dashboards directory if it doesn't exist
+    dashboards_dir = os.path.join(os.path.dirname(__file__), 'dashboards')
+    os.makedirs(dashboards_dir, exist_ok=True)
+
+    # Generate the report and save to dashboards folder
+    report.run_report(os.path.join(dashboards_dir, 'analytics_report.html'))
@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Add the parent directories to the path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure
+
+
+def load_client_ids() -> list:
+    """Client ids to request, taken from the churn features."""
+    churn_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'c_features', 'data_output', 'f_churn_data.csv')
+    return compression.read_csv(churn_path, usecols=['client_id'])['client_id'].tolist()
+
+
+def send_request(base_url: str, client_ids: list) -> float:
+    """
+    Send one lookup request and return its latency in milliseconds.
+
+    Single clients use GET /clients/<id>; batches use POST /clients/batch.
+    """
+    if len(client_ids) == 1:
+        request = urllib.request.Request(f"{base_url}/clients/{client_ids[0]}")
+    else:
+        request = urllib.request.Request(
+            f"{base_url}/clients/batch",
+            data=json.dumps({'client_ids': client_ids}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def run_load_test(base_url: str, requests: int, concurrency: int, batch_size: int, seed: int = 0) -> dict:
+    """
+    Send lookup requests concurrently and summarise latency and throughput.
+
+    Args:
+        base_url: Base URL of the feature server
+        requests: Total number of requests
+        concurrency: Number of requests in flight
+        batch_size: Clients per request (1 = single lookups)
+        seed: Seed for the random client selection
+
+    Returns:
+        dict: Request count, p50/p99/max latency in ms and requests and clients per second
+    """
+    rng = np.random.default_rng(seed)
+    client_ids = load_client_ids()
+    batches = [rng.choice(client_ids, size=batch_size).tolist() for _ in range(requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = np.array(list(executor.map(lambda batch: send_request(base_url, batch), batches)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'batch_size': batch_size,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'max_ms': round(float(latencies.max()), 3),
+        'requests_per_second': round(requests / elapsed, 1),
+        'clients_per_second': round(requests * batch_size / elapsed, 1)
+    }
+
+
+# -------------------------------
+# Run the load test
+# -------------------------------
+if __name__ == "__main__":
+    parser = argument_parser('Load test the feature server.')
+    parser.add_argument('--url', default='http://127.0.0.1:8050')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=1)
+    args = parser.parse_args()
+    configure(args)
+
+    results = run_load_test(args.url, args.requests, args.concurrency, args.batch_size)
+    print("\nLoad Test Results:")
+    for name, value in results.items():
+        print(f"  {name}: {value}")
@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+# Add the parent directories to the path to import our processors
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from common import compression
+from common.tracing import argument_parser, configure
+from c_features.client_index import ClientFeatureIndex
+from c_features.feature_store import FeatureStore
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """
+    An HTTP server that handles requests on a fixed-size thread pool.
+    """
+
+    # A deeper listen backlog avoids connection retries (1s stalls) under bursts
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_workers: int = 8):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feature-server')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._handle_request, request, client_address)
+
+    def _handle_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        # Pool threads are not daemons: stop accepting requests, then finish the in-flight ones
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class FeatureService:
+    """
+    Serves client features from the client feature index.
+
+    The index is opened on the first request and stays open between requests. When the
+    feature store manifest or a feature output file changes, the index is reopened
+    before the next lookup and rebuilt if its source fingerprints differ.
+    """
+
+    def __init__(self, index: Optional[ClientFeatureIndex] = None, feature_store: Optional[FeatureStore] = None):
+        """
+        Initialize the feature service.
+
+        Args:
+            index: Client feature index to serve. If None, uses the default index.
+            feature_store: Feature store whose manifest triggers reloads. If None, uses the default store.
+        """
+        self.index = index or ClientFeatureIndex()
+        self.feature_store = feature_store or FeatureStore()
+        self._reload_lock = threading.Lock()
+        self._source_mtimes = None
+
+    def _current_mtimes(self) -> tuple:
+        """Modification times of the manifest and the indexed feature files."""
+        paths = [self.feature_store.manifest_path] + [
+            compression.resolve_path(os.path.join(self.index.features_dir, file_name))
+            for file_name in self.index.SOURCES.values()
+        ]
+        return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in paths)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reopen the index if its sources changed since the last load.
+
+        Returns:
+            bool: True if the index was reopened
+        """
+        mtimes = self._current_mtimes()
+        if mtimes == self._source_mtimes:
+            return False
+
+        with self._reload_lock:
+            if mtimes == self._source_mtimes:
+                return False
+            print("Feature outputs changed, reloading client feature index...")
+            self.index.close()
+            self.index.connect()
+            self._source_mtimes = mtimes
+            return True
+
+    def get_client(self, client_id: int) -> dict:
+        """
+        Get the features of one client.
+
+        Args:
+            client_id: The client to look up
+
+        Returns:
+            dict: The client's funnel, churn and inconsistency rows and summary fields
+        """
+        self.reload_if_changed()
+        return self._client_result(client_id, self.index.lookup(client_id))
+
+    def get_clients(self, client_ids: list) -> list:
+        """
+        Get the features of several clients.
+
+        Args:
+            client_ids: The clients to look up
+
+        Returns:
+            list: The `get_client` result of each client, in request order
+        """
+        self.reload_if_changed()
+        rows = self.index.lookup_many(client_ids)
+        return [self._client_result(client_id, rows[client_id]) for client_id in client_ids]
+
+    def _client_result(self, client_id: int, rows: dict) -> dict:
+        """Summary fields and feature rows of one client."""
+        churn = rows['churn'][0] if rows['churn'] else {}
+        funnel = rows['funnel'][0] if rows['funnel'] else {}
+
+        return {
+            'client_id': client_id,
+            'found': any(rows.values()),
+            'risk_category': churn.get('risk_category'),
+            'funnel_status': self._funnel_status(funnel),
+            'features': rows
+        }
+
+    @staticmethod
+    def _funnel_status(funnel: dict) -> Optional[str]:
+        """Furthest funnel stage reached by a client."""
+        for stage in ['churned', 'signed', 'rejected', 'docs_submitted', 'applied']:
+            if funnel.get(f'{stage}_date') is not None:
+                return stage
+        return None
+
+
+class FeatureRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler for the feature service.
+
+    Routes:
+        GET  /health                 Service status
+        GET  /clients/<client_id>    One client
+        GET  /clients?ids=1,2,3      Several clients
+        POST /clients/batch          Several clients, body {"client_ids": [1, 2, 3]}
+    """
+
+    service: FeatureService = None
+    CLIENT_PATH = re.compile(r'^/clients/(\d+)$')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+            return
+
+        match = self.CLIENT_PATH.match(url.path)
+        if match:
+            self._send_json(200, self.service.get_client(int(match.group(1))))
+            return
+
+        if url.path == '/clients':
+            ids = parse_qs(url.query).get('ids', [''])[0]
+            try:
+                client_ids = [int(client_id) for client_id in ids.split(',') if client_id]
+            except ValueError:
+                self._send_json(400, {'error': 'ids must be comma-separated integers'})
+                return
+            self._send_json(200, {'clients': self.service.get_clients(client_ids)})
+            return
+
+        self._send_json(404, {'error': f'Unknown path {url.path}'})
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/clients/batch':
+            self._send_json(404, {'error': f'Unknown path {self.path}'})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            client_ids = [int(client_id) for client_id in body['client_ids']]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': 'Body must be {"client_ids": [<int>, ...]}'})
+            return
+
+        self._send_json(200, {'clients': self.service.get_clients(client_ids)})
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Per-request logging would dominate latency under load
+        pass
+
+
+def run_server(host: str = '127.0.0.1', port: int = 8050, max_workers: int = 8) -> None:
+    """
+    Run the feature server until interrupted.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on
+        max_workers: Number of request handler threads
+    """
+    FeatureRequestHandler.service = FeatureService()
+    FeatureRequestHandler.service.reload_if_changed()
+
+    server = ThreadPoolHTTPServer((host, port), FeatureRequestHandler, max_workers=max_workers)
+    print(f"Feature server listening on http://{host}:{port} ({max_workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down feature server...")
+    finally:
+        server.server_close()
+
+
+# -------------------------------
+# Run the feature server
+# -------------------------------
+if __name__ == "__main__":
+    parser = argument_parser('Serve client features over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    configure(args)
+
+    run_server(args.host, args.port, args.workers)
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path to import the layers, as the scripts do
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+
+@pytest.fixture
+def features_dir(tmp_path):
+    """Feature outputs of two clients, as read by the client feature index."""
+    files = {
+        'f_funnel_data.csv': (
+            'client_id,applied_date,docs_submitted_date,rejected_date,signed_date,churned_date\n'
+            '1001,2023-01-05,,,2023-01-07,\n'
+            '1003,2023-01-08,,,,\n'
+        ),
+        'f_churn_data.csv': (
+            'client_id,last_event_date,signed_date,churned_date,is_churned,days_since_last_event,risk_category\n'
+            '1001,2023-01-07,2023-01-07,,0,10,Low Risk\n'
+            '1003,2023-01-09,,,0,70,High Risk\n'
+        ),
+        'f_inconsistencies.csv': (
+            'row_id,client_id,type_code,severity_code,relevant_date\n'
+            '0,1003,2,1,2023-01-09\n'
+            '1,1003,4,2,2023-01-08\n'
+        ),
+        'f_inconsistency_types.csv': (
+            'type_code,inconsistency_type,severity_code,severity,description,relevant_date_column\n'
+            '2,Q6_long_inactive_unsigned,1,Low,Unsigned client with long inactivity,relevant_date\n'
+            '4,Q1_multiple_applications,2,Medium,Client has multiple application events,relevant_date\n'
+        ),
+        'f_inconsistencies_Q6_long_inactive_unsigned.csv': (
+            'row_id,client_id,relevant_date,days_inactive,signed_count\n'
+            '0,1003,2023-01-09,70,0\n'
+        ),
+        'f_inconsistencies_Q1_multiple_applications.csv': (
+            'row_id,client_id,relevant_date,application_count,date_range_days\n'
+            '1,1003,2023-01-08,3,1\n'
+        )
+    }
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+    return str(tmp_path)
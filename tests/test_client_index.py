@@ -0,0 +1,69 @@
+import os
+import time
+
+from c_features.client_index import ClientFeatureIndex
+
+
+def make_index(features_dir, cache_size=1024):
+    return ClientFeatureIndex(features_dir=features_dir, index_path=os.path.join(features_dir, 'index.sqlite'),
+                              cache_size=cache_size)
+
+
+def test_lookup_of_a_known_client(features_dir):
+    index = make_index(features_dir)
+
+    rows = index.lookup(1003)
+
+    assert rows['funnel'][0]['applied_date'] == '2023-01-08'
+    assert rows['churn'][0]['risk_category'] == 'High Risk'
+    inconsistencies = {row['inconsistency_type']: row for row in rows['inconsistencies']}
+    assert set(inconsistencies) == {'Q6_long_inactive_unsigned', 'Q1_multiple_applications'}
+    assert inconsistencies['Q6_long_inactive_unsigned']['severity'] == 'Low'
+    # Side table columns are joined in as details
+    assert inconsistencies['Q6_long_inactive_unsigned']['details'] == {
+        'relevant_date': '2023-01-09', 'days_inactive': 70, 'signed_count': 0
+    }
+    assert inconsistencies['Q1_multiple_applications']['details']['application_count'] == 3
+
+
+def test_lookup_many_and_unknown_clients(features_dir):
+    index = make_index(features_dir, cache_size=1)
+
+    rows = index.lookup_many([1001, 9999, 1001])
+
+    assert list(rows) == [1001, 9999]
+    assert rows[1001]['churn'][0]['risk_category'] == 'Low Risk'
+    assert rows[1001]['inconsistencies'] == []
+    assert rows[9999] == {'funnel': [], 'churn': [], 'inconsistencies': []}
+
+
+def test_cached_rows_cannot_be_changed_by_callers(features_dir):
+    index = make_index(features_dir)
+
+    index.lookup(1003)['inconsistencies'][0]['details']['days_inactive'] = -1
+
+    assert index.lookup(1003)['inconsistencies'][0]['details']['days_inactive'] == 70
+
+
+def test_index_is_rebuilt_when_a_source_changes(features_dir):
+    index = make_index(features_dir)
+    index.lookup(1003)
+    assert not index.is_stale()
+
+    # Sizes or modification times differ
+    time.sleep(0.01)
+    churn_path = os.path.join(features_dir, 'f_churn_data.csv')
+    with open(churn_path) as f:
+        content = f.read()
+    with open(churn_path, 'w') as f:
+        f.write(content.replace('High Risk', 'Medium Risk'))
+    assert index.is_stale()
+
+    # A new index object over the same file sees the new rows
+    assert make_index(features_dir).lookup(1003)['churn'][0]['risk_category'] == 'Medium Risk'
+    assert not index.is_stale()
+
+    # Side tables are sources too
+    side_table_path = os.path.join(features_dir, 'f_inconsistencies_Q6_long_inactive_unsigned.csv')
+    os.utime(side_table_path, ns=(0, 0))
+    assert index.is_stale()
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from c_features.f_funnel_data import FunnelDataProcessor
+
+
+def make_funnel():
+    """Client-level funnel of three clients with hand-picked stage dates."""
+    return pd.DataFrame({
+        'client_id': [1, 2, 3],
+        'applied_date': ['2024-01-01', '2024-01-02', '2024-01-03'],
+        'docs_submitted_date': ['2024-01-03', None, None],
+        'rejected_date': [None, None, '2024-01-04'],
+        'signed_date': ['2024-01-05', '2024-01-12', None],
+        'churned_date': [None, '2024-01-22', None]
+    })
+
+
+def test_stage_transitions_summary():
+    summary = FunnelDataProcessor().analyze_stage_transitions(make_funnel()).set_index('stage')
+
+    assert list(summary.index) == ['Applied → Docs', 'Applied → Rejected', 'Applied → Signed', 'Signed → Churned']
+    assert summary['client_count'].tolist() == [1, 1, 2, 1]
+
+    signed = summary.loc['Applied → Signed']
+    assert (signed['min_days'], signed['p50_days'], signed['max_days']) == (4, 7, 10)
+    assert signed['mean_days'] == pytest.approx(7.0)
+    assert signed['p25_days'] == pytest.approx(5.5)
+    assert summary.loc['Signed → Churned', 'mean_days'] == pytest.approx(10.0)
+
+
+def test_stage_transitions_without_durations():
+    funnel = make_funnel()
+    funnel[['docs_submitted_date', 'rejected_date', 'signed_date', 'churned_date']] = None
+
+    summary = FunnelDataProcessor().analyze_stage_transitions(funnel)
+
+    assert summary.empty
+    assert 'p90_days' in summary.columns
+
+
+def test_funnel_cube_rollups_match_base_table():
+    funnel = make_funnel()
+    # Client 3 has no dimensions and is counted as 'unknown'
+    dimensions = pd.DataFrame({
+        'client_id': [1, 2],
+        'plan': ['Basic', 'Premium'],
+        'region': ['US', 'US'],
+        'marketing_channel': ['Email', 'Referral'],
+        'sales_rep_id': [57, -1]
+    })
+    processor = FunnelDataProcessor()
+
+    cube = processor.create_funnel_cube(funnel, dimensions)
+
+    # Every grouping set partitions the same clients
+    totals = cube.groupby('grouping_id')[['total_clients', 'applied_clients', 'signed_clients', 'churned_clients']].sum()
+    assert len(totals) == 2 ** len(processor.CUBE_DIMENSIONS)
+    assert (totals['total_clients'] == 3).all()
+    assert (totals['applied_clients'] == 3).all()
+    assert (totals['signed_clients'] == 2).all()
+    assert (totals['churned_clients'] == 1).all()
+
+    grand_total = cube[cube['grouping_id'] == 15].iloc[0]
+    assert grand_total[processor.CUBE_DIMENSIONS].tolist() == ['ALL'] * 4
+    assert grand_total['conversion_rate'] == pytest.approx(2 / 3)
+    assert grand_total['churn_rate'] == pytest.approx(0.5)
+
+    # Rolled up by everything but plan
+    by_plan = cube[cube['grouping_id'] == 0b1110].set_index('plan')['total_clients'].to_dict()
+    assert by_plan == {'Basic': 1, 'Premium': 1, 'unknown': 1}
+
+    # Dimensions are labels of a single type, including sales_rep_id
+    assert set(cube['sales_rep_id']) == {'57', '-1', 'unknown', 'ALL'}
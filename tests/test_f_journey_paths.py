@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+from c_features.f_journey_paths import JourneyPathsProcessor
+
+
+def make_processor(**kwargs):
+    """Journey paths processor over three hand-made client journeys, given out of order."""
+    processor = JourneyPathsProcessor(**kwargs)
+    processor.staging_df = pd.DataFrame({
+        'record_id': [4, 1, 2, 3, 5, 6, 7, 8],
+        'client_id': [1, 1, 1, 1, 2, 2, 3, 3],
+        'event_type': pd.Categorical(['churned', 'applied', 'applied', 'signed',
+                                      'applied', 'signed', 'applied', 'rejected']),
+        'event_date': pd.to_datetime(['2024-01-20', '2024-01-01', '2024-01-02', '2024-01-04',
+                                      '2024-01-03', '2024-01-13', '2024-01-05', '2024-01-06']),
+        'plan': ['Basic', 'Basic', 'Basic', 'Premium', 'Basic', 'Basic', 'Premium', 'Premium']
+    })
+    return processor
+
+
+def test_journey_paths_are_counted_per_client():
+    processor = make_processor()
+    steps = processor.create_journey_steps()
+
+    assert steps[steps['client_id'] == 1]['event_type'].astype(str).tolist() == ['applied', 'applied', 'signed', 'churned']
+    assert steps[steps['client_id'] == 1]['step'].tolist() == [1, 2, 3, 4]
+
+    path_counts = processor.create_path_counts(processor.create_client_paths(steps)).set_index('path')
+    assert path_counts['client_count'].to_dict() == {
+        'applied>applied>signed>churned': 1, 'applied>rejected': 1, 'applied>signed': 1
+    }
+    assert path_counts['client_share'].sum() == pytest.approx(1.0)
+
+
+def test_collapsed_repeats_and_sankey_edges():
+    processor = make_processor(collapse_repeats=True)
+    steps = processor.create_journey_steps()
+
+    path_counts = processor.create_path_counts(processor.create_client_paths(steps)).set_index('path')
+    assert path_counts['path_length'].to_dict() == {'applied>rejected': 2, 'applied>signed': 2, 'applied>signed>churned': 3}
+
+    edges = processor.create_sankey_edges(steps).set_index(['source', 'target'])['client_count']
+    assert edges.to_dict() == {
+        ('1:applied', '2:rejected'): 1,
+        ('1:applied', '2:signed'): 2,
+        ('2:signed', '3:churned'): 1
+    }
+
+
+def test_transition_matrix_counts_and_state_dwell():
+    matrix = make_processor().create_transition_matrix().set_index(['from_event_type', 'to_event_type'])
+
+    assert matrix.loc[('applied', 'signed'), 'transition_count'] == 2
+    assert matrix.loc[('applied', 'applied'), 'transition_count'] == 1
+    assert matrix.loc[('signed', 'end'), 'transition_count'] == 1
+    assert matrix.loc[('churned', 'end'), 'probability'] == 1.0
+    # Every state of the N x N matrix is present, with probabilities summing to 1
+    assert len(matrix) == 4 * 5
+    assert matrix.groupby(level='from_event_type')['probability'].sum().tolist() == pytest.approx([1.0] * 4)
+
+    # Dwell in 'applied' before the next event: 1, 2, 10 and 1 days, whatever the next state
+    applied = matrix.loc['applied']
+    assert applied['median_dwell_days'].unique().tolist() == [1.5]
+    assert applied['p90_dwell_days'].unique().tolist() == pytest.approx([7.6])
+    # 'signed' is left once, to 'churned' after 16 days
+    assert matrix.loc['signed', 'median_dwell_days'].unique().tolist() == [16.0]
+
+
+def test_transition_matrix_by_segment():
+    matrix = make_processor(segment_column='plan').create_transition_matrix()
+
+    assert (matrix['segment_column'] == 'plan').all()
+    counts = matrix.groupby('segment')['transition_count'].sum().to_dict()
+    assert counts == {'Basic': 5, 'Premium': 3}
+
+
+def test_transition_matrix_of_empty_staging():
+    processor = make_processor()
+    processor.staging_df = processor.staging_df.iloc[:0]
+
+    assert processor.create_transition_matrix().empty
+    assert processor.create_journey_steps().empty
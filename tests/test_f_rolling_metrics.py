@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from c_features.f_rolling_metrics import RollingMetricsProcessor
+
+
+def make_processor(windows=(1, 3)):
+    """Rolling metrics processor over a hand-made week of staging events."""
+    processor = RollingMetricsProcessor(windows=windows)
+    processor.staging_df = pd.DataFrame({
+        'client_id': [1, 1, 2, 2, 3, 3, 1],
+        'event_type': ['applied', 'applied', 'applied', 'signed', 'applied', 'signed', 'churned'],
+        'event_date': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-03',
+                                      '2024-01-05', '2024-01-05', '2024-01-07']),
+        # The repeated application of client 1 is not counted
+        'event_rank': [1, 2, 1, 1, 1, 1, 1]
+    })
+    return processor
+
+
+def test_daily_counts_cover_every_day():
+    daily = make_processor().create_daily_event_counts()
+
+    assert len(daily) == 7
+    assert daily['applied'].tolist() == [1, 1, 0, 0, 1, 0, 0]
+    assert daily['signed'].tolist() == [0, 0, 1, 0, 1, 0, 0]
+    assert daily['churned'].tolist() == [0, 0, 0, 0, 0, 0, 1]
+
+
+def test_rolling_counts_match_window_sums():
+    processor = make_processor()
+    daily = processor.create_daily_event_counts()
+
+    rolling = processor.create_rolling_metrics(daily)
+
+    for window in processor.windows:
+        frame = rolling[rolling['window_days'] == window].set_index('date')
+        expected = daily.rolling(window, min_periods=1).sum().astype(int)
+        pd.testing.assert_frame_equal(frame[processor.EVENT_TYPES], expected, check_names=False, check_freq=False)
+
+    three_days = rolling[rolling['window_days'] == 3].set_index('date')
+    assert three_days['applied'].tolist() == [1, 2, 2, 1, 1, 1, 1]
+    # 2024-01-05: applied 1 (01-05), signed 2 (01-03, 01-05)
+    assert three_days.loc['2024-01-05', 'conversion_rate'] == pytest.approx(2.0)
+    # 2024-01-07: churned 1, signed 1 (01-05)
+    assert three_days.loc['2024-01-07', 'churn_rate'] == pytest.approx(1.0)
+    assert pd.isna(three_days.loc['2024-01-02', 'churn_rate'])
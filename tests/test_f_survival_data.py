@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from c_features.f_survival_data import SurvivalDataProcessor
+
+
+def make_durations():
+    """Five signed clients: churned after 2, 3 and 5 days, censored at 3 and 7 days."""
+    return pd.DataFrame({
+        'client_id': [1, 2, 3, 4, 5],
+        'plan': ['Basic', 'Basic', 'Premium', 'Premium', 'Premium'],
+        'region': ['US', 'US', 'US', 'CA', 'CA'],
+        'days': [2.0, 3.0, 3.0, 5.0, 7.0],
+        'is_event': [1, 1, 0, 1, 0]
+    })
+
+
+def test_kaplan_meier_matches_hand_computed_curve():
+    curves = SurvivalDataProcessor(as_of='2024-12-31').create_survival_curves(make_durations())
+
+    overall = curves[curves['segment_type'] == 'all'].set_index('days')
+    assert overall['at_risk'].tolist() == [5, 4, 2, 1]
+    assert overall['events'].tolist() == [1, 1, 1, 0]
+    assert overall['censored'].tolist() == [0, 1, 0, 1]
+    # S(2) = 4/5, S(3) = 4/5 * 3/4, S(5) = 0.6 * 1/2, S(7) = 0.3
+    assert overall['survival'].tolist() == pytest.approx([0.8, 0.6, 0.3, 0.3])
+
+    premium = curves[(curves['segment_type'] == 'plan') & (curves['segment_value'] == 'Premium')]
+    assert premium['at_risk'].tolist() == [3, 2, 1]
+    assert premium['survival'].tolist() == pytest.approx([1.0, 0.5, 0.5])
+
+
+def test_durations_censor_active_clients_and_skip_invalid_ones():
+    processor = SurvivalDataProcessor(as_of='2024-01-31')
+    processor.churn_df = pd.DataFrame({
+        'client_id': [1, 2, 3, 4],
+        'signed_date': pd.to_datetime(['2024-01-01', '2024-01-11', None, '2024-01-20']),
+        # Client 4 churned before signing
+        'churned_date': pd.to_datetime(['2024-01-21', None, '2024-01-05', '2024-01-10']),
+        'plan': ['Basic', 'Premium', 'Basic', 'Basic'],
+        'region': ['US', 'US', 'CA', 'CA']
+    })
+
+    durations = processor.create_durations().set_index('client_id')
+
+    assert durations.index.tolist() == [1, 2]
+    assert durations['days'].tolist() == [20.0, 20.0]
+    assert durations['is_event'].tolist() == [1, 0]
+
+
+def test_durations_reject_several_rows_per_client():
+    processor = SurvivalDataProcessor(as_of='2024-01-31')
+    processor.churn_df = pd.DataFrame({
+        'client_id': [1, 1],
+        'signed_date': pd.to_datetime(['2024-01-01', '2024-01-01']),
+        'churned_date': pd.to_datetime([None, None]),
+        'plan': ['Basic', 'Premium'],
+        'region': ['US', 'US']
+    })
+
+    with pytest.raises(ValueError):
+        processor.create_durations()
@@ -0,0 +1,98 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from c_features.feature_store import FeatureStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(store_dir=str(tmp_path / 'store'))
+
+
+@pytest.fixture
+def processor(tmp_path):
+    """A processor stand-in with one staging file and one output."""
+    staging_path = tmp_path / 'staging.csv'
+    staging_path.write_text('client_id,event_type\n1,applied\n')
+    output_dir = tmp_path / 'output'
+    output_dir.mkdir()
+    (output_dir / 'f_test_data.csv').write_text('client_id,value\n1,10\n')
+    return SimpleNamespace(staging_csv_path=str(staging_path), output_dir=str(output_dir),
+                           VERSION='1', OUTPUT_PATTERNS=['f_test_*.csv'])
+
+
+def store_run(store, processor):
+    """Store the processor's output the way the processors do after a run."""
+    key = store.make_key(processor.staging_csv_path, 'SimpleNamespace', processor.VERSION)
+    store.put(key, [os.path.join(processor.output_dir, 'f_test_data.csv')], 'SimpleNamespace', processor.VERSION)
+    return key
+
+
+def test_key_depends_on_input_version_and_params(store, processor):
+    key = store.make_key(processor.staging_csv_path, 'Processor', '1', {'as_of': '2024-01-31'})
+
+    assert store.make_key(processor.staging_csv_path, 'Processor', '1', {'as_of': '2024-01-31'}) == key
+    assert store.make_key(processor.staging_csv_path, 'Processor', '2', {'as_of': '2024-01-31'}) != key
+    assert store.make_key(processor.staging_csv_path, 'Processor', '1', {'as_of': '2024-02-29'}) != key
+    assert store.make_key(processor.staging_csv_path, 'Other', '1', {'as_of': '2024-01-31'}) != key
+
+    with open(processor.staging_csv_path, 'a') as f:
+        f.write('2,signed\n')
+    assert store.make_key(processor.staging_csv_path, 'Processor', '1', {'as_of': '2024-01-31'}) != key
+
+
+def test_stored_run_is_restored(store, processor, tmp_path):
+    key = store_run(store, processor)
+
+    restored = store.restore(key, str(tmp_path / 'restored'))
+
+    assert [os.path.basename(path) for path in restored] == ['f_test_data.csv']
+    with open(restored[0]) as f:
+        assert f.read() == 'client_id,value\n1,10\n'
+    assert store.restore('0' * 64, str(tmp_path / 'restored')) is None
+
+
+def test_outputs_fresh_until_an_input_output_or_version_changes(store, processor):
+    assert not store.outputs_fresh(processor)
+    store_run(store, processor)
+    assert store.outputs_fresh(processor)
+
+    # A newer code version
+    processor.VERSION = '2'
+    assert not store.outputs_fresh(processor)
+    processor.VERSION = '1'
+    assert store.outputs_fresh(processor)
+
+    # A sibling output the stored run did not write
+    sibling_path = os.path.join(processor.output_dir, 'f_test_extra.csv')
+    with open(sibling_path, 'w') as f:
+        f.write('client_id\n')
+    assert not store.outputs_fresh(processor)
+    os.remove(sibling_path)
+
+    # An edited output
+    with open(os.path.join(processor.output_dir, 'f_test_data.csv'), 'a') as f:
+        f.write('2,20\n')
+    assert not store.outputs_fresh(processor)
+    store_run(store, processor)
+    assert store.outputs_fresh(processor)
+
+    # A changed staging file
+    with open(processor.staging_csv_path, 'a') as f:
+        f.write('2,signed\n')
+    assert not store.outputs_fresh(processor)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, processor):
+    store = FeatureStore(store_dir=str(tmp_path / 'store'), max_entries=2)
+    output_path = os.path.join(processor.output_dir, 'f_test_data.csv')
+    keys = []
+    for version in ['1', '2', '3']:
+        keys.append(store.make_key(processor.staging_csv_path, 'SimpleNamespace', version))
+        store.put(keys[-1], [output_path], 'SimpleNamespace', version)
+
+    entries = store.load_manifest()['entries']
+    assert set(entries) == set(keys[1:])
+    assert not os.path.exists(os.path.join(store.store_dir, keys[0]))
@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from c_features.client_index import ClientFeatureIndex
+from c_features.feature_store import FeatureStore
+from e_serving.s_feature_server import FeatureRequestHandler, FeatureService, ThreadPoolHTTPServer
+
+
+@pytest.fixture
+def service(features_dir, tmp_path):
+    index = ClientFeatureIndex(features_dir=features_dir, index_path=os.path.join(features_dir, 'index.sqlite'))
+    return FeatureService(index=index, feature_store=FeatureStore(store_dir=str(tmp_path / 'store')))
+
+
+@pytest.fixture
+def server_url(service):
+    """URL of a feature server on a free local port, shut down after the test."""
+    FeatureRequestHandler.service = service
+    server = ThreadPoolHTTPServer(('127.0.0.1', 0), FeatureRequestHandler, max_workers=2)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def get_json(url, data=None):
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_service_summarises_a_known_client(service):
+    result = service.get_client(1003)
+
+    assert result['found']
+    assert result['risk_category'] == 'High Risk'
+    assert result['funnel_status'] == 'applied'
+    assert len(result['features']['inconsistencies']) == 2
+
+    assert service.get_client(1001)['funnel_status'] == 'signed'
+    assert not service.get_client(9999)['found']
+
+
+def test_service_reloads_changed_outputs(service, features_dir):
+    assert service.get_client(1003)['risk_category'] == 'High Risk'
+    assert not service.reload_if_changed()
+
+    churn_path = os.path.join(features_dir, 'f_churn_data.csv')
+    with open(churn_path) as f:
+        content = f.read()
+    with open(churn_path, 'w') as f:
+        f.write(content.replace('High Risk', 'Medium Risk'))
+    os.utime(churn_path, ns=(0, 0))
+
+    assert service.get_client(1003)['risk_category'] == 'Medium Risk'
+
+
+def test_http_routes(server_url):
+    assert get_json(f'{server_url}/health') == {'status': 'ok'}
+    assert get_json(f'{server_url}/clients/1003')['risk_category'] == 'High Risk'
+
+    clients = get_json(f'{server_url}/clients?ids=1003,1001')['clients']
+    assert [client['client_id'] for client in clients] == [1003, 1001]
+
+    body = json.dumps({'client_ids': [1001, 9999]}).encode('utf-8')
+    clients = get_json(f'{server_url}/clients/batch', data=body)['clients']
+    assert [client['found'] for client in clients] == [True, False]
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get_json(f'{server_url}/clients?ids=abc')
+    assert error.value.code == 400
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from c_features.f_sketch_stats import SketchStatsProcessor
+from c_features.sketches import HyperLogLog, KLLSketch
+
+
+@pytest.mark.parametrize('distinct', [100, 10_000, 200_000])
+def test_hyperloglog_within_error_bound(distinct):
+    sketch = HyperLogLog(relative_error=0.01)
+    # Every value is added twice, duplicates must not change the estimate
+    values = np.arange(distinct)
+    sketch.update(values)
+    sketch.update(values)
+
+    assert abs(sketch.estimate() - distinct) <= 3 * sketch.relative_error * distinct
+
+
+def test_hyperloglog_merge_equals_union():
+    left, right, union = HyperLogLog(0.02), HyperLogLog(0.02), HyperLogLog(0.02)
+    left.update(np.arange(0, 60_000))
+    right.update(np.arange(40_000, 100_000))
+    union.update(np.arange(0, 100_000))
+
+    left.merge(right)
+
+    np.testing.assert_array_equal(left.registers, union.registers)
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(0.1))
+
+
+def test_kll_quantiles_within_rank_error():
+    values = np.random.default_rng(7).exponential(scale=30.0, size=100_000)
+    sketch = KLLSketch(rank_error=0.01, seed=7)
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+
+    probabilities = [0.1, 0.5, 0.9, 0.99]
+    estimates = sketch.quantiles(probabilities)
+
+    # Rank of each estimate among the exact values
+    ranks = np.searchsorted(np.sort(values), estimates, side='right') / len(values)
+    assert np.all(np.abs(ranks - probabilities) <= 3 * sketch.rank_error)
+    assert sketch.count == len(values)
+    assert sketch.mean() == pytest.approx(values.mean())
+    assert (sketch.min, sketch.max) == (values.min(), values.max())
+    # Far fewer items are kept than were added
+    assert sum(len(level) for level in sketch.levels) < len(values) / 10
+
+
+def test_duration_quantiles_do_not_depend_on_chunk_size():
+    results = []
+    for chunksize in [1, 2, 5, 1_000_000]:
+        processor = SketchStatsProcessor(chunksize=chunksize, as_of='2026-10-18')
+        processor.load_staging_chunks()
+        results.append(processor.create_duration_quantiles())
+
+    for result in results[1:]:
+        pd.testing.assert_frame_equal(result, results[0])
+
+
+def test_duration_means_match_exact_values():
+    staging = pd.read_csv(SketchStatsProcessor().staging_csv_path, parse_dates=['event_date'])
+    as_of = pd.Timestamp('2026-10-18')
+    last_event = staging.groupby('client_id')['event_date'].max()
+
+    processor = SketchStatsProcessor(chunksize=3, as_of='2026-10-18')
+    processor.load_staging_chunks()
+    quantiles = processor.create_duration_quantiles().set_index('metric')
+
+    days_since_last_event = (as_of - last_event).dt.days
+    assert quantiles.loc['days_since_last_event', 'count'] == len(days_since_last_event)
+    assert quantiles.loc['days_since_last_event', 'mean'] == pytest.approx(days_since_last_event.mean())
+    assert quantiles.loc['days_since_last_event', 'max'] == days_since_last_event.max()
+
+
+def make_events(client_ids):
+    """Applied events of the given clients, in the given order."""
+    return pd.DataFrame({
+        'client_id': client_ids,
+        'event_type': 'applied',
+        'event_date': pd.Timestamp('2024-01-01'),
+        'plan': 'Basic',
+        'region': 'US',
+        'sales_rep_id': 57
+    })
+
+
+def test_unordered_staging_is_rejected():
+    with pytest.raises(ValueError):
+        SketchStatsProcessor(as_of='2026-10-18').update(make_events([2, 1]))
+
+    # Also across batches
+    processor = SketchStatsProcessor(as_of='2026-10-18')
+    processor.update(make_events([3, 4]))
+    with pytest.raises(ValueError):
+        processor.update(make_events([1]))